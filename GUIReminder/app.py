@@ -1,63 +1,263 @@
 import os
-from dotenv import load_dotenv
-from slack_bolt import App
-from slack_bolt.adapter.socket_mode import SocketModeHandler
+import sys
 
 from handlers.commands import (
+    import_schedule,
+    purge_reminders,
+    reminder_feed,
     set_reminder,
     set_schedule,
     show_reminder_list
 )
+from handlers.config import config
+from handlers.error_reports import error_digest
+from handlers.installations import WorkspaceClients
+from handlers.metrics import (
+    register_runtime_gauges,
+    start_metrics_server,
+    use_metrics,
+    use_metrics_async
+)
+from handlers.recurrence import RecurrenceJob
+from handlers.reminder_store import ReconcileJob, reminder_store
+from handlers.scheduler_engine import scheduler_engine
+from handlers.serving import (
+    PORT,
+    WEB_CONCURRENCY,
+    BackgroundJobLeader,
+    ServingAsgiApp,
+    ServingWsgiApp,
+    run_gunicorn,
+    run_uvicorn
+)
+from handlers.slack_client import RateLimitedWebClient, use_rate_limited_client
+from handlers.user_timezones import start_warm_up
+from handlers.worker_pool import worker_pool, async_worker_pool
 
 
-# 環境設定の読み込み
-load_dotenv()
-SLACK_BOT_TOKEN = os.environ.get("SLACK_BOT_TOKEN")
-SLACK_SIGNING_SECRET = os.environ.get("SLACK_SIGNING_SECRET")
-SLACK_APP_TOKEN = os.environ.get("SLACK_APP_TOKEN")
-
+# 環境設定（handlers.config で .env を 1 度だけ読み込む）
+SLACK_BOT_TOKEN = config.slack_bot_token
+SLACK_SIGNING_SECRET = config.slack_signing_secret
+SLACK_APP_TOKEN = config.slack_app_token
+# Slack Web API の URL（ベンチマークでローカルのスタブに向ける場合などに変更する）
+SLACK_API_BASE_URL = config.slack_api_base_url
 
-# ソケットモード / HTTPモード
-IS_SOCKET_MODE = True
 
-# Bolt Appの初期化
-app = App(
-    token=SLACK_BOT_TOKEN,
-    signing_secret=SLACK_SIGNING_SECRET
-)
+# ソケットモード（socket） / HTTPモード（http）
+IS_SOCKET_MODE = config.is_socket_mode
+# 同期モード（App） / 非同期モード（AsyncApp）
+IS_ASYNC_MODE = config.is_async_mode
+# 複数のワークスペースへのインストール（SLACK_CLIENT_ID・SLACK_CLIENT_SECRET を設定した場合）
+IS_MULTI_WORKSPACE = config.is_multi_workspace
 
 command_modules = [
-    set_reminder, 
+    set_reminder,
     set_schedule,
-    show_reminder_list
+    show_reminder_list,
+    import_schedule,
+    reminder_feed,
+    purge_reminders
 ]
 
-for module in command_modules:
-    module.register(app)
+installation_store = None
+if IS_MULTI_WORKSPACE:
+    # ワークスペースごとのボットのトークンはインストール情報のストアから引く（SLACK_BOT_TOKEN は使わない）
+    from handlers.installations import CachedAuthorize, create_installation_store, create_oauth_settings
+
+    installation_store, oauth_state_store = create_installation_store()
+
+# Bolt Appの初期化
+if IS_ASYNC_MODE:
+    # AsyncApp は AsyncWebClient（aiohttp）で Slack API を呼び出す
+    # aiohttp の読み込みは重いため、同期モードでは import しない
+    from slack_bolt.async_app import AsyncApp
+    from handlers.slack_async_client import RateLimitedAsyncWebClient, use_rate_limited_client_async
+
+    if IS_MULTI_WORKSPACE:
+        from handlers.installations_async import AsyncCachedAuthorize, create_async_oauth_settings
+
+        app = AsyncApp(
+            client=RateLimitedAsyncWebClient(base_url=SLACK_API_BASE_URL),
+            signing_secret=SLACK_SIGNING_SECRET,
+            installation_store=installation_store,
+            authorize=AsyncCachedAuthorize(installation_store),
+            oauth_settings=create_async_oauth_settings(installation_store, oauth_state_store)
+        )
+    else:
+        app = AsyncApp(
+            client=RateLimitedAsyncWebClient(token=SLACK_BOT_TOKEN, base_url=SLACK_API_BASE_URL),
+            signing_secret=SLACK_SIGNING_SECRET
+        )
+    # 全ハンドラーの Slack API 呼び出しを共有のレート制限に通す
+    use_rate_limited_client_async(app)
+    # ack までの時間・エラーを記録する
+    use_metrics_async(app)
+
+    for module in command_modules:
+        module.register_async(app)
+else:
+    from slack_bolt import App
+
+    if IS_MULTI_WORKSPACE:
+        app = App(
+            client=RateLimitedWebClient(base_url=SLACK_API_BASE_URL),
+            signing_secret=SLACK_SIGNING_SECRET,
+            installation_store=installation_store,
+            authorize=CachedAuthorize(installation_store),
+            oauth_settings=create_oauth_settings(installation_store, oauth_state_store)
+        )
+    else:
+        app = App(
+            client=RateLimitedWebClient(token=SLACK_BOT_TOKEN, base_url=SLACK_API_BASE_URL),
+            signing_secret=SLACK_SIGNING_SECRET
+        )
+    # 全ハンドラーの Slack API 呼び出しを共有のレート制限に通す
+    use_rate_limited_client(app)
+    # ack までの時間・エラーを記録する
+    use_metrics(app)
+
+    for module in command_modules:
+        module.register(app)
+
+# ワーカープール・キャッシュなどの状態を /metrics に出す
+register_runtime_gauges()
+
+
+def start_background_jobs():
+    """
+    ローカルストアと Slack 側の予約の突き合わせジョブ、ローカル配信エンジン、繰り返しの予約の補充ジョブを開始
+    （非同期モードでもスレッドで動かすため同期の WebClient を使う）
+    複数のワークスペースでは、予約ごとにそのワークスペースのボットのトークンで呼び出す
+    """
+    default_client = None
+    if SLACK_BOT_TOKEN:
+        # 単一のワークスペースで動かしていたときの予約（ワークスペースが空）はこのトークンで配信する
+        default_client = RateLimitedWebClient(token=SLACK_BOT_TOKEN, base_url=SLACK_API_BASE_URL)
+    clients = WorkspaceClients(default_client, installation_store, SLACK_API_BASE_URL)
+    reconcile_job = ReconcileJob(clients)
+    reconcile_job.start()
+    scheduler_engine.start(clients)
+    recurrence_job = RecurrenceJob(clients)
+    recurrence_job.start()
+    return [reconcile_job, scheduler_engine, recurrence_job]
+
+
+def start_timezone_warm_up():
+    """
+    ユーザーのタイムゾーンのキャッシュを users.list でまとめて読み込む（キャッシュはプロセスごとなので各ワーカーで行う）
+    複数のワークスペースでは、各ワークスペースのユーザーは初回に users.info で 1 人ずつ取得する
+    """
+    if SLACK_BOT_TOKEN and not IS_MULTI_WORKSPACE:
+        start_warm_up(RateLimitedWebClient(token=SLACK_BOT_TOKEN, base_url=SLACK_API_BASE_URL))
+
+
+# HTTP モードでは複数のワーカープロセスのうち 1 つだけがバックグラウンドジョブを動かす
+job_leader = BackgroundJobLeader(start_background_jobs)
+
+
+def on_worker_start():
+    """
+    同期 HTTP モードのワーカープロセス（gunicorn が fork したもの）の開始時の処理
+    """
+    # fork 前に開いた SQLite の接続は子プロセスで使わない
+    reminder_store.reopen()
+    start_timezone_warm_up()
+    job_leader.start()
+
+
+def on_worker_exit():
+    """
+    同期 HTTP モードのワーカープロセスの停止時の処理（受け付け済みの予約処理を終えてから止める）
+    """
+    worker_pool.shutdown(wait=True)
+    # まだ送っていない開発者へのエラーのまとめを送る
+    error_digest.stop()
+    job_leader.stop()
+
+
+async def on_asgi_startup():
+    start_timezone_warm_up()
+    job_leader.start()
+
+
+async def on_asgi_shutdown():
+    import asyncio
+    from handlers.slack_async_client import close_async_session
+
+    await async_worker_pool.drain()
+    await asyncio.to_thread(error_digest.stop)
+    await close_async_session()
+    job_leader.stop()
+
+
+def create_wsgi_app():
+    """
+    同期モードの HTTP エンドポイント（WSGI アプリ）を生成
+    /slack/events で Slack からのリクエストを、/metrics でメトリクスを、/calendar/... で予約の iCalendar フィードを返す
+    複数のワークスペースでは /slack/install・/slack/oauth_redirect でインストールを受け付ける
+    """
+    from slack_bolt.adapter.wsgi import SlackRequestHandler
+
+    return ServingWsgiApp(SlackRequestHandler(app, path="/slack/events"))
+
+
+def create_asgi_app():
+    """
+    非同期モードの HTTP エンドポイント（ASGI アプリ）を生成
+    uvicorn などの ASGI サーバーから `uvicorn app:asgi_app` のように起動できる
+    """
+    from slack_bolt.adapter.asgi.async_handler import AsyncSlackRequestHandler
+
+    return ServingAsgiApp(
+        AsyncSlackRequestHandler(app, path="/slack/events"),
+        on_startup=on_asgi_startup,
+        on_shutdown=on_asgi_shutdown,
+    )
+
+
+wsgi_app = create_wsgi_app() if not IS_SOCKET_MODE and not IS_ASYNC_MODE else None
+asgi_app = create_asgi_app() if IS_ASYNC_MODE else None
 
 
 if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--startup-report", action="store_true",
+        help="起動時の import にかかった時間の内訳（-X importtime の集計）を表示して終了する"
+    )
+    parser.add_argument("--top", type=int, default=15, help="--startup-report で表示する件数")
+    args = parser.parse_args()
+
+    if args.startup_report:
+        from handlers.startup import print_startup_report
+
+        print_startup_report(top=args.top)
+        sys.exit(0)
+
     if IS_SOCKET_MODE:
     # 開発環境で最も簡単な Socket Mode で実行
-    # 本番環境では Web サーバー（Flask/Djangoなど）と連携して実行するのが一般的
-        print("Bot is running via Socket Mode...")
-        SocketModeHandler(app, SLACK_APP_TOKEN).start()
+    # 本番環境では HTTP モード（SERVE_MODE=http）で複数のワーカープロセスで実行する
+        start_background_jobs()
+        start_timezone_warm_up()
+        # Socket Mode では HTTP を受けないため、/metrics は別ポートのサーバーで公開する
+        start_metrics_server()
+        print(f"Bot is running via Socket Mode ({'async' if IS_ASYNC_MODE else 'sync'})...")
+        if IS_ASYNC_MODE:
+            import asyncio
+            from slack_bolt.adapter.socket_mode.async_handler import AsyncSocketModeHandler
+
+            asyncio.run(AsyncSocketModeHandler(app, SLACK_APP_TOKEN).start_async())
+        else:
+            from slack_bolt.adapter.socket_mode import SocketModeHandler
+
+            SocketModeHandler(app, SLACK_APP_TOKEN).start()
     else:
-        # ポート3000でHTTPサーバーとして起動
-        PORT = 3000
-        print(f"Bot is running on port {PORT}...")
-        # Boltの組み込みアダプターはFlask/Djangoを使用していないため、
-        # 実行には適切なWSGIサーバーが必要です。ここではシンプルな起動を想定。
-        # 通常、BotをHTTPサーバーとして実行するには別の起動スクリプトが必要です。
-        # ここでは便宜上、Boltが内部的にHTTPサーバーとして動作すると仮定します。
-        from slack_bolt.adapter.flask import SlackRequestHandler
-        from flask import Flask, request
-        
-        flask_app = Flask(__name__)
-        handler = SlackRequestHandler(app)
-
-        @flask_app.route("/slack/events", methods=["POST"])
-        def slack_events():
-            return handler.handle(request)
-
-        flask_app.run(port=PORT)
\ No newline at end of file
+        print(f"Bot is running on port {PORT} ({'async' if IS_ASYNC_MODE else 'sync'}, {WEB_CONCURRENCY} workers)...")
+        if IS_ASYNC_MODE:
+            # 非同期モードでは uvicorn のワーカーごとに app.py を import し直して asgi_app を使う
+            run_uvicorn("app:asgi_app", os.path.dirname(os.path.abspath(__file__)))
+        else:
+            # 同期モードでは gunicorn（gthread）のワーカープロセスで WSGI アプリを動かす
+            run_gunicorn(wsgi_app, on_worker_start, on_worker_exit)
@@ -0,0 +1,303 @@
+"""
+Flask の /slack/events に署名付きリクエストを送る HTTP ベンチマーク
+
+ローカルの Slack Web API スタブ（slack_stub_server）に向けた Bolt App を Flask で起動し、
+スラッシュコマンド・モーダル送信を同時に送って、ack（HTTP 応答）までの時間のパーセンタイル、
+1 秒あたりのリクエスト数、1 リクエストあたりの Slack API 呼び出し数を測る。
+Slack のレート制限（Tier）のままだと排出時間がほぼ制限で決まるため、既定では --rate-limit-scale 倍に緩める。
+--output を指定すると、結果をコミットハッシュ付きの 1 行 JSON として追記する（コミット間の比較用）。
+
+    cd GUIReminder
+    python -m benchmarks.http_bench --scenario schedule-submit --requests 500 --concurrency 16 --latency 0.1
+    python -m benchmarks.http_bench --scenario list-command --fixtures 60 --output benchmarks/results.jsonl
+
+起動済みのサーバー（SERVE_MODE=http で gunicorn・uvicorn のワーカー数を変えたものなど）を測る場合は、
+スタブを別に起動してアプリの SLACK_API_BASE_URL をそこに向け、--target と --stub-url を指定する。
+
+    python -m benchmarks.slack_stub_server --port 8089 --latency 0.1 &
+    export SLACK_API_BASE_URL=http://127.0.0.1:8089/api/ SLACK_RATE_LIMIT_SCALE=100
+    export SLACK_BOT_TOKEN=xoxb-bench SLACK_SIGNING_SECRET=bench-signing-secret
+    SERVE_MODE=http WEB_CONCURRENCY=4 python app.py &
+    python -m benchmarks.http_bench --target http://127.0.0.1:3000/slack/events --stub-url http://127.0.0.1:8089/
+"""
+import argparse
+import datetime
+import http.client
+import json
+import os
+import subprocess
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode, urljoin, urlparse
+
+# ベンチマークの予約はローカルストアのファイルに残さない
+os.environ.setdefault("REMINDER_DB_PATH", ":memory:")
+
+from flask import Flask, request
+from slack_bolt import App
+from slack_bolt.adapter.flask import SlackRequestHandler
+from slack_sdk.signature import SignatureVerifier
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+from handlers.commands import set_reminder, set_schedule, show_reminder_list
+from handlers.metrics import use_metrics
+from handlers import slack_client
+from handlers.slack_client import RateLimitedWebClient, use_rate_limited_client
+from handlers.worker_pool import worker_pool
+from benchmarks import payloads
+from benchmarks.runtime_bench import percentile
+from benchmarks.slack_stub_server import SlackStubServer
+
+
+COMMAND_MODULES = [set_reminder, set_schedule, show_reminder_list]
+SIGNING_SECRET = os.environ.get("SLACK_SIGNING_SECRET", "bench-signing-secret")
+
+# シナリオごとのペイロード生成
+SCENARIOS = {
+    "reminder-command": lambda: payloads.slash_command("/set-reminder"),
+    "schedule-command": lambda: payloads.slash_command("/set-schedule"),
+    "list-command": lambda: payloads.slash_command("/show-reminder-list"),
+    "reminder-submit": lambda: payloads.reminder_submission(),
+    "schedule-submit": lambda: payloads.schedule_submission(),
+}
+
+
+def encode_body(payload):
+    """
+    Slack と同じ形式のリクエストボディ（コマンドはフォーム、インタラクションは payload=JSON）
+    """
+    if "command" in payload:
+        return urlencode(payload)
+    return urlencode({"payload": json.dumps(payload, ensure_ascii=False)})
+
+
+def signed_headers(body, verifier=SignatureVerifier(SIGNING_SECRET)):
+    timestamp = str(int(time.time()))
+    return {
+        "Content-Type": "application/x-www-form-urlencoded",
+        "X-Slack-Request-Timestamp": timestamp,
+        "X-Slack-Signature": verifier.generate_signature(timestamp=timestamp, body=body),
+    }
+
+
+def create_flask_app(slack_base_url):
+    """
+    app.py の同期 HTTP モードと同じ構成（レート制限付き WebClient + メトリクス）で、スタブに向けた Flask アプリを作る
+    """
+    app = App(
+        client=RateLimitedWebClient(token="xoxb-bench", base_url=slack_base_url),
+        signing_secret=SIGNING_SECRET,
+    )
+    use_rate_limited_client(app)
+    use_metrics(app)
+    for module in COMMAND_MODULES:
+        module.register(app)
+
+    flask_app = Flask(__name__)
+    handler = SlackRequestHandler(app)
+
+    @flask_app.route("/slack/events", methods=["POST"])
+    def slack_events():
+        return handler.handle(request)
+
+    return flask_app
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+
+    def log_request(self, *args, **kwargs):
+        # 1 リクエストごとのアクセスログは計測の邪魔になるので出さない
+        pass
+
+
+class SignedClient:
+    """
+    スレッドごとに keep-alive の接続を持ち、署名付きで /slack/events に POST する
+    """
+
+    def __init__(self, url):
+        parsed = urlparse(url)
+        self.host, self.port, self.path = parsed.hostname, parsed.port, parsed.path
+        self._local = threading.local()
+
+    def post(self, payload):
+        body = encode_body(payload)
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self._local.connection = http.client.HTTPConnection(self.host, self.port, timeout=30)
+        start = time.perf_counter()
+        connection.request("POST", self.path, body=body.encode("utf-8"), headers=signed_headers(body))
+        response = connection.getresponse()
+        response.read()
+        return time.perf_counter() - start, response.status
+
+
+class LocalStub:
+    """
+    同じプロセスで起動したスタブの呼び出し回数
+    """
+
+    def __init__(self, server):
+        self.server = server
+
+    def stats(self):
+        return self.server.state.total(), self.server.state.rate_limited
+
+
+class RemoteStub:
+    """
+    別プロセスで起動したスタブの呼び出し回数（GET /stats）
+    """
+
+    def __init__(self, url):
+        self.url = urljoin(url, "/stats")
+
+    def stats(self):
+        with urllib.request.urlopen(self.url) as response:
+            data = json.load(response)
+        return data["total"], data["rate_limited"]
+
+
+def local_pool_idle():
+    stats = worker_pool.stats()
+    return stats["queue_depth"] == 0 and stats["running"] == 0
+
+
+def wait_until_idle(stub, pool_idle=None, timeout=600, settle=0.5):
+    """
+    ワーカープールが空になり、API 呼び出しが settle 秒増えなくなるまで待つ
+    （別プロセスのサーバーの場合はプールの状態が見えないため、settle を長めにとる）
+    """
+    deadline = time.perf_counter() + timeout
+    last_total, last_change = -1, time.perf_counter()
+    while time.perf_counter() < deadline:
+        total, _ = stub.stats()
+        if total != last_total:
+            last_total, last_change = total, time.perf_counter()
+        if (pool_idle is None or pool_idle()) and time.perf_counter() - last_change >= settle:
+            return
+        time.sleep(0.01 if pool_idle else 0.1)
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def measure(scenario, n, concurrency, client, stub, pool_idle=None):
+    # 接続・初回の import などを除くため 1 件流してから計測する
+    client.post(SCENARIOS[scenario]())
+    settle = 0.5 if pool_idle else 2.0
+    wait_until_idle(stub, pool_idle, settle=settle)
+    calls_before, rate_limited_before = stub.stats()
+
+    bodies = [SCENARIOS[scenario]() for _ in range(n)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(client.post, bodies))
+    ack_elapsed = time.perf_counter() - start
+    wait_until_idle(stub, pool_idle, settle=settle)
+    # プールが見えない場合は、最後の呼び出しから settle 秒待った分を除く
+    drain_elapsed = time.perf_counter() - start - (0 if pool_idle else settle)
+
+    latencies = [latency for latency, _ in results]
+    calls_after, rate_limited_after = stub.stats()
+    api_calls = calls_after - calls_before
+    return {
+        "scenario": scenario,
+        "requests": n,
+        "concurrency": concurrency,
+        "errors": sum(1 for _, status in results if status != 200),
+        "ack_p50_ms": percentile(latencies, 50) * 1000,
+        "ack_p90_ms": percentile(latencies, 90) * 1000,
+        "ack_p99_ms": percentile(latencies, 99) * 1000,
+        "ack_max_ms": max(latencies) * 1000,
+        "rps": n / ack_elapsed,
+        "drain_s": drain_elapsed,
+        "api_calls_per_request": api_calls / n,
+        "rate_limited": rate_limited_after - rate_limited_before,
+    }
+
+
+def run(scenario, n, concurrency, stub_server):
+    """
+    スタブに向けた Flask アプリを同じプロセスで起動して測る
+    """
+    flask_app = create_flask_app(stub_server.base_url)
+    server = make_server("127.0.0.1", 0, flask_app, threaded=True, request_handler=QuietRequestHandler)
+    threading.Thread(target=server.serve_forever, name="bench-flask", daemon=True).start()
+    client = SignedClient(f"http://127.0.0.1:{server.server_port}/slack/events")
+    try:
+        return measure(scenario, n, concurrency, client, LocalStub(stub_server), local_pool_idle)
+    finally:
+        server.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), default="schedule-submit")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16, help="同時に送るリクエスト数")
+    parser.add_argument("--latency", type=float, default=0.1, help="Slack API 1 呼び出しあたりの遅延（秒）")
+    parser.add_argument("--jitter", type=float, default=0.0, help="遅延のばらつき（± 秒）")
+    parser.add_argument("--rate-limit-ratio", type=float, default=0.0, help="Slack API が 429 を返す割合（0〜1）")
+    parser.add_argument("--retry-after", type=int, default=1, help="429 の Retry-After（秒）")
+    parser.add_argument("--fixtures", type=int, default=0, help="チャンネルに最初から予約されているメッセージ数")
+    parser.add_argument(
+        "--rate-limit-scale", type=float, default=100.0, help="クライアント側のレート制限を何倍に緩めるか（1 で実際の Tier）"
+    )
+    parser.add_argument("--output", help="結果を 1 行 JSON で追記するファイル")
+    parser.add_argument("--target", help="起動済みのサーバーの /slack/events の URL（指定しなければ同じプロセスで起動する）")
+    parser.add_argument("--stub-url", default="http://127.0.0.1:8089/", help="--target の場合に使う起動済みのスタブの URL")
+    parser.add_argument("--label", default="", help="結果に付けるラベル（ワーカー数などの構成の区別用）")
+    args = parser.parse_args()
+
+    # バケットが作られる前に、メソッドごとの上限の倍率を変える（--target の場合はサーバー側の環境変数で指定する）
+    slack_client.SLACK_RATE_LIMIT_SCALE = args.rate_limit_scale
+
+    if args.target:
+        # 遅延・429・フィクスチャは起動済みのスタブ側の設定に従う
+        result = measure(
+            args.scenario, args.requests, args.concurrency, SignedClient(args.target), RemoteStub(args.stub_url)
+        )
+    else:
+        stub = SlackStubServer(
+            latency=args.latency, jitter=args.jitter, rate_limit_ratio=args.rate_limit_ratio,
+            retry_after=args.retry_after, fixtures_per_channel=args.fixtures,
+        ).start()
+        try:
+            result = run(args.scenario, args.requests, args.concurrency, stub)
+        finally:
+            stub.stop()
+
+    result.update({
+        "commit": git_commit(),
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "latency": args.latency,
+        "rate_limit_ratio": args.rate_limit_ratio,
+        "fixtures": args.fixtures,
+        "rate_limit_scale": args.rate_limit_scale,
+        "target": args.target or "in-process",
+        "label": args.label,
+    })
+    print(
+        f"{result['scenario']} @ {result['commit']}: n={result['requests']} c={result['concurrency']} "
+        f"errors={result['errors']}\n"
+        f"  ack p50 {result['ack_p50_ms']:.1f}ms / p90 {result['ack_p90_ms']:.1f}ms / "
+        f"p99 {result['ack_p99_ms']:.1f}ms / max {result['ack_max_ms']:.1f}ms\n"
+        f"  {result['rps']:.1f} req/s, drain {result['drain_s']:.2f}s, "
+        f"{result['api_calls_per_request']:.2f} API calls/request, 429 x {result['rate_limited']}"
+    )
+    if args.output:
+        with open(args.output, "a", encoding="utf-8") as f:
+            f.write(json.dumps(result, ensure_ascii=False) + "\n")
+
+
+if __name__ == "__main__":
+    main()
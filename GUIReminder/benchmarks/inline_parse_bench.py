@@ -0,0 +1,94 @@
+"""
+スラッシュコマンドの引数の読み取りのベンチマーク
+
+よく使われる書き方の入力（CORPUS）を parse_reminder_command / parse_schedule_command で読み取り、
+1 回あたりの時間と、読み取れた（モーダルを開かずに予約できる）割合を測る。
+比較として、モーダルを開く場合に毎回行う views.open の本文の生成（render_json）の時間も表示する。
+
+    cd GUIReminder
+    python -m benchmarks.inline_parse_bench --number 20000
+"""
+import argparse
+import datetime
+import timeit
+
+from handlers.commands import set_reminder, set_schedule
+from handlers.inline_command import parse_when
+from handlers.user_timezones import zone
+
+# (コマンド, 引数, 読み取れるはずか)
+CORPUS = [
+    ("reminder", "明日 9:30 <@U0BENCH1|alice> デプロイの確認", True),
+    ("reminder", "tomorrow 09:30 <@U0BENCH1|alice> <@U0BENCH2|bob> deploy check", True),
+    ("reminder", "15:00 定例の資料を共有", True),
+    ("reminder", "15時半 定例の資料を共有", True),
+    ("reminder", "30分後 会議室を予約", True),
+    ("reminder", "in 2h stand-up notes", True),
+    ("reminder", "4/1 10時 <@U0BENCH1|alice> 新年度の手続き", True),
+    ("reminder", "2026-12-24 18:00 忘年会の出欠", True),
+    ("reminder", "金曜 17:00 週報を提出", True),
+    ("reminder", "fri 5pm weekly report", True),
+    ("reminder", "明後日 8時に ゴミ出し", True),
+    ("reminder", "12月1日 9:00 年末調整の書類", True),
+    ("reminder", "@alice 明日 9:30 デプロイの確認", False),
+    ("reminder", "明日 9:30 @alice デプロイの確認", False),
+    ("reminder", "10 people meeting", False),
+    ("reminder", "25:00 無効な時刻", False),
+    ("schedule", "4/1 15:00 1時間前 15分前 定例会議\n議題: 来期の計画", True),
+    ("schedule", "明日 10時 -30m 1on1", True),
+    ("schedule", "2026-12-24 18:00 忘年会\n場所: 3F ラウンジ", True),
+    ("schedule", "mon 9:00 朝会", True),
+    ("schedule", "来週 10時 未対応の日付", False),
+    ("schedule", "明日 10時", False),
+]
+
+CHANNEL = "C0BENCH"
+USER = "U0BENCH0"
+PARSERS = {"reminder": set_reminder.parse_reminder_command, "schedule": set_schedule.parse_schedule_command}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", type=int, default=20000)
+    parser.add_argument("--tz", default="Asia/Tokyo", help="読み取りに使うタイムゾーン（空はサーバーのローカルタイム）")
+    args = parser.parse_args()
+
+    tz = zone(args.tz)
+    # 過ぎた日時の繰り越しで結果が変わらないよう、基準の時刻を固定する
+    now = datetime.datetime(2026, 1, 5, 12, 0, tzinfo=tz)
+    bodies = [
+        (kind, {"channel_id": CHANNEL, "user_id": USER, "text": text}, expected)
+        for kind, text, expected in CORPUS
+    ]
+
+    # 想定どおりに読み取れる・読み取れないことを確認してから測る
+    for kind, body, expected in bodies:
+        parsed = PARSERS[kind](body, tz, now)
+        assert (parsed is not None) == expected, (kind, body["text"], parsed)
+
+    def parse_corpus():
+        for kind, body, _ in bodies:
+            PARSERS[kind](body, tz, now)
+
+    def parse_when_corpus():
+        for _, body, _ in bodies:
+            parse_when(body["text"], tz, now)
+
+    reminder_fields = set_reminder.reminder_modal_fields(CHANNEL, tz)
+    cases = [
+        ("parse_when", parse_when_corpus, len(bodies)),
+        ("parse_*_command", parse_corpus, len(bodies)),
+        ("reminder modal render_json", lambda: set_reminder.REMINDER_MODAL.render_json(**reminder_fields), 1),
+    ]
+    print(f"{'case':<28} {'time/call':>12}")
+    for name, fn, calls in cases:
+        fn()
+        seconds = min(timeit.repeat(fn, number=args.number, repeat=3)) / (args.number * calls)
+        print(f"{name:<28} {seconds * 1e6:>10.2f}µs")
+
+    parsed = sum(expected for _, _, expected in bodies)
+    print(f"parsed {parsed}/{len(bodies)} inputs ({parsed / len(bodies):.0%}); the rest open the modal")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""
+予約一覧の読み込み・描画のベンチマーク（1 チャンネルに --records 件の予約がある場合）
+
+次の 2 つの処理を、dict を使う従来の方法と ReminderRecord / ScheduledMessageColumns を使う方法で比べ、
+1 回あたりの時間と、処理中のメモリのピーク・結果として保持するメモリ（tracemalloc）を測る。
+
+  ingest: chat.scheduledMessages.list の全ページの結果を突き合わせ用に保持する
+          （従来: 全件を dict にして本文を解析 / columns: 列ごとの配列と連結した本文だけを持ち、解析しない）
+  page  : ローカルストアから 1 ページを読んでブロックを組み立てる
+          （従来: SELECT * の全件を dict にして並べ替え、datetime で日時を整形 / dict rows: ページ分だけ dict で読む /
+           records: ページ分だけ ReminderRecord で読んで 1 回で組み立てる）
+
+    cd GUIReminder
+    python -m benchmarks.list_bench --records 10000 --number 20
+"""
+import argparse
+import datetime
+import os
+import time
+import timeit
+import tracemalloc
+
+# ベンチマークの予約はローカルストアのファイルに残さない
+os.environ.setdefault("REMINDER_DB_PATH", ":memory:")
+
+from handlers.commands.show_reminder_list import LIST_PAGE_SIZE, build_list_modal_blocks
+from handlers.reminder_records import ScheduledMessageColumns
+from handlers.reminder_store import ReminderStore
+from handlers.reminder_text import format_reminder_text, parse_scheduled_text
+
+CHANNEL = "C0BENCH"
+
+
+def scheduled_message_pages(n, page_size=100):
+    """
+    chat.scheduledMessages.list のレスポンス（ページごとの scheduled_messages）を生成する
+    """
+    now = int(time.time())
+    messages = [
+        {
+            "id": f"Q{i:010d}",
+            "channel_id": CHANNEL,
+            "post_at": now + 3600 + (i * 7919) % (n * 60),
+            "date_created": now,
+            "text": format_reminder_text(f"<@U{i % 50:07d}>", f"ベンチマーク用のリマインド {i} " + "内容" * (i % 20)),
+        }
+        for i in range(n)
+    ]
+    return [messages[i:i + page_size] for i in range(0, n, page_size)]
+
+
+def legacy_ingest(pages):
+    """
+    従来の突き合わせの前処理（全件を dict にして本文を解析する）
+    """
+    remote = []
+    for page in pages:
+        for msg in page:
+            text = msg.get("text", "")
+            remote.append({
+                "scheduled_message_id": msg["id"],
+                "post_at": msg["post_at"],
+                "text": text,
+                **parse_scheduled_text(text),
+            })
+    return remote
+
+
+def columns_ingest(pages):
+    messages = ScheduledMessageColumns()
+    for page in pages:
+        messages.extend(page)
+    return messages
+
+
+def legacy_reminder_blocks(reminder):
+    schedule_time = datetime.datetime.fromtimestamp(reminder["post_at"], tz=datetime.timezone.utc).astimezone(None)
+    mentions = reminder["mentions"]
+    disp_mentions = f"【メンション】{mentions}" if mentions else ""
+    preview_text = f"{reminder['title']}\n{reminder['body']}" if reminder["title"] else reminder["body"]
+    ellipsis = "..." if len(preview_text) >= 50 else ""
+    yield {
+        "type": "section",
+        "text": {
+            "type": "mrkdwn",
+            "text": (
+                f"{disp_mentions}\n"
+                f"【予約日時】{schedule_time.strftime('%Y/%m/%d %H:%M')}\n"
+                f"【内容】\n{preview_text[:50]}" + ellipsis
+            )
+        }
+    }
+    yield {
+        "type": "actions",
+        "elements": [
+            {"type": "button", "text": {"type": "plain_text", "text": "編集"}, "style": "primary",
+             "value": reminder["scheduled_message_id"], "action_id": "open_edit_modal"},
+            {"type": "button", "text": {"type": "plain_text", "text": "削除"}, "style": "danger",
+             "value": reminder["scheduled_message_id"], "action_id": "open_delete_modal"},
+        ]
+    }
+    yield {"type": "divider"}
+
+
+def legacy_page(store):
+    """
+    従来の一覧（チャンネルの全件を dict で読み、並べ替えてから先頭ページを組み立てる）
+    """
+    rows = [dict(row) for row in store._conn.execute("SELECT * FROM reminders WHERE channel = ?", (CHANNEL,))]
+    rows.sort(key=lambda row: row["post_at"])
+    blocks = []
+    for reminder in rows[:LIST_PAGE_SIZE]:
+        blocks.extend(legacy_reminder_blocks(reminder))
+    return blocks
+
+
+def dict_rows_page(store):
+    """
+    ページ分だけ読むが、行を dict にして datetime で日時を整形する（ReminderRecord の導入前）
+    """
+    rows = store._conn.execute(
+        "SELECT * FROM reminders WHERE channel = ? AND post_at >= ? ORDER BY post_at, scheduled_message_id LIMIT ?",
+        (CHANNEL, int(time.time()), LIST_PAGE_SIZE + 1),
+    ).fetchall()
+    blocks = []
+    for reminder in [dict(row) for row in rows[:LIST_PAGE_SIZE]]:
+        blocks.extend(legacy_reminder_blocks(reminder))
+    return blocks
+
+
+def records_page(store):
+    reminders, has_more = store.page_channel(CHANNEL, LIST_PAGE_SIZE)
+    return build_list_modal_blocks(reminders, has_next=has_more)
+
+
+def measure(fn, number):
+    """
+    1 回あたりの時間（ms）、処理中のメモリのピーク、結果として保持するメモリ（バイト）を返す
+    """
+    fn()
+    seconds = min(timeit.repeat(fn, number=number, repeat=3)) / number
+    tracemalloc.start()
+    result = fn()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return seconds * 1000, peak, retained
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=10000, help="チャンネルの予約の件数")
+    parser.add_argument("--number", type=int, default=20)
+    args = parser.parse_args()
+
+    pages = scheduled_message_pages(args.records)
+    store = ReminderStore(":memory:")
+    # ストアにはボットから予約した形（解析済みの項目付き）で保存しておく
+    for page in pages:
+        for msg in page:
+            store.add(msg["id"], CHANNEL, msg["post_at"], setter="U0BENCH", text=msg["text"],
+                      **{k: v for k, v in parse_scheduled_text(msg["text"]).items() if k != "kind"})
+
+    # 新しい方法でも同じ一覧・同じ突き合わせの入力になることを確認してから測る
+    assert [b for b in legacy_page(store) if b["type"] == "section"] == \
+        [b for b in records_page(store) if b["type"] == "section"]
+    columns = columns_ingest(pages)
+    legacy = legacy_ingest(pages)
+    assert columns.ids == [m["scheduled_message_id"] for m in legacy]
+    assert all(columns.text(i) == legacy[i]["text"] for i in range(0, len(legacy), 97))
+
+    cases = [
+        ("ingest legacy dicts", lambda: legacy_ingest(pages)),
+        ("ingest columns", lambda: columns_ingest(pages)),
+        ("page legacy dicts", lambda: legacy_page(store)),
+        ("page dict rows", lambda: dict_rows_page(store)),
+        ("page records", lambda: records_page(store)),
+    ]
+    print(f"records={args.records}, page size={LIST_PAGE_SIZE}")
+    print(f"{'case':<22} {'time/call':>11} {'peak':>12} {'retained':>12}")
+    for name, fn in cases:
+        millis, peak, retained = measure(fn, args.number)
+        print(f"{name:<22} {millis:>9.2f}ms {peak / 1024:>10.0f}KB {retained / 1024:>10.0f}KB")
+
+
+if __name__ == "__main__":
+    main()
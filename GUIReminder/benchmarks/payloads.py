@@ -0,0 +1,86 @@
+"""
+ベンチマーク用の Slack リクエストペイロード生成
+"""
+import datetime
+import itertools
+
+
+_counter = itertools.count()
+
+
+def _future(minutes):
+    dt = datetime.datetime.now() + datetime.timedelta(minutes=minutes)
+    # MINUTE_INTERVAL (5分) 単位に揃える
+    dt = dt.replace(minute=dt.minute - dt.minute % 5)
+    return dt.strftime("%Y-%m-%d"), dt.strftime("%H"), dt.strftime("%M")
+
+
+def _selected(value):
+    return {"selected_option": {"value": value}}
+
+
+def slash_command(command, channel_id="C0BENCH", user_id="U0BENCH", text=""):
+    """
+    スラッシュコマンドのペイロード
+    """
+    n = next(_counter)
+    return {
+        "token": "verification-token",
+        "team_id": "T0BENCH",
+        "channel_id": channel_id,
+        "user_id": user_id,
+        "command": command,
+        "text": text,
+        "trigger_id": f"trigger-{n}",
+        "response_url": "https://hooks.slack.com/commands/T0BENCH/1/xyz",
+    }
+
+
+def _view_submission(callback_id, values, channel_id, user_id):
+    n = next(_counter)
+    return {
+        "type": "view_submission",
+        "team": {"id": "T0BENCH"},
+        "user": {"id": user_id, "team_id": "T0BENCH"},
+        "api_app_id": "A0BENCH",
+        "trigger_id": f"trigger-{n}",
+        "view": {
+            "id": f"V{n:08d}",
+            "team_id": "T0BENCH",
+            "type": "modal",
+            "callback_id": callback_id,
+            "private_metadata": channel_id,
+            "state": {"values": values},
+        },
+    }
+
+
+def reminder_submission(channel_id="C0BENCH", user_id="U0BENCH", minutes_ahead=60):
+    """
+    /set-reminder モーダル送信（view_submission）のペイロード
+    """
+    date_val, hour_val, minute_val = _future(minutes_ahead)
+    values = {
+        "message_block": {"message_input": {"value": "ベンチマーク用リマインド"}},
+        "date_block": {"date_input": {"selected_date": date_val}},
+        "hour_block": {"hour_select": _selected(hour_val)},
+        "minute_block": {"minute_select": _selected(minute_val)},
+        "user_block": {"user_select_input": {"selected_users": [user_id]}},
+    }
+    return _view_submission("reminder_submission", values, channel_id, user_id)
+
+
+def schedule_submission(channel_id="C0BENCH", user_id="U0BENCH", minutes_ahead=4 * 24 * 60, offsets=("-1h",)):
+    """
+    /set-schedule モーダル送信（view_submission）のペイロード
+    """
+    date_val, hour_val, minute_val = _future(minutes_ahead)
+    values = {
+        "title_block": {"title_input": {"value": "ベンチマーク用スケジュール"}},
+        "start_date_block": {"start_date_input": {"selected_date": date_val}},
+        "start_hour_block": {"start_hour_select": _selected(hour_val)},
+        "start_minute_block": {"start_minute_select": _selected(minute_val)},
+        "message_block": {"message_input": {"value": "詳細テキスト"}},
+        "offset_block": {"offset_select": {"selected_options": [{"value": offset} for offset in offsets]}},
+    }
+    return _view_submission("schedule_submission", values, channel_id, user_id)
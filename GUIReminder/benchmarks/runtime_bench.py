@@ -0,0 +1,165 @@
+"""
+同期モード（App）と非同期モード（AsyncApp）の比較ベンチマーク
+
+同じ /set-schedule 送信のバーストを両モードに流し、ack までの時間と全処理完了までの時間、
+ワーカープールの待ち時間・実行時間を測る。
+Slack API は StubWebClient / StubAsyncWebClient で遅延のみ再現する。
+
+    cd GUIReminder
+    python -m benchmarks.runtime_bench --requests 200 --latency 0.2 --offsets=-1d,-1h,-15m
+
+pool exec p50 は 1 件の登録（予約の同時送信 + 登録通知）にかかった時間。
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# ベンチマークの予約はローカルストアのファイルに残さない
+os.environ.setdefault("REMINDER_DB_PATH", ":memory:")
+
+from slack_bolt import App, BoltRequest
+from slack_bolt.async_app import AsyncApp
+from slack_bolt.authorization import AuthorizeResult
+from slack_bolt.request.async_request import AsyncBoltRequest
+
+from handlers.commands import set_reminder, set_schedule, show_reminder_list
+from handlers.worker_pool import async_worker_pool, worker_pool
+from benchmarks import payloads
+from benchmarks.stub_clients import CallCounter, StubAsyncWebClient, StubWebClient
+
+
+COMMAND_MODULES = [set_reminder, set_schedule, show_reminder_list]
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(mode, ack_latencies, elapsed, counter, n, pool):
+    stats = pool.stats()
+    return {
+        "mode": mode,
+        "requests": n,
+        "ack_p50_ms": percentile(ack_latencies, 50) * 1000,
+        "ack_p99_ms": percentile(ack_latencies, 99) * 1000,
+        "ack_mean_ms": statistics.mean(ack_latencies) * 1000,
+        "drain_s": elapsed,
+        "api_calls": counter.total(),
+        "pool_wait_p99_ms": stats["wait_time"]["p99"] * 1000,
+        "pool_exec_p50_ms": stats["exec_time"]["p50"] * 1000,
+    }
+
+
+def bench_authorize_result():
+    return AuthorizeResult(
+        enterprise_id=None, team_id="T0BENCH",
+        bot_token="xoxb-bench", bot_id="BBOT", bot_user_id="UBOT",
+    )
+
+
+def wait_for_calls(counter, expected, timeout=600):
+    deadline = time.perf_counter() + timeout
+    while counter.total() < expected and time.perf_counter() < deadline:
+        time.sleep(0.005)
+
+
+def run_sync(n, latency, concurrency, calls_per_request, offsets):
+    counter = CallCounter()
+    stub = StubWebClient(latency=latency, counter=counter)
+    app = App(
+        signing_secret="bench",
+        authorize=lambda: bench_authorize_result(),
+        request_verification_enabled=False,
+    )
+
+    # Bolt はリクエストごとに WebClient を生成するため、ミドルウェアでスタブに差し替える
+    @app.middleware
+    def use_stub_client(context, next):
+        context["client"] = stub
+        next()
+
+    for module in COMMAND_MODULES:
+        module.register(app)
+
+    def dispatch(body):
+        start = time.perf_counter()
+        app.dispatch(BoltRequest(body=body, mode="socket_mode"))
+        return time.perf_counter() - start
+
+    bodies = [payloads.schedule_submission(offsets=offsets) for _ in range(n)]
+    start = time.perf_counter()
+    # Socket Mode のリスナースレッド数を concurrency で再現する
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        ack_latencies = list(pool.map(dispatch, bodies))
+    wait_for_calls(counter, n * calls_per_request)
+    return summarize("sync", ack_latencies, time.perf_counter() - start, counter, n, worker_pool)
+
+
+async def run_async(n, latency, calls_per_request, offsets):
+    counter = CallCounter()
+    stub = StubAsyncWebClient(latency=latency, counter=counter)
+
+    async def authorize():
+        return bench_authorize_result()
+
+    app = AsyncApp(
+        signing_secret="bench",
+        authorize=authorize,
+        request_verification_enabled=False,
+    )
+
+    @app.middleware
+    async def use_stub_client(context, next):
+        context["client"] = stub
+        await next()
+
+    for module in COMMAND_MODULES:
+        module.register_async(app)
+
+    async def dispatch(body):
+        start = time.perf_counter()
+        await app.async_dispatch(AsyncBoltRequest(body=body, mode="socket_mode"))
+        return time.perf_counter() - start
+
+    bodies = [payloads.schedule_submission(offsets=offsets) for _ in range(n)]
+    start = time.perf_counter()
+    ack_latencies = await asyncio.gather(*(dispatch(body) for body in bodies))
+    while counter.total() < n * calls_per_request:
+        await asyncio.sleep(0.005)
+    return summarize("async", ack_latencies, time.perf_counter() - start, counter, n, async_worker_pool)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.2, help="Slack API 1 呼び出しあたりの遅延（秒）")
+    parser.add_argument("--concurrency", type=int, default=10, help="同期モードの同時ディスパッチ数")
+    parser.add_argument("--offsets", default="-1h", help="事前通知のオフセット（カンマ区切り）")
+    args = parser.parse_args()
+
+    # offset 付き /set-schedule: scheduleMessage x (1 + オフセット数) + postMessage
+    offsets = tuple(v for v in args.offsets.split(",") if v)
+    calls_per_request = len(offsets) + 2
+    results = [
+        run_sync(args.requests, args.latency, args.concurrency, calls_per_request, offsets),
+        asyncio.run(run_async(args.requests, args.latency, calls_per_request, offsets)),
+    ]
+    print(
+        f"{'mode':<6} {'n':>5} {'ack p50':>10} {'ack p99':>10} {'ack mean':>10} {'drain':>8} {'calls':>6}"
+        f" {'pool wait p99':>14} {'pool exec p50':>14}"
+    )
+    for r in results:
+        print(
+            f"{r['mode']:<6} {r['requests']:>5} {r['ack_p50_ms']:>8.1f}ms {r['ack_p99_ms']:>8.1f}ms "
+            f"{r['ack_mean_ms']:>8.1f}ms {r['drain_s']:>7.2f}s {r['api_calls']:>6}"
+            f" {r['pool_wait_p99_ms']:>12.1f}ms {r['pool_exec_p50_ms']:>12.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""
+ベンチマーク用のローカル Slack Web API スタブ（HTTP サーバー）
+
+ボットが使うメソッドを、指定した遅延・429 の注入率・予約済みメッセージのフィクスチャ付きで返す。
+WebClient の base_url を http://127.0.0.1:<port>/api/ にすると実際の HTTP 通信を含めて計測できる。
+app.py を SLACK_API_BASE_URL=http://127.0.0.1:8089/api/ で起動すれば、本番と同じ構成のままスタブに向けられる。
+呼び出し回数は GET /stats で取得できる。
+
+    cd GUIReminder
+    python -m benchmarks.slack_stub_server --port 8089 --latency 0.1 --rate-limit-ratio 0.05 --fixtures 30
+"""
+import argparse
+import itertools
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlparse
+
+from handlers.reminder_text import format_reminder_text
+
+# users.info・users.list で返すユーザーのタイムゾーン
+STUB_USER_TZ = "Asia/Tokyo"
+
+
+class StubState:
+    """
+    スタブが保持する予約済みメッセージと呼び出し回数（スレッドセーフ）
+    """
+
+    def __init__(self, fixtures_per_channel=0, fixture_channels=("C0BENCH",)):
+        self._lock = threading.Lock()
+        self._ids = itertools.count()
+        self.counts = {}
+        self.rate_limited = 0
+        # channel -> {scheduled_message_id: message}
+        self.scheduled = {}
+        now = int(time.time())
+        for channel in fixture_channels:
+            for i in range(fixtures_per_channel):
+                self._add(channel, now + 3600 * (i + 1), format_reminder_text("<@U0BENCH>", f"フィクスチャ {i}"))
+
+    def _add(self, channel, post_at, text):
+        scheduled_message_id = f"Q{next(self._ids):010d}"
+        self.scheduled.setdefault(channel, {})[scheduled_message_id] = {
+            "id": scheduled_message_id,
+            "channel_id": channel,
+            "post_at": int(post_at),
+            "date_created": int(time.time()),
+            "text": text,
+        }
+        return scheduled_message_id
+
+    def count(self, api_method):
+        with self._lock:
+            self.counts[api_method] = self.counts.get(api_method, 0) + 1
+
+    def count_rate_limited(self):
+        with self._lock:
+            self.rate_limited += 1
+
+    def total(self, exclude=("auth.test",)):
+        with self._lock:
+            return sum(v for k, v in self.counts.items() if k not in exclude)
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.counts)
+
+    def handle(self, api_method, args):
+        """
+        メソッドごとのレスポンス（dict）を返す
+        """
+        with self._lock:
+            if api_method == "auth.test":
+                return {"user_id": "UBOT", "bot_id": "BBOT", "team_id": "T0BENCH", "url": "https://bench.slack.com/"}
+            if api_method == "chat.scheduleMessage":
+                scheduled_message_id = self._add(args.get("channel"), args.get("post_at", 0), args.get("text", ""))
+                return {"channel": args.get("channel"), "scheduled_message_id": scheduled_message_id,
+                        "post_at": int(args.get("post_at", 0))}
+            if api_method == "chat.deleteScheduledMessage":
+                removed = self.scheduled.get(args.get("channel"), {}).pop(args.get("scheduled_message_id"), None)
+                return {} if removed else {"ok": False, "error": "invalid_scheduled_message_id"}
+            if api_method == "chat.scheduledMessages.list":
+                return self._list(args.get("channel"), args.get("cursor") or "", int(args.get("limit") or 100))
+            if api_method in ("views.open", "views.push", "views.update"):
+                return {"view": {"id": args.get("view_id") or f"V{next(self._ids):010d}",
+                                 "hash": f"{time.time():.6f}"}}
+            if api_method in ("chat.postMessage", "chat.postEphemeral"):
+                return {"channel": args.get("channel"), "ts": f"{time.time():.6f}"}
+            if api_method == "users.info":
+                return {"user": {"id": args.get("user"), "tz": STUB_USER_TZ}}
+            if api_method == "users.list":
+                return {"members": [{"id": "U0BENCH", "tz": STUB_USER_TZ}], "response_metadata": {"next_cursor": ""}}
+            return {}
+
+    def _list(self, channel, cursor, limit):
+        messages = sorted(self.scheduled.get(channel, {}).values(), key=lambda m: (m["post_at"], m["id"]))
+        start = int(cursor) if cursor else 0
+        page = messages[start:start + limit]
+        next_cursor = str(start + limit) if start + limit < len(messages) else ""
+        return {"scheduled_messages": page, "response_metadata": {"next_cursor": next_cursor}}
+
+
+class SlackStubServer:
+    """
+    StubState を HTTP で公開するサーバー
+    latency 秒（± jitter）待ってから返し、rate_limit_ratio の割合で 429 + Retry-After を返す
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, jitter=0.0, rate_limit_ratio=0.0, retry_after=1,
+                 fixtures_per_channel=0, fixture_channels=("C0BENCH",)):
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit_ratio = rate_limit_ratio
+        self.retry_after = retry_after
+        self.state = StubState(fixtures_per_channel, fixture_channels)
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/api/"
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, name="slack-stub", daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                api_method = urlparse(self.path).path.rsplit("/", 1)[-1]
+                args = dict(parse_qsl(urlparse(self.path).query))
+                length = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(length).decode("utf-8") if length else ""
+                if raw:
+                    if "json" in (self.headers.get("Content-Type") or ""):
+                        args.update(json.loads(raw))
+                    else:
+                        args.update(parse_qsl(raw))
+
+                delay = stub.latency + random.uniform(-stub.jitter, stub.jitter)
+                if delay > 0:
+                    time.sleep(delay)
+                stub.state.count(api_method)
+                if api_method != "auth.test" and random.random() < stub.rate_limit_ratio:
+                    stub.state.count_rate_limited()
+                    self._send(429, {"ok": False, "error": "ratelimited"}, {"Retry-After": str(stub.retry_after)})
+                    return
+                data = {"ok": True, **stub.state.handle(api_method, args)}
+                self._send(200, data)
+
+            def do_GET(self):
+                # GET /stats で呼び出し回数を返す（別プロセスのベンチマークから読む）
+                if urlparse(self.path).path == "/stats":
+                    self._send(200, {"counts": stub.state.snapshot(), "total": stub.state.total(),
+                                     "rate_limited": stub.state.rate_limited})
+                    return
+                self.do_POST()
+
+            def _send(self, status, data, headers=None):
+                payload = json.dumps(data).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(payload)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", type=float, default=0.1, help="1 呼び出しあたりの遅延（秒）")
+    parser.add_argument("--jitter", type=float, default=0.0, help="遅延のばらつき（± 秒）")
+    parser.add_argument("--rate-limit-ratio", type=float, default=0.0, help="429 を返す割合（0〜1）")
+    parser.add_argument("--retry-after", type=int, default=1, help="429 の Retry-After（秒）")
+    parser.add_argument("--fixtures", type=int, default=0, help="C0BENCH に最初から予約されているメッセージ数")
+    args = parser.parse_args()
+
+    server = SlackStubServer(
+        args.host, args.port, args.latency, args.jitter, args.rate_limit_ratio, args.retry_after, args.fixtures
+    ).start()
+    print(f"Slack API stub is running on {server.base_url}")
+    try:
+        while True:
+            time.sleep(5)
+            print(json.dumps(server.state.snapshot(), ensure_ascii=False))
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""
+起動から最初の ack までの時間（コールドスタート）のベンチマーク
+
+app.py を SERVE_MODE=http・WEB_CONCURRENCY=1 の別プロセスで起動し、ローカルの Slack Web API スタブに向けたまま
+/set-reminder を送り続けて、プロセスの起動から最初の 200 応答までの時間を --runs 回測る。
+--output で結果をコミットハッシュ付きの 1 行 JSON として追記し、--baseline に過去の結果のファイルを渡すと
+同じモードの直近の結果より p50 が --max-regression（割合）を超えて遅くなった場合に終了コード 1 で終わる。
+
+    cd GUIReminder
+    python -m benchmarks.startup_bench --runtime sync --runs 5 --output benchmarks/startup.jsonl
+    python -m benchmarks.startup_bench --runtime async --baseline benchmarks/startup.jsonl
+
+--app-dir に別のチェックアウト（git worktree など）の GUIReminder を指定すると、そのコードの起動時間を測れる。
+import の内訳は python app.py --startup-report で確認する。
+"""
+import argparse
+import datetime
+import http.client
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks import payloads
+from benchmarks.http_bench import SIGNING_SECRET, encode_body, git_commit, signed_headers
+from benchmarks.runtime_bench import percentile
+from benchmarks.slack_stub_server import SlackStubServer
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def post_first_command(port):
+    """
+    /set-reminder を 1 件送る。まだ待ち受けていなければ None を返す
+    """
+    body = encode_body(payloads.slash_command("/set-reminder"))
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    try:
+        connection.request("POST", "/slack/events", body=body.encode("utf-8"), headers=signed_headers(body))
+        response = connection.getresponse()
+        response.read()
+        return response.status
+    except (ConnectionRefusedError, ConnectionResetError, http.client.RemoteDisconnected):
+        return None
+    finally:
+        connection.close()
+
+
+def measure_once(runtime, stub_url, app_dir=APP_DIR, timeout=60):
+    """
+    app.py を起動し、最初の ack までの秒数と、待ち受けを始めるまでの秒数を返す
+    """
+    port = free_port()
+    db_dir = tempfile.mkdtemp(prefix="startup-bench-")
+    env = dict(
+        os.environ,
+        SERVE_MODE="http",
+        RUNTIME_MODE=runtime,
+        WEB_CONCURRENCY="1",
+        PORT=str(port),
+        METRICS_PORT="0",
+        SLACK_API_BASE_URL=stub_url,
+        SLACK_BOT_TOKEN="xoxb-bench",
+        SLACK_SIGNING_SECRET=SIGNING_SECRET,
+        REMINDER_DB_PATH=os.path.join(db_dir, "reminders.db"),
+        JOBS_LOCK_PATH=os.path.join(db_dir, "jobs.lock"),
+    )
+    with tempfile.TemporaryFile() as log:
+        started_at = time.perf_counter()
+        process = subprocess.Popen(
+            [sys.executable, "app.py"], cwd=app_dir, env=env, stdout=log, stderr=subprocess.STDOUT
+        )
+        try:
+            listen_s = None
+            while True:
+                status = post_first_command(port)
+                elapsed = time.perf_counter() - started_at
+                if status is not None and listen_s is None:
+                    listen_s = elapsed
+                if status == 200:
+                    return elapsed, listen_s
+                if process.poll() is not None or elapsed > timeout:
+                    log.seek(0)
+                    raise RuntimeError(
+                        f"最初の ack を受け取れませんでした（status={status}）:\n"
+                        f"{log.read().decode('utf-8', 'replace')[-2000:]}"
+                    )
+                time.sleep(0.005)
+        finally:
+            process.send_signal(signal.SIGTERM)
+            try:
+                process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+
+
+def find_baseline(path, runtime):
+    """
+    過去の結果のファイルから、同じモードの直近の結果を返す
+    """
+    if not path or not os.path.exists(path):
+        return None
+    baseline = None
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                result = json.loads(line)
+                if result.get("runtime") == runtime:
+                    baseline = result
+    return baseline
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runtime", choices=("sync", "async"), default="sync", help="RUNTIME_MODE")
+    parser.add_argument("--runs", type=int, default=5, help="起動を繰り返す回数")
+    parser.add_argument("--latency", type=float, default=0.0, help="Slack API 1 呼び出しあたりの遅延（秒）")
+    parser.add_argument("--app-dir", default=APP_DIR, help="起動する app.py のあるディレクトリ")
+    parser.add_argument("--output", help="結果を 1 行 JSON で追記するファイル")
+    parser.add_argument("--baseline", help="比較する過去の結果のファイル（--output と同じ形式）")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="許容する p50 の悪化の割合")
+    args = parser.parse_args()
+
+    stub = SlackStubServer(latency=args.latency).start()
+    try:
+        # 最初の 1 回は .pyc の生成などを含むため捨てる
+        measure_once(args.runtime, stub.base_url, args.app_dir)
+        samples = [measure_once(args.runtime, stub.base_url, args.app_dir) for _ in range(args.runs)]
+    finally:
+        stub.stop()
+
+    first_ack = [ack for ack, _ in samples]
+    listen = [listen_s for _, listen_s in samples]
+    result = {
+        "runtime": args.runtime,
+        "runs": args.runs,
+        "first_ack_p50_ms": percentile(first_ack, 50) * 1000,
+        "first_ack_min_ms": min(first_ack) * 1000,
+        "first_ack_max_ms": max(first_ack) * 1000,
+        "listen_p50_ms": percentile(listen, 50) * 1000,
+        "latency": args.latency,
+        "commit": git_commit(),
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+    }
+    print(
+        f"startup ({args.runtime}) @ {result['commit']}: runs={args.runs}\n"
+        f"  first ack p50 {result['first_ack_p50_ms']:.0f}ms / min {result['first_ack_min_ms']:.0f}ms / "
+        f"max {result['first_ack_max_ms']:.0f}ms, listening after {result['listen_p50_ms']:.0f}ms"
+    )
+
+    baseline = find_baseline(args.baseline, args.runtime)
+    if args.output:
+        with open(args.output, "a", encoding="utf-8") as f:
+            f.write(json.dumps(result, ensure_ascii=False) + "\n")
+    if baseline is not None:
+        ratio = result["first_ack_p50_ms"] / baseline["first_ack_p50_ms"] - 1
+        print(f"  baseline {baseline['commit']}: {baseline['first_ack_p50_ms']:.0f}ms（{ratio:+.1%}）")
+        if ratio > args.max_regression:
+            print(f"  起動時間が {args.max_regression:.0%} を超えて悪化しました")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
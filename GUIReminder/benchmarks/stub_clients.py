@@ -0,0 +1,77 @@
+"""
+Slack API を呼ばずに一定の遅延だけを再現する WebClient / AsyncWebClient
+"""
+import asyncio
+import itertools
+import threading
+import time
+
+from slack_sdk import WebClient
+from slack_sdk.web.async_client import AsyncWebClient
+from slack_sdk.web.async_slack_response import AsyncSlackResponse
+from slack_sdk.web.slack_response import SlackResponse
+
+
+_ids = itertools.count()
+
+
+def _fake_data(api_method):
+    data = {"ok": True}
+    if api_method == "auth.test":
+        data.update({"user_id": "UBOT", "bot_id": "BBOT", "team_id": "T0BENCH", "url": "https://bench.slack.com/"})
+    elif api_method == "chat.scheduleMessage":
+        data.update({"scheduled_message_id": f"Q{next(_ids):010d}"})
+    elif api_method == "chat.scheduledMessages.list":
+        data.update({"scheduled_messages": [], "response_metadata": {"next_cursor": ""}})
+    elif api_method in ("views.open", "views.update"):
+        data.update({"view": {"id": f"V{next(_ids):010d}", "hash": f"{time.time():.6f}"}})
+    elif api_method == "chat.postMessage":
+        data.update({"ts": f"{time.time():.6f}"})
+    return data
+
+
+class CallCounter:
+    """
+    メソッドごとの API 呼び出し回数（スレッドセーフ）
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = {}
+
+    def incr(self, api_method):
+        with self._lock:
+            self.counts[api_method] = self.counts.get(api_method, 0) + 1
+
+    def total(self, exclude=("auth.test",)):
+        return sum(v for k, v in self.counts.items() if k not in exclude)
+
+
+class StubWebClient(WebClient):
+    def __init__(self, latency=0.2, counter=None, **kwargs):
+        super().__init__(token="xoxb-bench", **kwargs)
+        self.latency = latency
+        self.counter = counter or CallCounter()
+
+    def api_call(self, api_method, **kwargs):
+        time.sleep(self.latency)
+        self.counter.incr(api_method)
+        return SlackResponse(
+            client=self, http_verb="POST", api_url=api_method, req_args=kwargs,
+            data=_fake_data(api_method), headers={}, status_code=200,
+        )
+
+
+class StubAsyncWebClient(AsyncWebClient):
+    def __init__(self, latency=0.2, counter=None, **kwargs):
+        super().__init__(token="xoxb-bench", **kwargs)
+        self.latency = latency
+        self.counter = counter or CallCounter()
+
+    async def api_call(self, api_method, **kwargs):
+        await asyncio.sleep(self.latency)
+        self.counter.incr(api_method)
+        return AsyncSlackResponse(
+            client=self, http_verb="POST", api_url=api_method, req_args=kwargs,
+            data=_fake_data(api_method), headers={}, status_code=200,
+        )
@@ -0,0 +1,141 @@
+"""
+モーダルのビュー生成のベンチマーク
+
+毎回 dict を組み立てる従来の build_*_modal と、起動時に組み立てた ViewTemplate の
+render / render_json を比べ、1 回あたりの時間と確保メモリ（tracemalloc）を測る。
+json 列は views.open 送信時のシリアライズ（json.dumps）まで含めた時間。
+
+    cd GUIReminder
+    python -m benchmarks.view_bench --number 20000
+"""
+import argparse
+import json
+import timeit
+import tracemalloc
+
+from handlers.commands import set_reminder, set_schedule
+from handlers.recurrence import build_recurrence_blocks
+from handlers.views import generate_minute_options, get_next_minute_interval
+
+
+def legacy_reminder_modal(trigger_channel_id):
+    """
+    テンプレート化する前の build_reminder_modal（オプションと全ブロックを毎回生成する）
+    """
+    initial_date, initial_hour, initial_minute = get_next_minute_interval()
+    minute_options = generate_minute_options()
+    hour_options = [
+        {"text": {"type": "plain_text", "text": f"{h:02d}時"}, "value": f"{h:02d}"}
+        for h in range(24)
+    ]
+    return {
+        "type": "modal",
+        "callback_id": "reminder_submission",
+        "private_metadata": trigger_channel_id,
+        "title": {"type": "plain_text", "text": "🔔 リマインダー設定"},
+        "submit": {"type": "plain_text", "text": "予約する"},
+        "blocks": [
+            {
+                "type": "input",
+                "block_id": "message_block",
+                "label": {"type": "plain_text", "text": "リマインド内容"},
+                "element": {"type": "plain_text_input", "action_id": "message_input", "multiline": True}
+            },
+            {
+                "type": "input",
+                "block_id": "date_block",
+                "label": {"type": "plain_text", "text": "日付 を選択"},
+                "element": {
+                    "type": "datepicker",
+                    "action_id": "date_input",
+                    "initial_date": initial_date,
+                    "placeholder": {"type": "plain_text", "text": "日付を選択"}
+                }
+            },
+            {
+                "type": "input",
+                "block_id": "hour_block",
+                "label": {"type": "plain_text", "text": "時間 を選択"},
+                "element": {
+                    "type": "static_select",
+                    "action_id": "hour_select",
+                    "options": hour_options,
+                    "initial_option": next(opt for opt in hour_options if opt['value'] == initial_hour),
+                }
+            },
+            {
+                "type": "input",
+                "block_id": "minute_block",
+                "label": {"type": "plain_text", "text": "分 を選択"},
+                "element": {
+                    "type": "static_select",
+                    "action_id": "minute_select",
+                    "options": minute_options,
+                    "initial_option": next(opt for opt in minute_options if opt['value'] == initial_minute),
+                }
+            },
+            {
+                "type": "input",
+                "block_id": "user_block",
+                "optional": True,
+                "label": {"type": "plain_text", "text": "メンション"},
+                "element": {
+                    "type": "multi_users_select",
+                    "action_id": "user_select_input",
+                    "placeholder": {"type": "plain_text", "text": "メンションするユーザーを選択"}
+                }
+            },
+            *build_recurrence_blocks()
+        ]
+    }
+
+
+def measure(fn, number):
+    """
+    1 回あたりの時間（µs）と確保ブロック数・バイト数を返す
+    """
+    fn()
+    seconds = min(timeit.repeat(fn, number=number, repeat=3)) / number
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    result = fn()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    diff = after.compare_to(before, "filename")
+    blocks = sum(d.count_diff for d in diff if d.count_diff > 0)
+    size = sum(d.size_diff for d in diff if d.size_diff > 0)
+    del result
+    return seconds * 1e6, blocks, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", type=int, default=20000)
+    args = parser.parse_args()
+
+    channel = "C0BENCH"
+    reminder_fields = lambda: set_reminder.reminder_modal_fields(channel)
+    schedule_fields = lambda: set_schedule.schedule_modal_fields(channel)
+
+    # テンプレートの出力が従来の組み立てと同じであることを確認してから測る
+    legacy = legacy_reminder_modal(channel)
+    assert set_reminder.build_reminder_modal(channel) == legacy
+    assert json.loads(set_reminder.REMINDER_MODAL.render_json(**reminder_fields())) == legacy
+
+    cases = [
+        ("reminder legacy dict", lambda: legacy_reminder_modal(channel)),
+        ("reminder template dict", lambda: set_reminder.REMINDER_MODAL.render(**reminder_fields())),
+        ("reminder legacy json", lambda: json.dumps(legacy_reminder_modal(channel))),
+        ("reminder template json", lambda: json.dumps(set_reminder.REMINDER_MODAL.render(**reminder_fields()))),
+        ("reminder preserialized", lambda: set_reminder.REMINDER_MODAL.render_json(**reminder_fields())),
+        ("schedule template dict", lambda: set_schedule.SCHEDULE_MODAL.render(**schedule_fields())),
+        ("schedule preserialized", lambda: set_schedule.SCHEDULE_MODAL.render_json(**schedule_fields())),
+    ]
+    print(f"{'case':<26} {'time/call':>12} {'alloc blocks':>13} {'alloc bytes':>12}")
+    for name, fn in cases:
+        micros, blocks, size = measure(fn, args.number)
+        print(f"{name:<26} {micros:>10.1f}µs {blocks:>13} {size:>12}")
+
+
+if __name__ == "__main__":
+    main()
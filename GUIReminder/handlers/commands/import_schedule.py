@@ -0,0 +1,517 @@
+import io
+import re
+import csv
+import asyncio
+import datetime
+import urllib.request
+from itertools import islice
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from slack_sdk.errors import SlackApiError
+
+from handlers.commands.set_schedule import (
+    OFFSET_LABELS,
+    OFFSET_VALUE_BY_NAME,
+    build_schedule_texts,
+    parse_offset,
+    validate_schedule_submission
+)
+from handlers.config import config
+from handlers.delivery import schedule_messages
+from handlers.reminder_text import KIND_SCHEDULE
+from handlers.slack_client import RateLimitedWebClient, workspace_of
+from handlers.user_timezones import user_timezones
+from handlers.worker_pool import bulk_job_pool
+
+# 1 回の取り込みで読み込む最大の予定数（超えた分は読まずに完了メッセージで知らせる）
+IMPORT_MAX_ROWS = config.import_max_rows
+# 何件ずつ予約して進捗メッセージを更新するか
+IMPORT_BATCH_SIZE = config.import_batch_size
+# 完了メッセージに載せるエラーの最大件数
+MAX_REPORTED_ERRORS = 20
+# iCalendar の終日の予定をリマインドする時刻
+ALL_DAY_TIME = datetime.time(9, 0)
+# ファイルのダウンロードのタイムアウト（秒）
+DOWNLOAD_TIMEOUT = 30
+# この予約の失敗は他の行でも同じになるため、残りを予約せずに取り込みを止める
+FATAL_ERRORS = {
+    "not_in_channel", "channel_not_found", "is_archived", "invalid_auth", "token_revoked", "account_inactive",
+    "missing_scope",
+}
+
+# CSV の見出し（details・offsets の列は省略できる）
+CSV_REQUIRED_COLUMNS = ("date", "time", "title")
+# iCalendar の VALARM の TRIGGER（-PT15M など）
+TRIGGER_PATTERN = re.compile(r"^-P(?:(\d+)W)?(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?$")
+ICS_ESCAPE_PATTERN = re.compile(r"\\([\\;,nN])")
+
+FORMAT_HELP = (
+    "*CSV*: 1 行目に `date,time,title,details,offsets` の見出しを付けてください。\n"
+    "date は `2026-04-01`、time は `10:00`、offsets は `-1h -15m`（または `1時間前 15分前`）のように空白区切りで指定します。\n"
+    "*iCalendar (.ics)*: 各予定の開始日時・件名・説明と、通知（15分前・1時間前など）を事前通知として取り込みます。"
+    "繰り返しの予定は取り込めません。"
+)
+
+
+class ImportFormatError(Exception):
+    """
+    ファイル全体を読めない（見出しが無い・形式が分からないなど）場合のエラー
+    """
+
+
+def build_import_modal(channel_id):
+    """
+    /import-schedule のモーダル（ファイルを 1 つ選ぶだけのため、テンプレートにはしない）
+    """
+    return {
+        "type": "modal",
+        "callback_id": "import_schedule_submission",
+        "private_metadata": channel_id,
+        "title": {"type": "plain_text", "text": "📥 スケジュール一括登録"},
+        "submit": {"type": "plain_text", "text": "取り込む"},
+        "blocks": [
+            {"type": "section", "text": {"type": "mrkdwn", "text": FORMAT_HELP}},
+            {
+                "type": "input",
+                "block_id": "file_block",
+                "label": {"type": "plain_text", "text": "CSV / iCalendar ファイル"},
+                "element": {
+                    "type": "file_input",
+                    "action_id": "file_input",
+                    "filetypes": ["csv", "ics"],
+                    "max_files": 1
+                }
+            }
+        ]
+    }
+
+
+def parse_offset_names(text):
+    """
+    CSV の offsets の列を事前通知の値のリストにする（対応していないものがあれば None）
+    """
+    offset_vals = []
+    for name in re.split(r"[\s,;/]+", text.strip()):
+        if not name:
+            continue
+        offset_val = OFFSET_VALUE_BY_NAME.get(name)
+        if offset_val is None:
+            return None
+        offset_vals.append(offset_val)
+    return offset_vals
+
+
+def read_csv_events(lines, tz=None):
+    """
+    CSV を 1 行ずつ読み、予定ごとに (行番号, 予定, エラー) を返す
+    予定は {"start", "title", "message", "offsets"}。読めない行は予定の代わりにエラーの文言を返す
+    日時は取り込んだユーザーのタイムゾーン tz（None はサーバーのローカルタイム）で解釈する
+    """
+    reader = csv.reader(lines)
+    header = next(reader, None)
+    if header is None:
+        raise ImportFormatError("ファイルが空です。")
+    columns = {name.strip().lower(): i for i, name in enumerate(header)}
+    missing = [name for name in CSV_REQUIRED_COLUMNS if name not in columns]
+    if missing:
+        raise ImportFormatError(f"1 行目の見出しに {', '.join(missing)} の列がありません。")
+
+    def cell(row, name):
+        i = columns.get(name)
+        return row[i].strip() if i is not None and i < len(row) else ""
+
+    for row in reader:
+        line_no = reader.line_num
+        if not any(value.strip() for value in row):
+            continue
+        try:
+            start = datetime.datetime.strptime(f"{cell(row, 'date')} {cell(row, 'time')}", "%Y-%m-%d %H:%M")
+            start = start.replace(tzinfo=tz)
+        except ValueError:
+            yield line_no, None, "日時は date を YYYY-MM-DD、time を HH:MM で指定してください。"
+            continue
+        offset_vals = parse_offset_names(cell(row, "offsets"))
+        if offset_vals is None:
+            yield line_no, None, f"事前通知は {' / '.join(OFFSET_LABELS.values())} から指定してください。"
+            continue
+        yield line_no, {
+            "start": start,
+            "title": cell(row, "title"),
+            "message": cell(row, "details"),
+            "offsets": offset_vals,
+        }, None
+
+
+def unfold_ics_lines(lines):
+    """
+    iCalendar の折り返し（空白・タブで始まる行は前の行の続き）を戻し、(行番号, 1 行) を返す
+    """
+    pending, pending_no = None, 0
+    for line_no, line in enumerate(lines, 1):
+        line = line.rstrip("\r\n")
+        if line[:1] in (" ", "\t") and pending is not None:
+            pending += line[1:]
+            continue
+        if pending is not None:
+            yield pending_no, pending
+        pending, pending_no = line, line_no
+    if pending is not None:
+        yield pending_no, pending
+
+
+def split_ics_property(line):
+    """
+    "NAME;PARAM=VALUE:値" を (NAME, {PARAM: VALUE}, 値) にする（パラメーターの "..." 内の : ; は区切りにしない）
+    """
+    quoted = False
+    for i, char in enumerate(line):
+        if char == '"':
+            quoted = not quoted
+        elif char == ":" and not quoted:
+            head, value = line[:i], line[i + 1:]
+            break
+    else:
+        return line.upper(), {}, ""
+    name, *params = re.split(r';(?=(?:[^"]*"[^"]*")*[^"]*$)', head)
+    return name.upper(), {
+        key.upper(): value.strip('"') for key, _, value in (param.partition("=") for param in params)
+    }, value
+
+
+def unescape_ics_text(value):
+    return ICS_ESCAPE_PATTERN.sub(lambda m: "\n" if m.group(1) in "nN" else m.group(1), value)
+
+
+def parse_ics_start(params, value, tz=None):
+    """
+    DTSTART を取り込んだユーザーのタイムゾーン tz（モーダルで入力した日時と同じ扱い）の datetime にする
+    終日の予定とタイムゾーンの無い日時は tz の日時として読む（tz が None ならサーバーのローカルタイム）
+    """
+    if params.get("VALUE") == "DATE" or len(value) == 8:
+        day = datetime.datetime.strptime(value, "%Y%m%d").date()
+        return datetime.datetime.combine(day, ALL_DAY_TIME).replace(tzinfo=tz)
+    start = datetime.datetime.strptime(value.rstrip("Z")[:15], "%Y%m%dT%H%M%S")
+    if value.endswith("Z"):
+        start = start.replace(tzinfo=datetime.timezone.utc)
+    elif "TZID" in params:
+        start = start.replace(tzinfo=ZoneInfo(params["TZID"]))
+    else:
+        return start.replace(tzinfo=tz)
+    if tz is not None:
+        return start.astimezone(tz)
+    return datetime.datetime.fromtimestamp(start.timestamp())
+
+
+def parse_ics_trigger(params, value):
+    """
+    VALARM の TRIGGER（開始の何分前か）を事前通知の値にする（対応していないものは None）
+    """
+    if params.get("VALUE") == "DATE-TIME" or params.get("RELATED") == "END":
+        return None
+    match = TRIGGER_PATTERN.match(value)
+    if not match:
+        return None
+    weeks, days, hours, minutes, seconds = (int(g or 0) for g in match.groups())
+    if seconds:
+        return None
+    total = ((weeks * 7 + days) * 24 + hours) * 60 + minutes
+    if total % (24 * 60) == 0:
+        offset_val = f"-{total // (24 * 60)}d"
+    elif total % 60 == 0:
+        offset_val = f"-{total // 60}h"
+    else:
+        offset_val = f"-{total}m"
+    return offset_val if offset_val in OFFSET_LABELS else None
+
+
+def read_ics_events(lines, tz=None):
+    """
+    iCalendar を 1 行ずつ読み、VEVENT ごとに (BEGIN:VEVENT の行番号, 予定, エラー) を返す（予定の形・tz は read_csv_events と同じ）
+    """
+    found_calendar = False
+    event = None
+    in_alarm = False
+    for line_no, line in unfold_ics_lines(lines):
+        name, params, value = split_ics_property(line)
+        if name == "BEGIN" and value.upper() == "VCALENDAR":
+            found_calendar = True
+        elif name == "BEGIN" and value.upper() == "VEVENT":
+            event = {"line_no": line_no, "start": None, "title": "", "message": "", "offsets": [], "error": None}
+        elif event is None:
+            continue
+        elif name == "BEGIN" and value.upper() == "VALARM":
+            in_alarm = True
+        elif name == "END" and value.upper() == "VALARM":
+            in_alarm = False
+        elif in_alarm:
+            if name == "TRIGGER":
+                offset_val = parse_ics_trigger(params, value)
+                if offset_val is None:
+                    event["error"] = f"通知は {' / '.join(OFFSET_LABELS.values())} のいずれかにしてください。"
+                else:
+                    event["offsets"].append(offset_val)
+        elif name == "DTSTART":
+            try:
+                event["start"] = parse_ics_start(params, value, tz)
+            except (ValueError, ZoneInfoNotFoundError):
+                event["error"] = f"開始日時 {value} を読み取れません。"
+        elif name == "SUMMARY":
+            event["title"] = unescape_ics_text(value).strip()
+        elif name == "DESCRIPTION":
+            event["message"] = unescape_ics_text(value).strip()
+        elif name in ("RRULE", "RDATE"):
+            event["error"] = "繰り返しの予定は取り込めません。/set-schedule で登録してください。"
+        elif name == "END" and value.upper() == "VEVENT":
+            line_no, error = event.pop("line_no"), event.pop("error")
+            if error is None and event["start"] is None:
+                error = "開始日時（DTSTART）がありません。"
+            yield line_no, None if error else event, error
+            event = None
+    if not found_calendar:
+        raise ImportFormatError("iCalendar（BEGIN:VCALENDAR）の形式ではありません。")
+
+
+def build_import_submission(channel_id, user_id, event):
+    """
+    取り込んだ予定を parse_schedule_submission と同じ形の登録内容にする
+    """
+    start = event["start"]
+    # 設定時刻に近い順（モーダルと同じ並び）
+    offset_vals = sorted(set(event["offsets"]), key=parse_offset, reverse=True)
+    return {
+        "channel_id": channel_id,
+        "title": event["title"],
+        "message": event["message"],
+        "user_id_setter": user_id,
+        "combined_dt_str": start.strftime("%Y-%m-%d %H:%M"),
+        "post_at": int(start.timestamp()),
+        "offset_vals": offset_vals,
+        "offset_post_ats": [int((start + parse_offset(v)).timestamp()) for v in offset_vals],
+        "recurrence_choice": None,
+        "recurrence": None,
+        "exdates": "",
+        "recurrence_errors": None,
+    }
+
+
+def validate_import_submission(submission):
+    """
+    /set-schedule のモーダルと同じ確認を行い、問題があればエラーの文言を返す
+    """
+    if not submission["title"]:
+        return "タイトルがありません。"
+    errors = validate_schedule_submission(submission)
+    if errors:
+        return " ".join(dict.fromkeys(message for message in errors.values() if message.strip()))
+    return None
+
+
+def detect_format(file):
+    name = (file.get("name") or "").lower()
+    filetype = (file.get("filetype") or "").lower()
+    if name.endswith((".ics", ".ical")) or filetype in ("ics", "ical", "calendar"):
+        return "ics"
+    if name.endswith(".csv") or filetype == "csv":
+        return "csv"
+    raise ImportFormatError("CSV（.csv）か iCalendar（.ics）のファイルを選択してください。")
+
+
+def open_file_lines(client, file):
+    """
+    アップロードされたファイルを 1 行ずつ読めるように開く（全体をメモリに読み込まない）
+    """
+    request = urllib.request.Request(
+        file["url_private_download"], headers={"Authorization": f"Bearer {client.token}"}
+    )
+    response = urllib.request.urlopen(request, timeout=DOWNLOAD_TIMEOUT)
+    return io.TextIOWrapper(response, encoding="utf-8-sig", newline="")
+
+
+def format_import_progress(file_name, user_id, stats, done=False, note=""):
+    """
+    進捗・完了メッセージの本文
+    """
+    header = "【 📥 スケジュール一括登録 】" + ("完了" if done else "取り込み中…")
+    lines = [
+        header,
+        f"<@{user_id}> が {file_name} からスケジュールを登録{'しました' if done else 'しています'}。",
+        f"登録 {stats['scheduled']} 件 / エラー {len(stats['errors'])} 件（読み込み {stats['read']} 件）",
+    ]
+    if note:
+        lines.append(note)
+    if done and stats["errors"]:
+        lines.extend(f"・{line_no} 行目: {error}" for line_no, error in stats["errors"][:MAX_REPORTED_ERRORS])
+        if len(stats["errors"]) > MAX_REPORTED_ERRORS:
+            lines.append(f"ほか {len(stats['errors']) - MAX_REPORTED_ERRORS} 件")
+    return "\n".join(lines)
+
+
+class ImportJob:
+    """
+    1 回の一括登録
+    ファイルを読みながら 1 件ずつ検証し、正しい予定を IMPORT_BATCH_SIZE 件ずつ予約して、そのたびに 1 つの進捗メッセージを更新する
+    予約の間隔は RateLimitedWebClient のレート制限が決める（待つのは取り込み用のスレッドで、リスナーやワーカープールは待たない）
+    """
+
+    def __init__(self, client, channel_id, user_id, file_id, logger):
+        self.client = client
+        self.channel_id = channel_id
+        self.user_id = user_id
+        self.file_id = file_id
+        self.logger = logger
+        self.file_name = file_id
+        self.message_ts = None
+        self.stats = {"read": 0, "scheduled": 0, "errors": []}
+
+    def run(self):
+        note = ""
+        try:
+            file = self.client.files_info(file=self.file_id)["file"]
+            self.file_name = file.get("name") or self.file_id
+            read_events = read_ics_events if detect_format(file) == "ics" else read_csv_events
+            # ファイルの日時は取り込んだユーザーのタイムゾーンで解釈する
+            tz = user_timezones.resolve(self.client, self.user_id)
+            self.message_ts = self.client.chat_postMessage(
+                channel=self.channel_id, text=format_import_progress(self.file_name, self.user_id, self.stats)
+            )["ts"]
+            with open_file_lines(self.client, file) as lines:
+                events = read_events(lines, tz)
+                while self.stats["read"] < IMPORT_MAX_ROWS:
+                    batch = list(islice(events, min(IMPORT_BATCH_SIZE, IMPORT_MAX_ROWS - self.stats["read"])))
+                    if not batch:
+                        break
+                    self.schedule_batch(batch)
+                    self.report()
+                else:
+                    if next(events, None) is not None:
+                        note = f"{IMPORT_MAX_ROWS} 件を超えた分は読み込んでいません。ファイルを分けて取り込んでください。"
+        except ImportFormatError as e:
+            note = f"ファイルを読み込めませんでした: {e}"
+        except (SlackApiError, OSError, UnicodeDecodeError, csv.Error) as e:
+            error = e.response["error"] if isinstance(e, SlackApiError) else e
+            self.logger.error(f"スケジュールの一括登録に失敗しました: {error}")
+            note = f"一括登録を中断しました: `{error}`"
+        self.report(done=True, note=note)
+
+    def schedule_batch(self, batch):
+        """
+        1 回分の予定を検証して予約する（事前通知を含む 1 件の予約は全件成功か全件取り消し）
+        """
+        for line_no, event, error in batch:
+            self.stats["read"] += 1
+            if error is None:
+                submission = build_import_submission(self.channel_id, self.user_id, event)
+                # 予約の直前に確かめる（取り込み中に過ぎた日時も弾く）
+                error = validate_import_submission(submission)
+            if error is not None:
+                self.stats["errors"].append((line_no, error))
+                continue
+            reminder_text, _ = build_schedule_texts(submission)
+            post_ats = [submission["post_at"], *submission["offset_post_ats"]]
+            try:
+                schedule_messages(
+                    self.client, self.channel_id, [(post_at, reminder_text) for post_at in post_ats],
+                    setter=self.user_id, title=submission["title"], body=submission["message"], kind=KIND_SCHEDULE
+                )
+            except SlackApiError as e:
+                if e.response["error"] in FATAL_ERRORS:
+                    raise
+                self.stats["errors"].append((line_no, f"予約できませんでした（{e.response['error']}）"))
+                continue
+            self.stats["scheduled"] += 1
+
+    def report(self, done=False, note=""):
+        text = format_import_progress(self.file_name, self.user_id, self.stats, done=done, note=note)
+        try:
+            if self.message_ts:
+                self.client.chat_update(channel=self.channel_id, ts=self.message_ts, text=text)
+            elif done:
+                # 進捗メッセージを投稿する前に失敗した場合は本人にだけ知らせる
+                self.client.chat_postEphemeral(channel=self.channel_id, user=self.user_id, text=text)
+        except SlackApiError as e:
+            self.logger.error(f"一括登録の進捗メッセージを更新できませんでした: {e.response['error']}")
+
+
+def parse_import_submission(body):
+    """
+    モーダル送信内容から (チャンネルID, 設定したユーザー, ファイルID) を取り出す
+    """
+    files = body["view"]["state"]["values"]["file_block"]["file_input"].get("files") or []
+    return body["view"]["private_metadata"], body["user"]["id"], files[0]["id"] if files else None
+
+
+def start_import(client, channel_id, user_id, file_id, logger):
+    """
+    取り込みを専用のプールで開始する（数千件の取り込みでも通常のワーカーを占有しない）
+    """
+    bulk_job_pool.submit(ImportJob(client, channel_id, user_id, file_id, logger).run)
+
+
+def register(app):
+
+
+    @app.command("/import-schedule")
+    def open_import_modal(ack, body, client):
+        """
+        スラッシュコマンド処理：ファイルを選ぶモーダルの表示
+        """
+
+        ack()
+        try:
+            client.views_open(trigger_id=body["trigger_id"], view=build_import_modal(body.get("channel_id")))
+        except Exception as e:
+            print(f"Error opening view: {e}")
+
+
+    @app.view("import_schedule_submission")
+    def handle_import_submission(ack, body, client, logger):
+        """
+        モーダル送信処理：ファイルの有無だけを確かめて ack し、読み込み・予約は取り込み用のプールで実行する
+        """
+
+        channel_id, user_id, file_id = parse_import_submission(body)
+        if file_id is None:
+            ack(response_action="errors", errors={"file_block": "ファイルを選択してください。"})
+            return
+
+        ack()
+        start_import(client, channel_id, user_id, file_id, logger)
+
+
+def register_async(app):
+    """
+    AsyncApp 向けの登録
+    取り込みは長時間かかりイベントループで行う利点が無いため、同期モードと同じ ImportJob をスレッドで実行する
+    """
+
+
+    @app.command("/import-schedule")
+    async def open_import_modal(ack, body, client):
+        """
+        スラッシュコマンド処理：ファイルを選ぶモーダルの表示
+        """
+
+        await ack()
+        try:
+            await client.views_open(trigger_id=body["trigger_id"], view=build_import_modal(body.get("channel_id")))
+        except Exception as e:
+            print(f"Error opening view: {e}")
+
+
+    @app.view("import_schedule_submission")
+    async def handle_import_submission(ack, body, client, logger):
+        """
+        モーダル送信処理：ファイルの有無だけを確かめて ack し、読み込み・予約は取り込み用のプールで実行する
+        """
+
+        channel_id, user_id, file_id = parse_import_submission(body)
+        if file_id is None:
+            await ack(response_action="errors", errors={"file_block": "ファイルを選択してください。"})
+            return
+
+        await ack()
+        # スレッドで使う同期の WebClient（同じワークスペースのトークン・レート制限を使う）
+        worker_client = RateLimitedWebClient(
+            token=client.token, base_url=client.base_url, workspace_id=workspace_of(client)
+        )
+        # プールが一杯のときに submit が待ってもイベントループを止めない
+        await asyncio.to_thread(start_import, worker_client, channel_id, user_id, file_id, logger)
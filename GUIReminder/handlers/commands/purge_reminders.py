@@ -0,0 +1,335 @@
+import json
+import time
+import asyncio
+import datetime
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from slack_sdk.errors import SlackApiError
+
+from handlers.commands.show_reminder_list import build_notice_view, format_post_at
+from handlers.config import config
+from handlers.delivery import cancel_message
+from handlers.list_cache import listing_cache
+from handlers.reminder_store import reminder_store, reconcile_channel, reconcile_channel_async
+from handlers.slack_client import RateLimitedWebClient, workspace_of
+from handlers.user_timezones import user_timezones, zone, zone_name
+from handlers.worker_pool import worker_pool, async_worker_pool, bulk_job_pool
+
+# 同時に chat.deleteScheduledMessage を呼ぶ数（間隔はレート制限が決めるため、通信の待ちを重ねられれば十分）
+PURGE_CONCURRENCY = config.purge_concurrency
+# 何件削除するごとに進捗メッセージを更新するか
+PURGE_BATCH_SIZE = config.purge_batch_size
+# 確認モーダルに載せる予約の件数
+PREVIEW_SIZE = 5
+# 配信済み・削除済みの予約。ストアから消すだけでよい
+GONE_ERRORS = {"invalid_scheduled_message_id"}
+
+
+def build_purge_filter_modal(channel_id):
+    """
+    /purge-reminders の条件を入力するモーダル
+    """
+    return {
+        "type": "modal",
+        "callback_id": "purge_filter_submission",
+        "private_metadata": channel_id,
+        "title": {"type": "plain_text", "text": "🗑️ リマインダー一括削除"},
+        "submit": {"type": "plain_text", "text": "件数を確認"},
+        "blocks": [
+            {
+                "type": "section",
+                "text": {
+                    "type": "mrkdwn",
+                    "text": f"<#{channel_id}> の予約のうち、条件に合うものをまとめて削除します。\n空欄の条件では絞り込みません。"
+                }
+            },
+            {
+                "type": "input",
+                "block_id": "setter_block",
+                "optional": True,
+                "label": {"type": "plain_text", "text": "設定したユーザー"},
+                "element": {"type": "users_select", "action_id": "setter_select"}
+            },
+            {
+                "type": "input",
+                "block_id": "from_block",
+                "optional": True,
+                "label": {"type": "plain_text", "text": "期間（開始日）"},
+                "element": {"type": "datepicker", "action_id": "from_input"}
+            },
+            {
+                "type": "input",
+                "block_id": "to_block",
+                "optional": True,
+                "label": {"type": "plain_text", "text": "期間（終了日）"},
+                "element": {"type": "datepicker", "action_id": "to_input"}
+            },
+            {
+                "type": "input",
+                "block_id": "text_block",
+                "optional": True,
+                "label": {"type": "plain_text", "text": "内容に含む文字列"},
+                "element": {"type": "plain_text_input", "action_id": "text_input", "max_length": 100}
+            }
+        ]
+    }
+
+
+def parse_purge_filters(body, tz=None):
+    """
+    条件のモーダルの送信内容を {"channel", "setter", "from", "to", "text", "tz"} にする
+    日付は送信したユーザーのタイムゾーン tz の日付として扱う（確認後に検索し直すときも同じにするため名前で持つ）
+    """
+    values = body["view"]["state"]["values"]
+    return {
+        "channel": body["view"]["private_metadata"],
+        "setter": values["setter_block"]["setter_select"].get("selected_user") or "",
+        "from": values["from_block"]["from_input"].get("selected_date") or "",
+        "to": values["to_block"]["to_input"].get("selected_date") or "",
+        "text": (values["text_block"]["text_input"].get("value") or "").strip(),
+        "tz": zone_name(tz),
+    }
+
+
+def validate_purge_filters(filters):
+    if filters["from"] and filters["to"] and filters["from"] > filters["to"]:
+        return {"to_block": "終了日は開始日以降の日付を選択してください。"}
+    return None
+
+
+def purge_range(filters):
+    """
+    条件の期間を [since, until) のタイムスタンプにする（終了日はその日の終わりまで。未指定なら until は None）
+    """
+    tz = zone(filters.get("tz"))
+    since = int(time.time())
+    if filters["from"]:
+        start = datetime.datetime.strptime(filters["from"], "%Y-%m-%d").replace(tzinfo=tz)
+        since = max(since, int(start.timestamp()))
+    until = None
+    if filters["to"]:
+        end = datetime.datetime.strptime(filters["to"], "%Y-%m-%d").replace(tzinfo=tz) + datetime.timedelta(days=1)
+        until = int(end.timestamp())
+    return since, until
+
+
+def search_args(filters):
+    since, until = purge_range(filters)
+    return {
+        "channel": filters["channel"], "setter": filters["setter"] or None, "since": since, "until": until,
+        "text": filters["text"] or None,
+    }
+
+
+def describe_filters(filters):
+    conditions = []
+    if filters["setter"]:
+        conditions.append(f"設定したユーザー: <@{filters['setter']}>")
+    if filters["from"] or filters["to"]:
+        conditions.append(f"期間: {filters['from'] or '今'} 〜 {filters['to'] or ''}")
+    if filters["text"]:
+        conditions.append(f"内容に「{filters['text']}」を含む")
+    return " / ".join(conditions) or "すべての予約"
+
+
+def build_purge_confirmation_view(filters, count, samples):
+    """
+    削除する件数と先頭の数件を表示する確認モーダル（条件は private_metadata に持ち、削除時に検索し直す）
+    """
+    lines = [f"<#{filters['channel']}> の *{count} 件* の予約を削除します。この操作は取り消せません。",
+             f"*条件*: {describe_filters(filters)}", ""]
+    tz = zone(filters.get("tz"))
+    for reminder in samples:
+        preview = (reminder.title or reminder.body or "").replace("\n", " ")
+        lines.append(f"・{format_post_at(reminder.post_at, tz)} {preview[:40]}")
+    if count > len(samples):
+        lines.append(f"ほか {count - len(samples)} 件")
+    if not filters["to"]:
+        lines.append("\n繰り返しのリマインダーは、以降の回も予約されなくなります。")
+    return {
+        "type": "modal",
+        "callback_id": "purge_confirmation",
+        "private_metadata": json.dumps(filters),
+        "title": {"type": "plain_text", "text": "🗑️ リマインダー一括削除"},
+        "submit": {"type": "plain_text", "text": f"{count} 件を削除する"},
+        "close": {"type": "plain_text", "text": "キャンセル"},
+        "blocks": [{"type": "section", "text": {"type": "mrkdwn", "text": "\n".join(lines)}}]
+    }
+
+
+def build_purge_preview(filters):
+    """
+    条件に合う予約を数えて、確認モーダル（該当が無ければその旨のモーダル）を返す
+    """
+    args = search_args(filters)
+    count = reminder_store.count_matching(**args)
+    if not count:
+        return build_notice_view("条件に合う予約はありません。")
+    return build_purge_confirmation_view(filters, count, reminder_store.list_matching(**args, limit=PREVIEW_SIZE))
+
+
+def format_purge_progress(filters, user_id, total, stats, done=False):
+    header = "【 🗑️ リマインダー一括削除 】" + ("完了" if done else "削除中…")
+    lines = [
+        header,
+        f"<@{user_id}> が <#{filters['channel']}> の予約を削除{'しました' if done else 'しています'}（{describe_filters(filters)}）。",
+        f"削除 {stats['deleted']} / {total} 件" + (f"（失敗 {sum(stats['failed'].values())} 件）" if stats["failed"] else ""),
+    ]
+    if done and stats["failed"]:
+        lines.append("失敗の内訳: " + ", ".join(f"`{code}` {n} 件" for code, n in stats["failed"].most_common()))
+    return "\n".join(lines)
+
+
+class PurgeJob:
+    """
+    1 回の一括削除
+    条件に合う予約を PURGE_CONCURRENCY 件ずつ並行して取り消し、PURGE_BATCH_SIZE 件ごとに 1 つの進捗メッセージを更新する
+    chat.deleteScheduledMessage の間隔は共有のレート制限が決めるため、件数が多くてもメソッドの上限の速さで削除し続ける
+    """
+
+    def __init__(self, client, filters, user_id, logger):
+        self.client = client
+        self.filters = filters
+        self.user_id = user_id
+        self.logger = logger
+        self.message_ts = None
+        self.stats = {"deleted": 0, "failed": Counter()}
+
+    def run(self):
+        reminders = reminder_store.list_matching(**search_args(self.filters))
+        total = len(reminders)
+        if not self.filters["to"]:
+            # 削除の途中で補充されないよう、先に繰り返しを止める
+            for series_id in {reminder.series_id for reminder in reminders if reminder.series_id}:
+                reminder_store.deactivate_series(series_id)
+        try:
+            self.message_ts = self.client.chat_postMessage(
+                channel=self.filters["channel"], text=format_purge_progress(self.filters, self.user_id, total, self.stats)
+            )["ts"]
+        except SlackApiError as e:
+            self.logger.error(f"一括削除の進捗メッセージを投稿できませんでした: {e.response['error']}")
+
+        with ThreadPoolExecutor(max_workers=PURGE_CONCURRENCY, thread_name_prefix="reminder-purge") as executor:
+            for start in range(0, total, PURGE_BATCH_SIZE):
+                for error in executor.map(self.delete_one, reminders[start:start + PURGE_BATCH_SIZE]):
+                    if error is None:
+                        self.stats["deleted"] += 1
+                    else:
+                        self.stats["failed"][error] += 1
+                if start + PURGE_BATCH_SIZE < total:
+                    self.report(total)
+        self.report(total, done=True)
+
+    def delete_one(self, reminder):
+        """
+        予約を 1 件取り消す（失敗した場合はエラーコードを返す）
+        """
+        try:
+            cancel_message(self.client, reminder.channel, reminder.scheduled_message_id)
+        except SlackApiError as e:
+            if e.response["error"] in GONE_ERRORS:
+                reminder_store.delete(reminder.scheduled_message_id)
+                listing_cache.invalidate(reminder.channel)
+                return None
+            return e.response["error"]
+        except Exception as e:
+            self.logger.error(f"予約 {reminder.scheduled_message_id} の削除に失敗しました: {e}")
+            return type(e).__name__
+        return None
+
+    def report(self, total, done=False):
+        text = format_purge_progress(self.filters, self.user_id, total, self.stats, done=done)
+        try:
+            if self.message_ts:
+                self.client.chat_update(channel=self.filters["channel"], ts=self.message_ts, text=text)
+            elif done:
+                self.client.chat_postEphemeral(channel=self.filters["channel"], user=self.user_id, text=text)
+        except SlackApiError as e:
+            self.logger.error(f"一括削除の進捗メッセージを更新できませんでした: {e.response['error']}")
+
+
+def register(app):
+
+
+    @app.command("/purge-reminders")
+    def open_purge_modal(ack, body, client, logger):
+        """
+        スラッシュコマンド処理：条件のモーダルを開き、件数が正しくなるよう未取得のチャンネルは裏で突き合わせる
+        """
+
+        ack()
+        channel_id = body["channel_id"]
+        try:
+            client.views_open(trigger_id=body["trigger_id"], view=build_purge_filter_modal(channel_id))
+        except SlackApiError as e:
+            logger.error(f"一括削除のモーダルを開けませんでした: {e.response['error']}")
+            return
+        if not reminder_store.is_tracked(channel_id):
+            worker_pool.submit(reconcile_channel, client, channel_id)
+
+
+    @app.view("purge_filter_submission")
+    def handle_purge_filter_submission(ack, body, client):
+        """
+        条件のモーダル送信処理：ローカルストアで件数を数えて確認モーダルに切り替える
+        """
+
+        filters = parse_purge_filters(body, user_timezones.resolve(client, body["user"]["id"]))
+        errors = validate_purge_filters(filters)
+        if errors:
+            ack(response_action="errors", errors=errors)
+            return
+        ack(response_action="update", view=build_purge_preview(filters))
+
+
+    @app.view("purge_confirmation")
+    def handle_purge_confirmation(ack, body, client, logger):
+        """
+        確認モーダル送信処理：削除は一括処理用のプールで実行する
+        """
+
+        ack()
+        filters = json.loads(body["view"]["private_metadata"])
+        bulk_job_pool.submit(PurgeJob(client, filters, body["user"]["id"], logger).run)
+
+
+def register_async(app):
+    """
+    AsyncApp 向けの登録
+    削除は長時間かかりうるため、同期モードと同じ PurgeJob を同期の WebClient でスレッドで実行する
+    """
+
+
+    @app.command("/purge-reminders")
+    async def open_purge_modal(ack, body, client, logger):
+        await ack()
+        channel_id = body["channel_id"]
+        try:
+            await client.views_open(trigger_id=body["trigger_id"], view=build_purge_filter_modal(channel_id))
+        except SlackApiError as e:
+            logger.error(f"一括削除のモーダルを開けませんでした: {e.response['error']}")
+            return
+        if not reminder_store.is_tracked(channel_id):
+            await async_worker_pool.submit(reconcile_channel_async, client, channel_id)
+
+
+    @app.view("purge_filter_submission")
+    async def handle_purge_filter_submission(ack, body, client):
+        filters = parse_purge_filters(body, await user_timezones.resolve_async(client, body["user"]["id"]))
+        errors = validate_purge_filters(filters)
+        if errors:
+            await ack(response_action="errors", errors=errors)
+            return
+        await ack(response_action="update", view=build_purge_preview(filters))
+
+
+    @app.view("purge_confirmation")
+    async def handle_purge_confirmation(ack, body, client, logger):
+        await ack()
+        filters = json.loads(body["view"]["private_metadata"])
+        worker_client = RateLimitedWebClient(
+            token=client.token, base_url=client.base_url, workspace_id=workspace_of(client)
+        )
+        job = PurgeJob(worker_client, filters, body["user"]["id"], logger)
+        # プールが一杯のときに submit が待ってもイベントループを止めない
+        await asyncio.to_thread(bulk_job_pool.submit, job.run)
@@ -0,0 +1,51 @@
+from handlers.ics_feed import feed_url
+from handlers.slack_client import workspace_of
+
+
+# 引数がこれらの場合は、実行したユーザーが全チャンネルに設定した予約のフィードにする
+MY_FEED_ARGS = {"me", "自分"}
+
+
+def build_feed_reply(body, team_id):
+    """
+    /reminder-feed への返答（コマンドを実行したユーザーにだけ表示する）
+    """
+    if body.get("text", "").strip().lower() in MY_FEED_ARGS:
+        url = feed_url("user", body["user_id"], team_id)
+        target = "あなたが設定した予約"
+    else:
+        url = feed_url("channel", body["channel_id"], team_id)
+        target = f"<#{body['channel_id']}> の予約"
+    if url is None:
+        return "カレンダーのフィードは有効になっていません（HTTP モードで CALENDAR_FEED_BASE_URL を設定してください）。"
+    return (
+        f"{target}をカレンダーアプリで購読できる iCalendar の URL です。\n{url}\n"
+        "URL を知っている人は誰でも予約を閲覧できるため、共有しないでください。"
+    )
+
+
+def register(app):
+
+
+    @app.command("/reminder-feed")
+    def show_feed_url(ack, body, client):
+        """
+        スラッシュコマンド処理：フィードの URL を ack の応答として返す（Slack API は呼ばない）
+        """
+
+        ack(text=build_feed_reply(body, workspace_of(client)))
+
+
+def register_async(app):
+    """
+    AsyncApp 向けの登録（処理内容は register と同じ）
+    """
+
+
+    @app.command("/reminder-feed")
+    async def show_feed_url(ack, body, client):
+        """
+        スラッシュコマンド処理：フィードの URL を ack の応答として返す（Slack API は呼ばない）
+        """
+
+        await ack(text=build_feed_reply(body, workspace_of(client)))
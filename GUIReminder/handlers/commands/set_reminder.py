@@ -1,154 +1,294 @@
-import os
 import datetime
 import time
-from dotenv import load_dotenv
 from slack_sdk.errors import SlackApiError
 
-load_dotenv()
-DEVELOPER_SLACK_ID = os.environ.get("DEVELOPER_SLACK_ID")
+from handlers.error_reports import error_digest
+from handlers.delivery import schedule_message, schedule_message_async
+from handlers.inline_command import INLINE_USAGE, format_inline_errors, parse_when, split_mentions
+from handlers.recurrence import (
+    RECURRENCE_LABELS,
+    build_recurrence_blocks,
+    create_series,
+    create_series_async,
+    parse_recurrence_values
+)
+from handlers.reminder_text import KIND_REMINDER, format_reminder_text
+from handlers.user_timezones import user_timezones, zone_name
+from handlers.views import (
+    HOUR_OPTIONS,
+    HOUR_OPTION_BY_VALUE,
+    MINUTE_OPTIONS,
+    MINUTE_OPTION_BY_VALUE,
+    ViewTemplate,
+    get_next_minute_interval,
+    open_view,
+    open_view_async
+)
+from handlers.worker_pool import worker_pool, async_worker_pool
 
-# 切り上げ間隔（分）
-MINUTE_INTERVAL = 5
-# リマインド時のヘッダー
-REMIND_HEADER = "【 🔔 リマインド 】"
 
+# /set-reminder のモーダル（GUI画面）の骨格。起動時に一度だけ組み立てる
+REMINDER_MODAL = ViewTemplate(
+    {
+        "type": "modal",
+        "callback_id": "reminder_submission",  # 送信時の識別子,
+        "private_metadata": "",
+        "title": {"type": "plain_text", "text": "🔔 リマインダー設定"},
+        "submit": {"type": "plain_text", "text": "予約する"},
 
-def register(app):
+        # モーダルのブロック定義
+        "blocks": [
+            # リマインド内容の入力欄
+            {
+                "type": "input",
+                "block_id": "message_block",
+                "label": {"type": "plain_text", "text": "リマインド内容"},
+                "element": {
+                    "type": "plain_text_input",
+                    "action_id": "message_input",
+                    "multiline": True
+                }
+            },
+            # 日付ピッカー
+            {
+                "type": "input",
+                "block_id": "date_block",
+                "label": {"type": "plain_text", "text": "日付 を選択"},
+                "element": {
+                    "type": "datepicker",
+                    "action_id": "date_input",
+                    "initial_date": "",
+                    "placeholder": {"type": "plain_text", "text": "日付を選択"}
+                }
+            },
+            # 時刻（時間単位）のプルダウン
+            {
+                "type": "input",
+                "block_id": "hour_block",
+                "label": {"type": "plain_text", "text": "時間 を選択"},
+                "element": {
+                    "type": "static_select",
+                    "action_id": "hour_select",
+                    "options": HOUR_OPTIONS,
+                    "initial_option": HOUR_OPTIONS[0],
+                }
+            },
+            # 時刻（MINUTE_INTERVAL 分単位）のプルダウン
+            {
+                "type": "input",
+                "block_id": "minute_block",
+                "label": {"type": "plain_text", "text": "分 を選択"},
+                "element": {
+                    "type": "static_select",
+                    "action_id": "minute_select",
+                    "options": MINUTE_OPTIONS,
+                    "initial_option": MINUTE_OPTIONS[0],
+                }
+            },
+            # メンション選択 (ユーザーセレクト)
+            {
+                "type": "input",
+                "block_id": "user_block",
+                "optional": True,
+                "label": {"type": "plain_text", "text": "メンション"},
+                "element": {
+                    "type": "multi_users_select",
+                    "action_id": "user_select_input",
+                    "placeholder": {"type": "plain_text", "text": "メンションするユーザーを選択"}
+                }
+            },
+            # 繰り返しの選択と除外日
+            *build_recurrence_blocks()
+        ]
+    },
+    {
+        "private_metadata": (("private_metadata",), None),
+        "initial_date": (("blocks", 1, "element", "initial_date"), None),
+        "initial_hour": (("blocks", 2, "element", "initial_option"), HOUR_OPTION_BY_VALUE.__getitem__),
+        "initial_minute": (("blocks", 3, "element", "initial_option"), MINUTE_OPTION_BY_VALUE.__getitem__),
+    },
+)
 
 
-    def generate_minute_options():
-        """
-        MINUTE_INTERVAL 単位の時刻オプションを生成
-        """
-        options = []
-        for m in range(0, 60, MINUTE_INTERVAL):
-            minute_str = f"{m:02d}"  # 0埋め
-            options.append({
-                "text": {"type": "plain_text", "text": f"{minute_str}分"},
-                "value": minute_str
-            })
-        return options
+def reminder_modal_fields(trigger_channel_id, tz=None):
+    """
+    モーダルにリクエストごとに差し込む値（チャンネルIDと時刻の初期値）
+    tz はコマンドを実行したユーザーのタイムゾーン（None はサーバーのローカルタイム）
+    """
+    
+    # 時刻の初期値設定 
+    initial_date, initial_hour, initial_minute = get_next_minute_interval(tz)
+    return {
+        "private_metadata": trigger_channel_id,
+        "initial_date": initial_date,
+        "initial_hour": initial_hour,
+        "initial_minute": initial_minute,
+    }
 
 
-    def get_next_minute_interval():
-        """
-        現在時刻を MINUTE_INTERVAL 単位に切り上げた日時を返す
-        """
-        # タイムゾーンを考慮した現在時刻を取得することが望ましいですが、ここでは一旦ローカルタイム（JST）と仮定
-        now = datetime.datetime.now()    
-        # 現在の分が MINUTE_INTERVAL 単位の区切りからどれだけ進んでいるか
-        minutes_past_interval = now.minute % MINUTE_INTERVAL
-        # 次の MINUTE_INTERVAL 単位までの残り時間 
-        minutes_to_add = MINUTE_INTERVAL - minutes_past_interval
-        # 次の MINUTE_INTERVAL 単位の時刻を計算
-        next_time = now + datetime.timedelta(minutes=minutes_to_add)
-        # 結果を文字列として返す
-        initial_date = next_time.strftime("%Y-%m-%d")
-        initial_hour = next_time.strftime("%H")
-        initial_minute = next_time.strftime("%M")
-        
-        return initial_date, initial_hour, initial_minute
+def build_reminder_modal(trigger_channel_id, tz=None):
+    """
+    /set-reminder のモーダル（GUI画面）を生成
+    """
+    return REMINDER_MODAL.render(**reminder_modal_fields(trigger_channel_id, tz))
+
+
+def parse_reminder_submission(body, tz=None):
+    """
+    モーダル送信内容からリマインド予約に必要な値を取り出す
+    日時は送信したユーザーのタイムゾーン tz（None はサーバーのローカルタイム）で解釈する
+    """
+    
+    # チャンネルIDは private_metadata から取得 (コマンドを入力したチャンネル)
+    channel_id = body["view"]["private_metadata"]
+    # ユーザー入力を取得
+    values = body["view"]["state"]["values"]
+    
+    # 値の抽出
+    message = values["message_block"]["message_input"]["value"]
+    # 設定したユーザー
+    user_id_setter = body["user"]["id"]
+    # メンションするユーザーIDを取得 (選択されていない場合は None)
+    user_ids_to_mention = values["user_block"]["user_select_input"].get("selected_users", [])
+    if user_ids_to_mention:
+        mention_text = " ".join([f"<@{user_id}>" for user_id in user_ids_to_mention])
+    else:
+        mention_text = ""
+
+    # プルダウンから選択された時間と分を取得
+    date_val = values["date_block"]["date_input"]["selected_date"]
+    hour_val = values["hour_block"]["hour_select"]["selected_option"]["value"]
+    minute_val = values["minute_block"]["minute_select"]["selected_option"]["value"]
+    # 日時をSlackが求めるUNIXタイムスタンプに変換
+    combined_dt_str = f"{date_val} {hour_val}:{minute_val}"
+    dt_obj = datetime.datetime.strptime(combined_dt_str, "%Y-%m-%d %H:%M").replace(tzinfo=tz)
+    # UTCタイムスタンプに変換 (Slack APIは通常、UTCタイムスタンプを要求する)
+    post_at_timestamp = int(dt_obj.timestamp())
+    # 繰り返し（選択されていない場合 recurrence は None）
+    recurrence_choice, recurrence, exdates, recurrence_errors = parse_recurrence_values(values, dt_obj)
+    
+    return {
+        "channel_id": channel_id,
+        "message": message,
+        "user_id_setter": user_id_setter,
+        "mention_text": mention_text,
+        "combined_dt_str": combined_dt_str,
+        "post_at": post_at_timestamp,
+        "recurrence_choice": recurrence_choice,
+        "recurrence": recurrence,
+        "exdates": exdates,
+        "recurrence_errors": recurrence_errors,
+        # 繰り返しの各回もこのタイムゾーンの同じ時刻に予約する
+        "tz": zone_name(tz),
+    }
+
+
+def parse_reminder_command(body, tz=None, now=None):
+    """
+    /set-reminder の引数（例: "明日 9:30 <@U123|alice> デプロイ確認"）から、parse_reminder_submission と同じ形の予約内容を作る
+    日時・メンション・内容を読み取れなければ None（モーダルで入力してもらう）
+    """
+    parsed = parse_when(body.get("text") or "", tz, now)
+    if parsed is None:
+        return None
+    dt_obj, rest = parsed
+    mentions = split_mentions(rest)
+    if mentions is None:
+        return None
+    user_ids_to_mention, message = mentions
+    message = message.strip()
+    if not message:
+        return None
+    return {
+        "channel_id": body["channel_id"],
+        "message": message,
+        "user_id_setter": body["user_id"],
+        "mention_text": " ".join(f"<@{user_id}>" for user_id in user_ids_to_mention),
+        "combined_dt_str": dt_obj.strftime("%Y-%m-%d %H:%M"),
+        "post_at": int(dt_obj.timestamp()),
+        "recurrence_choice": "none",
+        "recurrence": None,
+        "exdates": "",
+        "recurrence_errors": None,
+        "tz": zone_name(tz),
+    }
+
+
+def validate_reminder_submission(submission):
+    """
+    過去の日時が指定されていればモーダルに表示するエラーを返す（問題なければ None）
+    """
+    
+    # タイムスタンプを取得
+    current_timestamp = int(time.time())
+    # 過去の時間かどうかをチェック
+    if submission["post_at"] <= current_timestamp:
+        return {
+            "date_block": "過去の日時は設定できません。未来の日時を選択してください。",
+            "hour_block": " ",
+            "minute_block": " "
+        }
+    return submission.get("recurrence_errors")
+
+
+def build_reminder_texts(submission):
+    """
+    予約投稿するリマインドメッセージと、チャンネルへの即時通知メッセージを生成
+    """
+    
+    # リマインドメッセージの作成
+    reminder_text = format_reminder_text(submission["mention_text"], submission["message"])
+    
+    instant_post_text = (
+        f"【 🔔 新規リマインド 】\n"
+        f"<@{submission['user_id_setter']}> が {submission['combined_dt_str']} にリマインダーを予約しました。\n"
+        f"{submission['mention_text']}\n"
+        f"【内容】\n"
+        f"{submission['message']}\n"
+    )
+    if submission.get("recurrence"):
+        instant_post_text += f"【繰り返し】{RECURRENCE_LABELS[submission['recurrence_choice']]}\n"
+    return reminder_text, instant_post_text
+
+
+def register(app):
 
 
     # Slackアプリ設定で登録したスラッシュコマンドに合わせる
     @app.command("/set-reminder")
-    def open_reminder_modal(ack, body, client):
+    def open_reminder_modal(ack, body, client, logger):
         """
-        スラッシュコマンド処理：モーダル（GUI）の表示
+        スラッシュコマンド処理：引数があればモーダルを開かずに予約し、無い・読み取れない場合はモーダル（GUI）を表示
         """
         
-        # コマンドを受け取ったことを即座にSlackに通知
-        ack() 
+        # 日時はユーザーのタイムゾーンで扱う（通常はキャッシュから引くため API は呼ばない）
+        tz = user_timezones.resolve(client, body.get("user_id"))
+        if (body.get("text") or "").strip():
+            submission = parse_reminder_command(body, tz)
+            if submission is not None:
+                # モーダルの送信と同じ確認をして、予約はワーカープールで実行する
+                error_message = validate_reminder_submission(submission)
+                if error_message:
+                    ack(text=format_inline_errors(error_message))
+                    return
+                ack()
+                worker_pool.submit(schedule_reminder, submission, client, logger)
+                return
+            ack(text=f"入力を読み取れなかったため、フォームを開きます（{INLINE_USAGE}）。")
+        else:
+            # コマンドを受け取ったことを即座にSlackに通知
+            ack()
         # コマンドが入力されたチャンネルIDをPrivate Metadataとして保存
         trigger_channel_id = body.get("channel_id")
-
-        # 時刻の初期値設定 
-        initial_date, initial_hour, initial_minute = get_next_minute_interval()
-        # MINUTE_INTERVAL 分単位の分オプションを生成
-        minute_options = generate_minute_options()
-        # 1時間単位の時オプションを生成 (00時～23時)
-        hour_options = [
-            {"text": {"type": "plain_text", "text": f"{h:02d}時"}, "value": f"{h:02d}"}
-            for h in range(24)
-        ]
         
-        # モーダル（GUI画面）の定義
         try:
-            # views_openでモーダルを表示します
-            client.views_open(
+            # views_openでモーダルを表示します（事前に組み立てた骨格に初期値だけを差し込む）
+            open_view(
+                client,
                 # モーダルを表示するためのトリガー
-                trigger_id=body["trigger_id"],
-                view={
-                    "type": "modal",
-                    "callback_id": "reminder_submission",  # 送信時の識別子,
-                    "private_metadata": trigger_channel_id,
-                    "title": {"type": "plain_text", "text": "🔔 リマインダー設定"},
-                    "submit": {"type": "plain_text", "text": "予約する"},
-                    
-                    # モーダルのブロック定義
-                    "blocks": [
-                        # リマインド内容の入力欄
-                        {
-                            "type": "input",
-                            "block_id": "message_block",
-                            "label": {"type": "plain_text", "text": "リマインド内容"},
-                            "element": {
-                                "type": "plain_text_input",
-                                "action_id": "message_input",
-                                "multiline": True
-                            }
-                        },
-                        # 日付ピッカー
-                        {
-                            "type": "input",
-                            "block_id": "date_block",
-                            "label": {"type": "plain_text", "text": "日付 を選択"},
-                            "element": {
-                                "type": "datepicker",
-                                "action_id": "date_input",
-                                "initial_date": initial_date,
-                                "placeholder": {"type": "plain_text", "text": "日付を選択"}
-                            }
-                        },
-                        # 時刻（時間単位）のプルダウン
-                        {
-                            "type": "input",
-                            "block_id": "hour_block",
-                            "label": {"type": "plain_text", "text": "時間 を選択"},
-                            "element": {
-                                "type": "static_select",
-                                "action_id": "hour_select",
-                                "options": hour_options,
-                                "initial_option": next(opt for opt in hour_options if opt['value'] == initial_hour),
-                            }
-                        },
-                        # 時刻（MINUTE_INTERVAL 分単位）のプルダウン
-                        {
-                            "type": "input",
-                            "block_id": "minute_block",
-                            "label": {"type": "plain_text", "text": "分 を選択"},
-                            "element": {
-                                "type": "static_select",
-                                "action_id": "minute_select",
-                                "options": minute_options,
-                                # 初期値設定は複雑なのでここでは省略
-                                "initial_option": next(opt for opt in minute_options if opt['value'] == initial_minute),
-                            }
-                        },
-                        # メンション選択 (ユーザーセレクト)
-                        {
-                            "type": "input",
-                            "block_id": "user_block",
-                            "optional": True,
-                            "label": {"type": "plain_text", "text": "メンション"},
-                            "element": {
-                                "type": "multi_users_select",
-                                "action_id": "user_select_input",
-                                "placeholder": {"type": "plain_text", "text": "メンションするユーザーを選択"}
-                            }
-                        }
-                    ]
-                }
+                body["trigger_id"],
+                REMINDER_MODAL,
+                **reminder_modal_fields(trigger_channel_id, tz)
             )
         except Exception as e:
             print(f"Error opening view: {e}")
@@ -158,75 +298,52 @@ def register(app):
     @app.view("reminder_submission")
     def handle_reminder_submission(ack, body, client, logger):
         """
-        モーダル送信処理：リマインド予約の実行
+        モーダル送信処理：入力チェックと ack のみを行い、予約はワーカープールで実行する
         """
-        
-        # モーダルを閉じる応答
-        ack()
-        # チャンネルIDは private_metadata から取得 (コマンドを入力したチャンネル)
-        channel_id = body["view"]["private_metadata"]
-        # ユーザー入力を取得
-        values = body["view"]["state"]["values"]
-        
-        # 値の抽出
-        message = values["message_block"]["message_input"]["value"]
-        # 設定したユーザー
-        user_id_setter = body["user"]["id"]
-        # メンションするユーザーIDを取得 (選択されていない場合は None)
-        user_ids_to_mention = values["user_block"]["user_select_input"].get("selected_users", [])
-        if user_ids_to_mention:
-            mention_text = " ".join([f"<@{user_id}>" for user_id in user_ids_to_mention])
-        else:
-            mention_text = ""
-
-        # プルダウンから選択された時間と分を取得
-        date_val = values["date_block"]["date_input"]["selected_date"]
-        hour_val = values["hour_block"]["hour_select"]["selected_option"]["value"]
-        minute_val = values["minute_block"]["minute_select"]["selected_option"]["value"]
-        # 日時をSlackが求めるUNIXタイムスタンプに変換
-        combined_dt_str = f"{date_val} {hour_val}:{minute_val}"
-        dt_obj = datetime.datetime.strptime(combined_dt_str, "%Y-%m-%d %H:%M")
-        # UTCタイムスタンプに変換 (Slack APIは通常、UTCタイムスタンプを要求する)
-        post_at_timestamp = int(dt_obj.timestamp())
-
-        # タイムスタンプを取得
-        current_timestamp = int(time.time())
-        # 過去の時間かどうかをチェック
-        if post_at_timestamp <= current_timestamp:
-            # 過去の時間だった場合、登録を拒否し、エラーメッセージをユーザーに表示
-            error_message = {
-                "date_block": "過去の日時は設定できません。未来の日時を選択してください。",
-                "hour_block": " ",
-                "minute_block": " "
-            }
+
+        # モーダルを開いたときにキャッシュしたタイムゾーンで日時を解釈する
+        submission = parse_reminder_submission(body, user_timezones.resolve(client, body["user"]["id"]))
+
+        error_message = validate_reminder_submission(submission)
+        if error_message:
             # ack() 関数にエラーメッセージを渡し、モーダルを閉じずにエラー表示させる
             ack(response_action="errors", errors=error_message)
-            
+
             # エラーを返したため、これ以降のメッセージ予約処理は実行しない
             return
-        
+
+        # モーダルを閉じる応答
+        ack()
+        # Slack API の呼び出しは ack の経路から外してワーカーで実行する
+        worker_pool.submit(schedule_reminder, submission, client, logger)
+
+
+    def schedule_reminder(submission, client, logger):
+        """
+        リマインド予約の実行（ワーカープール上で実行される）
+        """
+
+        channel_id = submission["channel_id"]
+        user_id_setter = submission["user_id_setter"]
+
         try:
-            # リマインドメッセージの作成
-            reminder_text = (
-                f"{mention_text}\n"
-                f"{REMIND_HEADER}\n"
-                f"{message}"
-            )
-            
-            # Slack API: chat.scheduleMessageでメッセージを予約投稿
-            client.chat_scheduleMessage(
-                channel=channel_id, 
-                post_at=post_at_timestamp,
-                text=reminder_text
-            )
+            reminder_text, instant_post_text = build_reminder_texts(submission)
             
-            instant_post_text = (
-                f"【 🔔 新規リマインド 】\n"
-                f"<@{user_id_setter}> が {combined_dt_str} にリマインダーを予約しました。\n"
-                f"{mention_text}\n"
-                f"【内容】\n"
-                f"{message}\n"
-            )
+            fields = {
+                "setter": user_id_setter,
+                "mentions": submission["mention_text"],
+                "body": submission["message"],
+                "kind": KIND_REMINDER,
+            }
+            if submission["recurrence"]:
+                # 繰り返しは登録して直近の数回分だけを予約し、以降はバックグラウンドで補充する
+                create_series(
+                    client, channel_id, submission["recurrence"], submission["post_at"],
+                    exdates=submission["exdates"], tz=submission["tz"], **fields
+                )
+            else:
+                # 設定した配信方法（chat.scheduleMessage / ローカル）でメッセージを予約投稿
+                schedule_message(client, channel_id, submission["post_at"], reminder_text, **fields)
             
             client.chat_postMessage(
                 channel=channel_id,
@@ -235,13 +352,103 @@ def register(app):
         
         except SlackApiError as e:
             logger.error(f"リマインド予約に失敗しました: {e.response['error']}")
-            client.chat_postMessage(
-                channel=DEVELOPER_SLACK_ID,
-                text=f"<@{user_id_setter}>がリマインダーの設定中にSlack APIエラーが発生しました。\n詳細: `{e.response['error']}`"
+            error_digest.report("set_reminder", e, client, user_id_setter)
+        except Exception as e:
+            logger.error(f"リマインド予約に失敗しました: {e}")
+            error_digest.report("set_reminder", e, client, user_id_setter)
+
+
+def register_async(app):
+    """
+    AsyncApp 向けの登録（処理内容は register と同じで、Slack API 呼び出しを await する）
+    """
+
+
+    @app.command("/set-reminder")
+    async def open_reminder_modal(ack, body, client, logger):
+        """
+        スラッシュコマンド処理：引数があればモーダルを開かずに予約し、無い・読み取れない場合はモーダル（GUI）を表示
+        """
+        
+        tz = await user_timezones.resolve_async(client, body.get("user_id"))
+        if (body.get("text") or "").strip():
+            submission = parse_reminder_command(body, tz)
+            if submission is not None:
+                error_message = validate_reminder_submission(submission)
+                if error_message:
+                    await ack(text=format_inline_errors(error_message))
+                    return
+                await ack()
+                await async_worker_pool.submit(schedule_reminder, submission, client, logger)
+                return
+            await ack(text=f"入力を読み取れなかったため、フォームを開きます（{INLINE_USAGE}）。")
+        else:
+            await ack()
+        trigger_channel_id = body.get("channel_id")
+        
+        try:
+            await open_view_async(
+                client,
+                body["trigger_id"],
+                REMINDER_MODAL,
+                **reminder_modal_fields(trigger_channel_id, tz)
+            )
+        except Exception as e:
+            print(f"Error opening view: {e}")
+
+
+    @app.view("reminder_submission")
+    async def handle_reminder_submission(ack, body, client, logger):
+        """
+        モーダル送信処理：入力チェックと ack のみを行い、予約はワーカープールで実行する
+        """
+
+        submission = parse_reminder_submission(body, await user_timezones.resolve_async(client, body["user"]["id"]))
+
+        error_message = validate_reminder_submission(submission)
+        if error_message:
+            await ack(response_action="errors", errors=error_message)
+            return
+
+        await ack()
+        await async_worker_pool.submit(schedule_reminder, submission, client, logger)
+
+
+    async def schedule_reminder(submission, client, logger):
+        """
+        リマインド予約の実行（ワーカープール上で実行される）
+        """
+
+        channel_id = submission["channel_id"]
+        user_id_setter = submission["user_id_setter"]
+
+        try:
+            reminder_text, instant_post_text = build_reminder_texts(submission)
+            
+            fields = {
+                "setter": user_id_setter,
+                "mentions": submission["mention_text"],
+                "body": submission["message"],
+                "kind": KIND_REMINDER,
+            }
+            if submission["recurrence"]:
+                # 繰り返しは登録して直近の数回分だけを予約し、以降はバックグラウンドで補充する
+                await create_series_async(
+                    client, channel_id, submission["recurrence"], submission["post_at"],
+                    exdates=submission["exdates"], tz=submission["tz"], **fields
+                )
+            else:
+                # 設定した配信方法（chat.scheduleMessage / ローカル）でメッセージを予約投稿
+                await schedule_message_async(client, channel_id, submission["post_at"], reminder_text, **fields)
+            
+            await client.chat_postMessage(
+                channel=channel_id,
+                text=instant_post_text
             )
+        
+        except SlackApiError as e:
+            logger.error(f"リマインド予約に失敗しました: {e.response['error']}")
+            error_digest.report("set_reminder", e, client, user_id_setter)
         except Exception as e:
             logger.error(f"リマインド予約に失敗しました: {e}")
-            client.chat_postMessage(
-                channel=DEVELOPER_SLACK_ID,
-                text=f"<@{user_id_setter}>がリマインダーの設定中に予期せぬエラーが発生しました。\n詳細: `{e}`"
-            )
\ No newline at end of file
+            error_digest.report("set_reminder", e, client, user_id_setter)
@@ -1,173 +1,371 @@
-import os
 import datetime
 import time
-from dotenv import load_dotenv
 from slack_sdk.errors import SlackApiError
 
-load_dotenv()
-DEVELOPER_SLACK_ID = os.environ.get("DEVELOPER_SLACK_ID")
+from handlers.error_reports import error_digest
+from handlers.delivery import schedule_messages, schedule_messages_async
+from handlers.inline_command import format_inline_errors, parse_when
+from handlers.recurrence import (
+    RECURRENCE_LABELS,
+    build_recurrence_blocks,
+    create_series,
+    create_series_async,
+    parse_recurrence_values
+)
+from handlers.reminder_text import DETAIL_HEADER, KIND_SCHEDULE, format_schedule_text
+from handlers.user_timezones import user_timezones, zone_name
+from handlers.views import (
+    HOUR_OPTIONS,
+    HOUR_OPTION_BY_VALUE,
+    MINUTE_OPTIONS,
+    MINUTE_OPTION_BY_VALUE,
+    ViewTemplate,
+    get_next_minute_interval,
+    open_view,
+    open_view_async
+)
+from handlers.worker_pool import worker_pool, async_worker_pool
 
-# 切り上げ間隔（分）
-MINUTE_INTERVAL = 5
-# リマインド時のヘッダー
-REMIND_HEADER = "【 🔔 リマインド 】"
 
+# 設定時刻のリマインドに加えて送る事前通知（複数選択）
+OFFSET_OPTIONS = [
+    {"text": {"type": "plain_text", "text": "15分前"}, "value": "-15m"},
+    {"text": {"type": "plain_text", "text": "30分前"}, "value": "-30m"},
+    {"text": {"type": "plain_text", "text": "1時間前"}, "value": "-1h"},
+    {"text": {"type": "plain_text", "text": "3時間前"}, "value": "-3h"},
+    {"text": {"type": "plain_text", "text": "1日前"}, "value": "-1d"},
+    {"text": {"type": "plain_text", "text": "3日前"}, "value": "-3d"},
+]
+OFFSET_LABELS = {opt["value"]: opt["text"]["text"] for opt in OFFSET_OPTIONS}
+# 事前通知は値（-1h）でもモーダルの表示名（1時間前）でも書ける（コマンドの引数・取り込むファイル）
+OFFSET_VALUE_BY_NAME = {**{v: v for v in OFFSET_LABELS}, **{label: v for v, label in OFFSET_LABELS.items()}}
+# 引数を読み取れなかったときに案内する書き方
+SCHEDULE_USAGE = "`4/1 15:00 1時間前 タイトル`（2 行目以降は詳細）や `明日 10時 タイトル` のように入力してください"
 
-def register(app):
 
+def parse_offset(offset_val):
+    """
+    オフセット値（例: "-1h", "-30m", "-1d"）を timedelta に変換
+    """
+    # オフセットを処理するための timedelta を初期化
+    offset_delta = datetime.timedelta(seconds=0) 
+    if offset_val != "0":
+        magnitude = int(offset_val[:-1]) # 数値部分（負の値）
+        unit = offset_val[-1]            # 単位部分（'m', 'h', 'd'）
+        if unit == 'm':
+            # 分単位のオフセット
+            offset_delta = datetime.timedelta(minutes=magnitude)
+        elif unit == 'h':
+            # 時間単位のオフセット
+            offset_delta = datetime.timedelta(hours=magnitude)
+        elif unit == 'd':
+            # 日単位のオフセット
+            offset_delta = datetime.timedelta(days=magnitude)
+    return offset_delta
 
-    def generate_minute_options():
-        """
-        MINUTE_INTERVAL 単位の時刻オプションを生成
-        """
-        options = []
-        for m in range(0, 60, MINUTE_INTERVAL):
-            minute_str = f"{m:02d}"  # 0埋め
-            options.append({
-                "text": {"type": "plain_text", "text": f"{minute_str}分"},
-                "value": minute_str
-            })
-        return options
 
+# /set-schedule のモーダル（GUI画面）の骨格。起動時に一度だけ組み立てる
+SCHEDULE_MODAL = ViewTemplate(
+    {
+        "type": "modal",
+        "callback_id": "schedule_submission",  # 送信時の識別子,
+        "private_metadata": "",
+        "title": {"type": "plain_text", "text": "🗓️ スケジュール登録"},
+        "submit": {"type": "plain_text", "text": "登録する"},
 
-    def get_next_minute_interval():
-        """
-        現在時刻を MINUTE_INTERVAL 単位に切り上げた日時を返す
-        """
-        # タイムゾーンを考慮した現在時刻を取得することが望ましいですが、ここでは一旦ローカルタイム（JST）と仮定
-        now = datetime.datetime.now()    
-        # 現在の分が MINUTE_INTERVAL 単位の区切りからどれだけ進んでいるか
-        minutes_past_interval = now.minute % MINUTE_INTERVAL
-        # 次の MINUTE_INTERVAL 単位までの残り時間 
-        minutes_to_add = MINUTE_INTERVAL - minutes_past_interval
-        # 次の MINUTE_INTERVAL 単位の時刻を計算
-        next_time = now + datetime.timedelta(minutes=minutes_to_add)
-        # 結果を文字列として返す
-        initial_date = next_time.strftime("%Y-%m-%d")
-        initial_hour = next_time.strftime("%H")
-        initial_minute = next_time.strftime("%M")
-        
-        return initial_date, initial_hour, initial_minute
+        # モーダルのブロック定義
+        "blocks": [
+            # タイトル入力欄
+            {
+                "type": "input",
+                "block_id": "title_block",
+                "label": {"type": "plain_text", "text": "タイトル"},
+                "element": {
+                    "type": "plain_text_input",
+                    "action_id": "title_input"
+                }
+            },
+            # 開始日付
+            {
+                "type": "input",
+                "block_id": "start_date_block",
+                "label": {"type": "plain_text", "text": "開始日 を選択"},
+                "element": {
+                    "type": "datepicker",
+                    "action_id": "start_date_input",
+                    "initial_date": "",
+                    "placeholder": {"type": "plain_text", "text": "日付を選択"}
+                }
+            },
+            # 開始時刻（時間単位）のプルダウン
+            {
+                "type": "input",
+                "block_id": "start_hour_block",
+                "label": {"type": "plain_text", "text": "開始時刻（時間） を選択"},
+                "element": {
+                    "type": "static_select",
+                    "action_id": "start_hour_select",
+                    "options": HOUR_OPTIONS,
+                    "initial_option": HOUR_OPTIONS[0],
+                }
+            },
+            # 開始時刻（MINUTE_INTERVAL 分単位）のプルダウン
+            {
+                "type": "input",
+                "block_id": "start_minute_block",
+                "label": {"type": "plain_text", "text": "開始時刻（分） を選択"},
+                "element": {
+                    "type": "static_select",
+                    "action_id": "start_minute_select",
+                    "options": MINUTE_OPTIONS,
+                    "initial_option": MINUTE_OPTIONS[0],
+                }
+            },
+            # 詳細入力欄
+            {
+                "type": "input",
+                "block_id": "message_block",
+                "optional": True,
+                "label": {"type": "plain_text", "text": "詳細"},
+                "element": {
+                    "type": "plain_text_input",
+                    "action_id": "message_input",
+                    "multiline": True
+                }
+            },
+            # リマインドオフセット（時間前・分前）の選択（複数選択・未選択なら設定時刻にのみ通知）
+            {
+                "type": "input",
+                "block_id": "offset_block",
+                "optional": True,
+                "label": {"type": "plain_text", "text": "事前のリマインド通知"},
+                "element": {
+                    "type": "multi_static_select",
+                    "action_id": "offset_select",
+                    "placeholder": {"type": "plain_text", "text": "設定時刻にのみ通知"},
+                    "options": OFFSET_OPTIONS,
+                }
+            },
+            # 繰り返しの選択と除外日
+            *build_recurrence_blocks(),
+        ]
+    },
+    {
+        "private_metadata": (("private_metadata",), None),
+        "initial_date": (("blocks", 1, "element", "initial_date"), None),
+        "initial_hour": (("blocks", 2, "element", "initial_option"), HOUR_OPTION_BY_VALUE.__getitem__),
+        "initial_minute": (("blocks", 3, "element", "initial_option"), MINUTE_OPTION_BY_VALUE.__getitem__),
+    },
+)
+
+
+def schedule_modal_fields(trigger_channel_id, tz=None):
+    """
+    モーダルにリクエストごとに差し込む値（チャンネルIDと時刻の初期値）
+    tz はコマンドを実行したユーザーのタイムゾーン（None はサーバーのローカルタイム）
+    """
+    
+    # 時刻の初期値設定 
+    initial_date, initial_hour, initial_minute = get_next_minute_interval(tz)
+    return {
+        "private_metadata": trigger_channel_id,
+        "initial_date": initial_date,
+        "initial_hour": initial_hour,
+        "initial_minute": initial_minute,
+    }
+
+
+def build_schedule_modal(trigger_channel_id, tz=None):
+    """
+    /set-schedule のモーダル（GUI画面）を生成
+    """
+    return SCHEDULE_MODAL.render(**schedule_modal_fields(trigger_channel_id, tz))
+
+
+def parse_schedule_submission(body, tz=None):
+    """
+    モーダル送信内容からスケジュール登録に必要な値を取り出す
+    日時は送信したユーザーのタイムゾーン tz（None はサーバーのローカルタイム）で解釈する
+    """
+    
+    # チャンネルIDは private_metadata から取得 (コマンドを入力したチャンネル)
+    channel_id = body["view"]["private_metadata"]
+    # ユーザー入力を取得
+    values = body["view"]["state"]["values"]
+    
+    # 値の抽出
+    title = values["title_block"]["title_input"]["value"]
+    message = values["message_block"]["message_input"]["value"]
+    # 設定したユーザー
+    user_id_setter = body["user"]["id"]
+
+    # プルダウンから選択された時間と分を取得
+    date_val = values["start_date_block"]["start_date_input"]["selected_date"]
+    hour_val = values["start_hour_block"]["start_hour_select"]["selected_option"]["value"]
+    minute_val = values["start_minute_block"]["start_minute_select"]["selected_option"]["value"]
+    # 日時をSlackが求めるUNIXタイムスタンプに変換
+    combined_dt_str = f"{date_val} {hour_val}:{minute_val}"
+    dt_obj = datetime.datetime.strptime(combined_dt_str, "%Y-%m-%d %H:%M").replace(tzinfo=tz)
+    # UTCタイムスタンプに変換 (Slack APIは通常、UTCタイムスタンプを要求する)
+    dt_timestamp = int(dt_obj.timestamp())
+
+    # 選択されたオフセット値を、設定時刻に近い順に取得
+    selected_offsets = values["offset_block"]["offset_select"].get("selected_options") or []
+    offsets = sorted(
+        ((opt["value"], dt_obj + parse_offset(opt["value"])) for opt in selected_offsets),
+        key=lambda item: item[1],
+        reverse=True
+    )
+    # 繰り返し（選択されていない場合 recurrence は None）
+    recurrence_choice, recurrence, exdates, recurrence_errors = parse_recurrence_values(values, dt_obj)
+    
+    return {
+        "channel_id": channel_id,
+        "title": title,
+        "message": message,
+        "user_id_setter": user_id_setter,
+        "combined_dt_str": combined_dt_str,
+        "post_at": dt_timestamp,
+        "offset_vals": [offset_val for offset_val, _ in offsets],
+        # UTCタイムスタンプに変換
+        "offset_post_ats": [int(schedule_dt_obj.timestamp()) for _, schedule_dt_obj in offsets],
+        "recurrence_choice": recurrence_choice,
+        "recurrence": recurrence,
+        "exdates": exdates,
+        "recurrence_errors": recurrence_errors,
+        # 繰り返しの各回もこのタイムゾーンの同じ時刻に予約する
+        "tz": zone_name(tz),
+    }
+
+
+def parse_schedule_command(body, tz=None, now=None):
+    """
+    /set-schedule の引数（例: "4/1 15:00 1時間前 定例会議\n議題: ..."）から、parse_schedule_submission と同じ形の登録内容を作る
+    日時の後に事前通知（-1h または 1時間前）を並べられ、1 行目の残りがタイトル、2 行目以降が詳細になる
+    日時・タイトルを読み取れなければ None（モーダルで入力してもらう）
+    """
+    parsed = parse_when(body.get("text") or "", tz, now)
+    if parsed is None:
+        return None
+    dt_obj, rest = parsed
+    offset_vals = []
+    while True:
+        token, _, remainder = rest.partition(" ")
+        offset_val = OFFSET_VALUE_BY_NAME.get(token)
+        if offset_val is None:
+            break
+        offset_vals.append(offset_val)
+        rest = remainder.lstrip(" ")
+    title, _, message = rest.partition("\n")
+    title = title.strip()
+    if not title:
+        return None
+    # 設定時刻に近い順（モーダルと同じ並び）
+    offset_vals = sorted(set(offset_vals), key=parse_offset, reverse=True)
+    return {
+        "channel_id": body["channel_id"],
+        "title": title,
+        "message": message.strip(),
+        "user_id_setter": body["user_id"],
+        "combined_dt_str": dt_obj.strftime("%Y-%m-%d %H:%M"),
+        "post_at": int(dt_obj.timestamp()),
+        "offset_vals": offset_vals,
+        "offset_post_ats": [int((dt_obj + parse_offset(v)).timestamp()) for v in offset_vals],
+        "recurrence_choice": "none",
+        "recurrence": None,
+        "exdates": "",
+        "recurrence_errors": None,
+        "tz": zone_name(tz),
+    }
+
+
+def validate_schedule_submission(submission):
+    """
+    開始日時・リマインド通知が過去ならモーダルに表示するエラーを返す（問題なければ None）
+    """
+    
+    # タイムスタンプを取得
+    current_timestamp = int(time.time())
+    # 過去の時間かどうかをチェック
+    if submission["post_at"] <= current_timestamp:
+        return {
+            "start_date_block": "過去の日時は設定できません。未来の日時を選択してください。",
+            "start_hour_block": " ",
+            "start_minute_block": " "
+        }
+    
+    if any(offset_post_at <= current_timestamp for offset_post_at in submission["offset_post_ats"]):
+        # リマインド通知が過去だった場合
+        return {
+            "offset_block": "リマインド設定が過去になっています。選択し直してください。",
+        }
+    return submission.get("recurrence_errors")
+
+
+def build_schedule_texts(submission):
+    """
+    予約投稿するリマインドメッセージと、チャンネルへの即時通知メッセージを生成
+    """
+    
+    message = submission["message"]
+    disp_message = f"{DETAIL_HEADER}\n{message}" if message else ""
+    offset_vals = submission.get("offset_vals")
+    disp_offsets = f"【事前通知】{' / '.join(OFFSET_LABELS[v] for v in offset_vals)}\n" if offset_vals else ""
+    recurrence = submission.get("recurrence")
+    disp_recurrence = f"【繰り返し】{RECURRENCE_LABELS[submission['recurrence_choice']]}\n" if recurrence else ""
+    
+    # リマインドメッセージの作成
+    reminder_text = format_schedule_text(submission["combined_dt_str"], submission["title"], message)
+    
+    instant_post_text = (
+        f"【 🗓️ 新規スケジュール 】\n"
+        f"<@{submission['user_id_setter']}> がスケジュールを登録しました。\n"
+        f"{submission['combined_dt_str']} から {submission['title']}\n"
+        f"{disp_offsets}"
+        f"{disp_recurrence}"
+        f"{disp_message}"
+    )
+    return reminder_text, instant_post_text
+
+
+def register(app):
 
 
     # Slackアプリ設定で登録したスラッシュコマンドに合わせる
     @app.command("/set-schedule")
-    def open_schedule_modal(ack, body, client):
+    def open_schedule_modal(ack, body, client, logger):
         """
-        スラッシュコマンド処理：モーダル（GUI）の表示
+        スラッシュコマンド処理：引数があればモーダルを開かずに登録し、無い・読み取れない場合はモーダル（GUI）を表示
         """
         
-        # コマンドを受け取ったことを即座にSlackに通知
-        ack() 
+        # 日時はユーザーのタイムゾーンで扱う（通常はキャッシュから引くため API は呼ばない）
+        tz = user_timezones.resolve(client, body.get("user_id"))
+        if (body.get("text") or "").strip():
+            submission = parse_schedule_command(body, tz)
+            if submission is not None:
+                # モーダルの送信と同じ確認をして、登録はワーカープールで実行する
+                error_message = validate_schedule_submission(submission)
+                if error_message:
+                    ack(text=format_inline_errors(error_message))
+                    return
+                ack()
+                worker_pool.submit(schedule_event, submission, client, logger)
+                return
+            ack(text=f"入力を読み取れなかったため、フォームを開きます（{SCHEDULE_USAGE}）。")
+        else:
+            # コマンドを受け取ったことを即座にSlackに通知
+            ack()
         # コマンドが入力されたチャンネルIDをPrivate Metadataとして保存
         trigger_channel_id = body.get("channel_id")
-
-        # 時刻の初期値設定 
-        initial_date, initial_hour, initial_minute = get_next_minute_interval()
-        # MINUTE_INTERVAL 分単位の分オプションを生成
-        minute_options = generate_minute_options()
-        # 1時間単位の時オプションを生成 (00時～23時)
-        hour_options = [
-            {"text": {"type": "plain_text", "text": f"{h:02d}時"}, "value": f"{h:02d}"}
-            for h in range(24)
-        ]
         
-        # モーダル（GUI画面）の定義
         try:
-            # views_openでモーダルを表示します
-            client.views_open(
+            # views_openでモーダルを表示します（事前に組み立てた骨格に初期値だけを差し込む）
+            open_view(
+                client,
                 # モーダルを表示するためのトリガー
-                trigger_id=body["trigger_id"],
-                view={
-                    "type": "modal",
-                    "callback_id": "schedule_submission",  # 送信時の識別子,
-                    "private_metadata": trigger_channel_id,
-                    "title": {"type": "plain_text", "text": "🗓️ スケジュール登録"},
-                    "submit": {"type": "plain_text", "text": "登録する"},
-                    
-                    # モーダルのブロック定義
-                    "blocks": [
-                        # タイトル入力欄
-                        {
-                            "type": "input",
-                            "block_id": "title_block",
-                            "label": {"type": "plain_text", "text": "タイトル"},
-                            "element": {
-                                "type": "plain_text_input",
-                                "action_id": "title_input"
-                            }
-                        },
-                        # 開始日付
-                        {
-                            "type": "input",
-                            "block_id": "start_date_block",
-                            "label": {"type": "plain_text", "text": "開始日 を選択"},
-                            "element": {
-                                "type": "datepicker",
-                                "action_id": "start_date_input",
-                                "initial_date": initial_date,
-                                "placeholder": {"type": "plain_text", "text": "日付を選択"}
-                            }
-                        },
-                        # 開始時刻（時間単位）のプルダウン
-                        {
-                            "type": "input",
-                            "block_id": "start_hour_block",
-                            "label": {"type": "plain_text", "text": "開始時刻（時間） を選択"},
-                            "element": {
-                                "type": "static_select",
-                                "action_id": "start_hour_select",
-                                "options": hour_options,
-                                "initial_option": next(opt for opt in hour_options if opt['value'] == initial_hour),
-                            }
-                        },
-                        # 開始時刻（MINUTE_INTERVAL 分単位）のプルダウン
-                        {
-                            "type": "input",
-                            "block_id": "start_minute_block",
-                            "label": {"type": "plain_text", "text": "開始時刻（分） を選択"},
-                            "element": {
-                                "type": "static_select",
-                                "action_id": "start_minute_select",
-                                "options": minute_options,
-                                "initial_option": next(opt for opt in minute_options if opt['value'] == initial_minute),
-                            }
-                        },
-                        # 詳細入力欄
-                        {
-                            "type": "input",
-                            "block_id": "message_block",
-                            "optional": True,
-                            "label": {"type": "plain_text", "text": "詳細"},
-                            "element": {
-                                "type": "plain_text_input",
-                                "action_id": "message_input",
-                                "multiline": True
-                            }
-                        },
-                        # リマインドオフセット（時間前・分前）の選択
-                        {
-                            "type": "input",
-                            "block_id": "offset_block",
-                            "label": {"type": "plain_text", "text": "リマインド通知"},
-                            "element": {
-                                "type": "static_select",
-                                "action_id": "offset_select",
-                                "placeholder": {"type": "plain_text", "text": "通知時刻を選択"},
-                                "options": [
-                                    {"text": {"type": "plain_text", "text": "設定時刻にのみ通知"}, "value": "0"},
-                                    {"text": {"type": "plain_text", "text": "15分前にも通知"}, "value": "-15m"},
-                                    {"text": {"type": "plain_text", "text": "30分前にも通知"}, "value": "-30m"},
-                                    {"text": {"type": "plain_text", "text": "1時間前にも通知"}, "value": "-1h"},
-                                    {"text": {"type": "plain_text", "text": "3時間前にも通知"}, "value": "-3h"},
-                                    {"text": {"type": "plain_text", "text": "1日前にも通知"}, "value": "-1d"},
-                                    {"text": {"type": "plain_text", "text": "3日前にも通知"}, "value": "-3d"},
-                                ],
-                                "initial_option": {"text": {"type": "plain_text", "text": "設定時刻にのみ通知"}, "value": "0"},
-                            }
-                        },
-                    ]
-                }
+                body["trigger_id"],
+                SCHEDULE_MODAL,
+                **schedule_modal_fields(trigger_channel_id, tz)
             )
         except Exception as e:
             print(f"Error opening view: {e}")
@@ -177,121 +375,163 @@ def register(app):
     @app.view("schedule_submission")
     def handle_schedule_submission(ack, body, client, logger):
         """
-        モーダル送信処理：スケジュール登録の実行
+        モーダル送信処理：入力チェックと ack のみを行い、登録はワーカープールで実行する
         """
-        
-        # モーダルを閉じる応答
-        ack()
-        # チャンネルIDは private_metadata から取得 (コマンドを入力したチャンネル)
-        channel_id = body["view"]["private_metadata"]
-        # ユーザー入力を取得
-        values = body["view"]["state"]["values"]
-        
-        # 値の抽出
-        title = values["title_block"]["title_input"]["value"]
-        message = values["message_block"]["message_input"]["value"]
-        disp_message = f"【詳細】\n{message}" if message else ""
-        # 設定したユーザー
-        user_id_setter = body["user"]["id"]
-
-        # プルダウンから選択された時間と分を取得
-        date_val = values["start_date_block"]["start_date_input"]["selected_date"]
-        hour_val = values["start_hour_block"]["start_hour_select"]["selected_option"]["value"]
-        minute_val = values["start_minute_block"]["start_minute_select"]["selected_option"]["value"]
-        # 日時をSlackが求めるUNIXタイムスタンプに変換
-        combined_dt_str = f"{date_val} {hour_val}:{minute_val}"
-        dt_obj = datetime.datetime.strptime(combined_dt_str, "%Y-%m-%d %H:%M")
-        # UTCタイムスタンプに変換 (Slack APIは通常、UTCタイムスタンプを要求する)
-        dt_timestamp = int(dt_obj.timestamp())
-
-        # オフセット値を取得
-        offset_val = values["offset_block"]["offset_select"]["selected_option"]["value"]
-        # オフセットを処理するための timedelta を初期化
-        offset_delta = datetime.timedelta(seconds=0) 
-        if offset_val != "0":
-            # オフセット値（例: "-1h", "-30m", "-1d"）を解析
-            magnitude = int(offset_val[:-1]) # 数値部分（負の値）
-            unit = offset_val[-1]            # 単位部分（'m', 'h', 'd'）
-            if unit == 'm':
-                # 分単位のオフセット
-                offset_delta = datetime.timedelta(minutes=magnitude)
-            elif unit == 'h':
-                # 時間単位のオフセット
-                offset_delta = datetime.timedelta(hours=magnitude)
-            elif unit == 'd':
-                # 日単位のオフセット
-                offset_delta = datetime.timedelta(days=magnitude)
-                
-        schedule_dt_obj = dt_obj + offset_delta
-        # UTCタイムスタンプに変換
-        offset_timestamp = int(schedule_dt_obj.timestamp())
-
-        # タイムスタンプを取得
-        current_timestamp = int(time.time())
-        # 過去の時間かどうかをチェック
-        if dt_timestamp <= current_timestamp:
-            # 過去の時間だった場合、登録を拒否し、エラーメッセージをユーザーに表示
-            error_message = {
-                "start_date_block": "過去の日時は設定できません。未来の日時を選択してください。",
-                "start_hour_block": " ",
-                "start_minute_block": " "
-            }
+
+        # モーダルを開いたときにキャッシュしたタイムゾーンで日時を解釈する
+        submission = parse_schedule_submission(body, user_timezones.resolve(client, body["user"]["id"]))
+
+        error_message = validate_schedule_submission(submission)
+        if error_message:
             # ack() 関数にエラーメッセージを渡し、モーダルを閉じずにエラー表示させる
             ack(response_action="errors", errors=error_message)
             return
-        
-        if offset_timestamp <= current_timestamp:
-            # リマインド通知が過去だった場合、登録を拒否し、エラーメッセージをユーザーに表示
-            error_message = {
-                "offset_block": "リマインド設定が過去になっています。選択し直してください。",
+
+        # モーダルを閉じる応答
+        ack()
+        # Slack API の呼び出しは ack の経路から外してワーカーで実行する
+        worker_pool.submit(schedule_event, submission, client, logger)
+
+
+    def schedule_event(submission, client, logger):
+        """
+        スケジュール登録の実行（ワーカープール上で実行される）
+        """
+
+        channel_id = submission["channel_id"]
+        user_id_setter = submission["user_id_setter"]
+
+        try:
+            reminder_text, instant_post_text = build_schedule_texts(submission)
+            
+            # 設定した配信方法（chat.scheduleMessage / ローカル）でメッセージを予約投稿
+            fields = {
+                "setter": user_id_setter,
+                "title": submission["title"],
+                "body": submission["message"],
+                "kind": KIND_SCHEDULE,
             }
-            # ack() 関数にエラーメッセージを渡し、モーダルを閉じずにエラー表示させる
-            ack(response_action="errors", errors=error_message)
-            return
+            if submission["recurrence"]:
+                # 繰り返しは登録して直近の数回分だけを予約し、以降はバックグラウンドで補充する
+                create_series(
+                    client, channel_id, submission["recurrence"], submission["post_at"],
+                    exdates=submission["exdates"],
+                    offsets=[at - submission["post_at"] for at in submission["offset_post_ats"]],
+                    tz=submission["tz"], **fields
+                )
+            else:
+                # 設定時刻と事前通知の予約を同時に送る（1 件でも失敗したら全件取り消す）
+                post_ats = [submission["post_at"], *submission["offset_post_ats"]]
+                schedule_messages(client, channel_id, [(post_at, reminder_text) for post_at in post_ats], **fields)
+            
+            client.chat_postMessage(
+                channel=channel_id,
+                text=instant_post_text
+            )
+        
+        except SlackApiError as e:
+            logger.error(f"スケジュール登録に失敗しました: {e.response['error']}")
+            error_digest.report("set_schedule", e, client, user_id_setter)
+        except Exception as e:
+            logger.error(f"スケジュール登録に失敗しました: {e}")
+            error_digest.report("set_schedule", e, client, user_id_setter)
+
+
+def register_async(app):
+    """
+    AsyncApp 向けの登録（処理内容は register と同じで、Slack API 呼び出しを await する）
+    """
+
+
+    @app.command("/set-schedule")
+    async def open_schedule_modal(ack, body, client, logger):
+        """
+        スラッシュコマンド処理：引数があればモーダルを開かずに登録し、無い・読み取れない場合はモーダル（GUI）を表示
+        """
+        
+        tz = await user_timezones.resolve_async(client, body.get("user_id"))
+        if (body.get("text") or "").strip():
+            submission = parse_schedule_command(body, tz)
+            if submission is not None:
+                error_message = validate_schedule_submission(submission)
+                if error_message:
+                    await ack(text=format_inline_errors(error_message))
+                    return
+                await ack()
+                await async_worker_pool.submit(schedule_event, submission, client, logger)
+                return
+            await ack(text=f"入力を読み取れなかったため、フォームを開きます（{SCHEDULE_USAGE}）。")
+        else:
+            await ack()
+        trigger_channel_id = body.get("channel_id")
         
         try:
-            # リマインドメッセージの作成
-            reminder_text = (
-                f"\n"
-                f"{REMIND_HEADER}\n"
-                f"{combined_dt_str} から {title}\n"
-                f"{disp_message}"
+            await open_view_async(
+                client,
+                body["trigger_id"],
+                SCHEDULE_MODAL,
+                **schedule_modal_fields(trigger_channel_id, tz)
             )
+        except Exception as e:
+            print(f"Error opening view: {e}")
+
+
+    @app.view("schedule_submission")
+    async def handle_schedule_submission(ack, body, client, logger):
+        """
+        モーダル送信処理：入力チェックと ack のみを行い、登録はワーカープールで実行する
+        """
+
+        submission = parse_schedule_submission(body, await user_timezones.resolve_async(client, body["user"]["id"]))
+
+        error_message = validate_schedule_submission(submission)
+        if error_message:
+            await ack(response_action="errors", errors=error_message)
+            return
+
+        await ack()
+        await async_worker_pool.submit(schedule_event, submission, client, logger)
+
+
+    async def schedule_event(submission, client, logger):
+        """
+        スケジュール登録の実行（ワーカープール上で実行される）
+        """
+
+        channel_id = submission["channel_id"]
+        user_id_setter = submission["user_id_setter"]
+
+        try:
+            reminder_text, instant_post_text = build_schedule_texts(submission)
             
-            # Slack API: chat.scheduleMessageでメッセージを予約投稿
-            client.chat_scheduleMessage(
-                channel=channel_id, 
-                post_at=dt_timestamp,
-                text=reminder_text
-            )
-            if offset_val != "0":
-                client.chat_scheduleMessage(
-                    channel=channel_id, 
-                    post_at=offset_timestamp,
-                    text=reminder_text
+            # 設定した配信方法（chat.scheduleMessage / ローカル）でメッセージを予約投稿
+            fields = {
+                "setter": user_id_setter,
+                "title": submission["title"],
+                "body": submission["message"],
+                "kind": KIND_SCHEDULE,
+            }
+            if submission["recurrence"]:
+                await create_series_async(
+                    client, channel_id, submission["recurrence"], submission["post_at"],
+                    exdates=submission["exdates"],
+                    offsets=[at - submission["post_at"] for at in submission["offset_post_ats"]],
+                    tz=submission["tz"], **fields
+                )
+            else:
+                post_ats = [submission["post_at"], *submission["offset_post_ats"]]
+                await schedule_messages_async(
+                    client, channel_id, [(post_at, reminder_text) for post_at in post_ats], **fields
                 )
             
-            instant_post_text = (
-                f"【 🗓️ 新規スケジュール 】\n"
-                f"<@{user_id_setter}> がスケジュールを登録しました。\n"
-                f"{combined_dt_str} から {title}\n"
-                f"{disp_message}"
-            )
-            
-            client.chat_postMessage(
+            await client.chat_postMessage(
                 channel=channel_id,
                 text=instant_post_text
             )
         
         except SlackApiError as e:
             logger.error(f"スケジュール登録に失敗しました: {e.response['error']}")
-            client.chat_postMessage(
-                channel=DEVELOPER_SLACK_ID,
-                text=f"<@{user_id_setter}>がリマインダーの設定中にSlack APIエラーが発生しました。\n詳細: `{e.response['error']}`"
-            )
+            error_digest.report("set_schedule", e, client, user_id_setter)
         except Exception as e:
             logger.error(f"スケジュール登録に失敗しました: {e}")
-            client.chat_postMessage(
-                channel=DEVELOPER_SLACK_ID,
-                text=f"<@{user_id_setter}>がリマインダーの設定中に予期せぬエラーが発生しました。\n詳細: `{e}`"
-            )
\ No newline at end of file
+            error_digest.report("set_schedule", e, client, user_id_setter)
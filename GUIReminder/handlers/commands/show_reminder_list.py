@@ -1,251 +1,854 @@
-import os
+import re
+import json
+import time
 import datetime
-from dotenv import load_dotenv
 from slack_sdk.errors import SlackApiError
 
+from handlers.commands import set_reminder, set_schedule
+from handlers.config import config
+from handlers.delivery import cancel_message, cancel_message_async, reschedule_message, reschedule_message_async
+from handlers.list_cache import listing_cache
+from handlers.recurrence import cancel_series, cancel_series_async
+from handlers.reminder_store import (
+    reminder_store,
+    reconcile_channel,
+    reconcile_channel_async,
+    reconcile_channels,
+    reconcile_channels_async
+)
+from handlers.reminder_text import KIND_REMINDER, KIND_SCHEDULE
+from handlers.user_timezones import user_timezones
+from handlers.views import HOUR_OPTIONS, HOUR_OPTION_BY_VALUE, MINUTE_INTERVAL, MINUTE_OPTIONS, MINUTE_OPTION_BY_VALUE
+from handlers.worker_pool import worker_pool, async_worker_pool
 
-load_dotenv()
-DEVELOPER_SLACK_ID = os.environ.get("DEVELOPER_SLACK_ID")
 
+# モーダルに置けるブロック数の上限と、予約 1 件あたりのブロック数（section + 編集・削除ボタン + divider）
+MAX_MODAL_BLOCKS = 100
+BLOCKS_PER_REMINDER = 3
+# 一覧の 1 ページあたりの件数（ページ送りボタンの 1 ブロックを残して上限内に収める）
+LIST_PAGE_SIZE = min(
+    config.list_page_size,
+    (MAX_MODAL_BLOCKS - 1) // BLOCKS_PER_REMINDER
+)
+# /show-reminder-list all などで、実行したユーザーが全チャンネルに設定した予約を一覧にする
+ALL_CHANNELS_ARGS = {"all", "すべて", "全て"}
 
-def register(app):
-    
+
+def encode_list_target(channel_id, setter=None):
+    """
+    一覧モーダルの private_metadata（チャンネルの一覧はチャンネルID、全チャンネルの一覧は設定者を含む JSON）
+    """
+    if setter is None:
+        return channel_id
+    return json.dumps({"channel": channel_id, "setter": setter})
+
+
+def decode_list_target(value):
+    """
+    一覧モーダルの private_metadata から (コマンドを実行したチャンネル, 全チャンネルの一覧の設定者) を取り出す
+    """
+    if value.startswith("{"):
+        target = json.loads(value)
+        return target["channel"], target["setter"]
+    return value, None
+
+
+def encode_cursor(reminder):
+    """
+    ページ送りボタンの value に載せるページ端の位置
+    """
+    return f"{reminder['post_at']}:{reminder['scheduled_message_id']}"
+
+
+def decode_cursor(value):
+    post_at, scheduled_message_id = value.split(":", 1)
+    return int(post_at), scheduled_message_id
+
+
+def format_post_at(post_at, tz=None):
+    """
+    予約日時を閲覧するユーザーのタイムゾーン tz の「YYYY/MM/DD HH:MM」にする
+    tz が None（サーバーのローカルタイム）なら予約ごとに datetime を作らず time.localtime で変換する
+    """
+    if tz is None:
+        return time.strftime("%Y/%m/%d %H:%M", time.localtime(post_at))
+    return datetime.datetime.fromtimestamp(post_at, tz).strftime("%Y/%m/%d %H:%M")
+
+
+def build_reminder_blocks(reminder, show_channel=False, tz=None):
+    """
+    予約 1 件分のブロックを生成する（全チャンネルの一覧では予約先のチャンネルも表示する）
+    """
+    schedule_id = reminder["scheduled_message_id"]
+
+    # ストアに保存したメンション・タイトル・内容を表示する
+    mentions = reminder["mentions"]
+    disp_mentions = f"【メンション】{mentions}" if mentions else ""
+    preview_text = f"{reminder['title']}\n{reminder['body']}" if reminder["title"] else reminder["body"]
+    ellipsis = "..." if len(preview_text) >= 50 else ""
+    disp_series = " 🔁繰り返し" if reminder.get("series_id") else ""
+    disp_channel = f"【チャンネル】<#{reminder['channel']}>\n" if show_channel else ""
+
+    # リマインダー情報の Section Block
+    yield {
+        "type": "section",
+        "text": {
+            "type": "mrkdwn",
+            "text": (
+                f"{disp_channel}{disp_mentions}\n"
+                f"【予約日時】{format_post_at(reminder['post_at'], tz)}{disp_series}\n"
+                f"【内容】\n{preview_text[:50]}" + ellipsis
+            )
+        }
+    }
+
+    yield {
+        "type": "actions",
+        "elements": [
+            # 編集ボタン
+            {
+                "type": "button",
+                "text": {"type": "plain_text", "text": "編集"},
+                "style": "primary",
+                "value": schedule_id, 
+                "action_id": "open_edit_modal"
+            },
+            # 削除ボタン
+            {
+                "type": "button",
+                "text": {"type": "plain_text", "text": "削除"},
+                "style": "danger", # 削除操作は赤色（danger）が推奨
+                "value": schedule_id, 
+                "action_id": "open_delete_modal"
+            }
+        ]
+    }
+
+    # 区切り線の Divider Block
+    yield {"type": "divider"}
+
+
+def build_list_modal_blocks(reminders, has_prev=False, has_next=False, show_channel=False, tz=None):
+    """
+    1 ページ分の予約（post_at 順）からモーダル用の Block Kit リストを生成する
+    表示するページの予約だけを 1 回の走査で組み立てる。日時は閲覧するユーザーのタイムゾーン tz で表示する
+    """
+
+    if not reminders:
+        empty_text = (
+            "現在、あなたが予約しているリマインダーはありません。" if show_channel
+            else "現在、このチャンネルに予約されているリマインダーはありません。"
+        )
+        return [{"type": "section", "text": {"type": "mrkdwn", "text": empty_text}}]
+
+    blocks = []
+    for reminder in reminders:
+        blocks.extend(build_reminder_blocks(reminder, show_channel, tz))
+
+    # 前へ / 次へ のページ送りボタン
+    elements = []
+    if has_prev:
+        elements.append({
+            "type": "button",
+            "text": {"type": "plain_text", "text": "◀ 前へ"},
+            "value": encode_cursor(reminders[0]),
+            "action_id": "reminder_list_prev"
+        })
+    if has_next:
+        elements.append({
+            "type": "button",
+            "text": {"type": "plain_text", "text": "次へ ▶"},
+            "value": encode_cursor(reminders[-1]),
+            "action_id": "reminder_list_next"
+        })
+    if elements:
+        blocks.append({"type": "actions", "block_id": "reminder_list_pager", "elements": elements})
+
+    return blocks
+
+
+def build_list_modal_view(channel_id, blocks, setter=None):
+    """
+    予約メッセージ一覧モーダルを生成する
+    """
     
-    def build_list_modal_blocks(messages):
+    return {
+        "type": "modal",
+        "callback_id": "reminder_list_modal", 
+        "private_metadata": encode_list_target(channel_id, setter),
+        "title": {"type": "plain_text", "text": "📝 予約中のリマインダー" if setter is None else "📝 自分のリマインダー"},
+        "blocks": blocks
+    }
+
+
+def build_list_loading_view(channel_id, setter=None):
+    """
+    一覧を読み込む間に表示するモーダル（trigger_id の期限内にすぐ開くため API 呼び出しを待たない）
+    """
+    return build_list_modal_view(channel_id, [
+        {
+            "type": "section",
+            "text": {"type": "mrkdwn", "text": "⏳ リマインダーを読み込んでいます..."}
+        }
+    ], setter)
+
+
+def load_list_page(channel_id, after=None, before=None, setter=None, tz=None):
+    """
+    ローカルストアから 1 ページ分を読み、一覧モーダルを生成する
+    setter を指定すると、そのユーザーが全チャンネルに設定した予約の一覧にする
+    キャッシュするのはストアから読んだ予約だけで、日時は閲覧するユーザーのタイムゾーン tz でその都度表示する
+    """
+    if setter is not None:
+        # 全チャンネルの一覧はチャンネルごとのキャッシュの破棄に連動できないため、毎回ストアから読む
+        reminders, has_more = reminder_store.page_setter(setter, LIST_PAGE_SIZE, after=after, before=before)
+    else:
+        # 同じチャンネルで続けて開かれた場合はキャッシュしたページを使う
+        reminders, has_more = listing_cache.load(
+            channel_id, (after, before),
+            lambda: reminder_store.page_channel(channel_id, LIST_PAGE_SIZE, after=after, before=before)
+        )
+    if not reminders and (after is not None or before is not None):
+        # 表示中に予約が配信・削除されてページが空になった場合は先頭ページに戻す
+        return load_list_page(channel_id, setter=setter, tz=tz)
+    if before is not None:
+        has_prev, has_next = has_more, True
+    else:
+        has_prev, has_next = after is not None, has_more
+    blocks = build_list_modal_blocks(reminders, has_prev, has_next, show_channel=setter is not None, tz=tz)
+    return build_list_modal_view(channel_id, blocks, setter)
+
+
+def untracked_setter_channels(setter):
+    """
+    ユーザーが予約を設定しているチャンネルのうち、まだ Slack 側と突き合わせていないもの
+    """
+    return [channel for channel in reminder_store.setter_channels(setter) if not reminder_store.is_tracked(channel)]
+
+
+def page_cursors(body):
+    """
+    ページ送りボタンのアクションから (after, before) を取り出す
+    """
+    action = body["actions"][0]
+    cursor = decode_cursor(action["value"])
+    if action["action_id"] == "reminder_list_prev":
+        return None, cursor
+    return cursor, None
+
+
+def build_notice_view(text):
+    """
+    一覧から開いたモーダルで、対象の予約が見つからない場合などに表示するモーダル
+    """
+    return {
+        "type": "modal",
+        "title": {"type": "plain_text", "text": "リマインダー"},
+        "close": {"type": "plain_text", "text": "閉じる"},
+        "blocks": [{"type": "section", "text": {"type": "mrkdwn", "text": text}}]
+    }
+
+
+NOT_FOUND_TEXT = "⚠ 対象のリマインダーが見つかりませんでした。すでに配信・削除された可能性があります。"
+
+
+def build_delete_confirmation_view(reminder, list_target="", tz=None):
+    """
+    削除の確認モーダルを生成する（list_target は削除後に読み込み直す一覧モーダルの private_metadata）
+    """
+    preview_text = f"{reminder['title']}\n{reminder['body']}" if reminder["title"] else reminder["body"]
+    blocks = [
+        {
+            "type": "section",
+            "text": {
+                "type": "mrkdwn",
+                "text": f"*設定日時*: {format_post_at(reminder['post_at'], tz)}\n*内容*: {preview_text}"
+            }
+        }
+    ]
+    series_id = reminder.get("series_id") or ""
+    if series_id:
+        # 繰り返しの予約は、この回だけか以降すべてかを選べるようにする
+        blocks.append({
+            "type": "input",
+            "block_id": "series_block",
+            "optional": True,
+            "label": {"type": "plain_text", "text": "繰り返し"},
+            "element": {
+                "type": "checkboxes",
+                "action_id": "series_checkbox",
+                "options": [
+                    {"text": {"type": "plain_text", "text": "以降の繰り返しもすべて削除"}, "value": "all"}
+                ]
+            }
+        })
+    return {
+        "type": "modal",
+        "callback_id": "delete_reminder_confirmation",
+        # 削除時に必要なチャンネルと予約ID
+        "private_metadata": json.dumps({
+            "channel": reminder["channel"], "id": reminder["scheduled_message_id"], "series": series_id,
+            "list": list_target
+        }),
+        "title": {"type": "plain_text", "text": "リマインダーの削除"},
+        "submit": {"type": "plain_text", "text": "🗑️ 削除する"},
+        "close": {"type": "plain_text", "text": "戻る"},
+        "blocks": blocks
+    }
+
+
+def parse_delete_submission(body):
+    """
+    削除の確認モーダルの送信内容から (チャンネル, 予約ID, 以降も削除する繰り返しの ID, 一覧モーダルの private_metadata) を取り出す
+    """
+    metadata = json.loads(body["view"]["private_metadata"])
+    series_id = metadata.get("series") or ""
+    if series_id:
+        values = body["view"]["state"]["values"]
+        selected = values.get("series_block", {}).get("series_checkbox", {}).get("selected_options") or []
+        if not any(opt["value"] == "all" for opt in selected):
+            series_id = ""
+    return metadata["channel"], metadata["id"], series_id, metadata.get("list") or metadata["channel"]
+
+
+def build_edit_modal(reminder, list_target="", tz=None):
+    """
+    予約の編集モーダルを生成する（/set-reminder・/set-schedule のモーダルと同じ block_id を使う）
+    日時は編集するユーザーのタイムゾーン tz で表示する
+    """
+    kind = reminder["kind"]
+    schedule_time = datetime.datetime.fromtimestamp(reminder["post_at"], tz)
+    # MINUTE_INTERVAL 単位でない時刻（ボット以外で予約されたものなど）は切り捨てて選択させる
+    minute = schedule_time.minute - schedule_time.minute % MINUTE_INTERVAL
+
+    # 空の initial_value は送らない
+    title_element = {"type": "plain_text_input", "action_id": "title_input"}
+    if reminder["title"]:
+        title_element["initial_value"] = reminder["title"]
+    message_element = {"type": "plain_text_input", "action_id": "message_input", "multiline": True}
+    if reminder["body"]:
+        message_element["initial_value"] = reminder["body"]
+
+    blocks = []
+    if kind == KIND_SCHEDULE:
+        blocks.append({
+            "type": "input",
+            "block_id": "title_block",
+            "label": {"type": "plain_text", "text": "タイトル"},
+            "element": title_element
+        })
+    blocks.extend([
+        {
+            "type": "input",
+            "block_id": "message_block",
+            "optional": kind == KIND_SCHEDULE,
+            "label": {"type": "plain_text", "text": "詳細" if kind == KIND_SCHEDULE else "リマインド内容"},
+            "element": message_element
+        },
+        {
+            "type": "input",
+            "block_id": "date_block",
+            "label": {"type": "plain_text", "text": "日付 を選択"},
+            "element": {
+                "type": "datepicker",
+                "action_id": "date_input",
+                "initial_date": schedule_time.strftime("%Y-%m-%d")
+            }
+        },
+        {
+            "type": "input",
+            "block_id": "hour_block",
+            "label": {"type": "plain_text", "text": "時間 を選択"},
+            "element": {
+                "type": "static_select",
+                "action_id": "hour_select",
+                "options": HOUR_OPTIONS,
+                "initial_option": HOUR_OPTION_BY_VALUE[schedule_time.strftime("%H")],
+            }
+        },
+        {
+            "type": "input",
+            "block_id": "minute_block",
+            "label": {"type": "plain_text", "text": "分 を選択"},
+            "element": {
+                "type": "static_select",
+                "action_id": "minute_select",
+                "options": MINUTE_OPTIONS,
+                "initial_option": MINUTE_OPTION_BY_VALUE[f"{minute:02d}"],
+            }
+        },
+    ])
+    if kind == KIND_REMINDER:
+        user_element = {
+            "type": "multi_users_select",
+            "action_id": "user_select_input",
+            "placeholder": {"type": "plain_text", "text": "メンションするユーザーを選択"}
+        }
+        mentioned_users = re.findall(r"<@(\w+)>", reminder["mentions"])
+        if mentioned_users:
+            user_element["initial_users"] = mentioned_users
+        blocks.append({
+            "type": "input",
+            "block_id": "user_block",
+            "optional": True,
+            "label": {"type": "plain_text", "text": "メンション"},
+            "element": user_element
+        })
+
+    return {
+        "type": "modal",
+        "callback_id": "edit_reminder_submission",
+        "private_metadata": json.dumps(
+            {"channel": reminder["channel"], "id": reminder["scheduled_message_id"], "list": list_target}
+        ),
+        "title": {"type": "plain_text", "text": "✏️ リマインダーの編集"},
+        "submit": {"type": "plain_text", "text": "更新する"},
+        "close": {"type": "plain_text", "text": "戻る"},
+        "blocks": blocks
+    }
+
+
+def parse_edit_submission(body, tz=None):
+    """
+    編集モーダルの送信内容を取り出す（日時は送信したユーザーのタイムゾーン tz で解釈する）
+    """
+    metadata = json.loads(body["view"]["private_metadata"])
+    values = body["view"]["state"]["values"]
+
+    date_val = values["date_block"]["date_input"]["selected_date"]
+    hour_val = values["hour_block"]["hour_select"]["selected_option"]["value"]
+    minute_val = values["minute_block"]["minute_select"]["selected_option"]["value"]
+    combined_dt_str = f"{date_val} {hour_val}:{minute_val}"
+    dt_obj = datetime.datetime.strptime(combined_dt_str, "%Y-%m-%d %H:%M").replace(tzinfo=tz)
+
+    user_ids_to_mention = values.get("user_block", {}).get("user_select_input", {}).get("selected_users", [])
+    return {
+        "channel_id": metadata["channel"],
+        "scheduled_message_id": metadata["id"],
+        "list_target": metadata.get("list") or metadata["channel"],
+        "user_id": body["user"]["id"],
+        "title": values.get("title_block", {}).get("title_input", {}).get("value") or "",
+        "message": values["message_block"]["message_input"]["value"] or "",
+        "mention_text": " ".join(f"<@{user_id}>" for user_id in user_ids_to_mention),
+        "combined_dt_str": combined_dt_str,
+        "post_at": int(dt_obj.timestamp()),
+    }
+
+
+def build_edited_reminder(reminder, submission):
+    """
+    編集前の予約と編集内容から、予約し直すメッセージ本文とストアの項目を生成する
+    """
+    kind = reminder["kind"]
+    # 本文は各コマンドと同じ形式で作り直す（設定者は編集前のまま）
+    texts = {
+        "user_id_setter": reminder["setter"],
+        "combined_dt_str": submission["combined_dt_str"],
+        "title": submission["title"],
+        "message": submission["message"],
+        "mention_text": submission["mention_text"],
+    }
+    if kind == KIND_REMINDER:
+        text = set_reminder.build_reminder_texts(texts)[0]
+    elif kind == KIND_SCHEDULE:
+        text = set_schedule.build_schedule_texts(texts)[0]
+    else:
+        text = submission["message"]
+    fields = {
+        "setter": reminder["setter"],
+        "mentions": submission["mention_text"] if kind == KIND_REMINDER else reminder["mentions"],
+        "title": submission["title"],
+        "body": submission["message"],
+        "kind": kind,
+        # 繰り返しの 1 回分を編集しても、その繰り返しに属したままにする
+        "series_id": reminder.get("series_id") or "",
+    }
+    return text, fields
+
+
+def register(app):
+
+
+    def show_list_page(client, logger, channel_id, view_id, view_hash, after=None, before=None, reconcile=False,
+                       setter=None, viewer=None):
         """
-        予約メッセージのリストからモーダル用の Block Kit リストを生成する
+        一覧の 1 ページを読み込んで views_update でモーダルを差し替える（日時は閲覧するユーザー viewer のタイムゾーンで表示する）
         """
-        
-        if not messages:
-            return [
-                {
-                    "type": "section",
-                    "text": {"type": "mrkdwn", "text": "現在、このチャンネルに予約されているリマインダーはありません。"}
-                }
-            ]
-            
-        blocks = []
-        
-        for msg in messages:
-            schedule_time_ts = msg.get("post_at")
-            schedule_id = msg.get("id")
-            
-            # UNIXタイムスタンプを人が読める形式に変換
-            schedule_time = datetime.datetime.fromtimestamp(
-                schedule_time_ts, 
-                tz=datetime.timezone.utc
-            ).astimezone(None)
-
-            # 予約メッセージの本文（text）から、リマインド内容を取得
-            full_text = msg.get("text", "（内容不明）")
-            
-            # REMIND_HEADER 以外を抽出
-            parts = full_text.split('\n', 2)
-            mentions = parts[0]
-            disp_mentions = f"【メンション】{mentions}" if mentions else ""
-            preview_text = parts[2]
-            ellipsis = "..." if len(preview_text) >= 50 else ""
-            
-            # リマインダー情報の Section Block
-            blocks.append({
-                "type": "section",
-                "text": {
-                    "type": "mrkdwn",
-                    "text": (
-                        f"{disp_mentions}\n"
-                        f"【予約日時】{schedule_time.strftime('%Y/%m/%d %H:%M')}\n"
-                        f"【内容】\n{preview_text[:50]}" + ellipsis
-                    )
-                }
-            })
-            
-            # blocks.append({
-            #     "type": "actions",
-            #     "elements": [
-            #         # 編集ボタン
-            #         {
-            #             "type": "button",
-            #             "text": {"type": "plain_text", "text": "編集"},
-            #             "style": "primary",
-            #             "value": schedule_id, 
-            #             "action_id": "open_edit_modal"
-            #         },
-            #         # 削除ボタン
-            #         {
-            #             "type": "button",
-            #             "text": {"type": "plain_text", "text": "削除"},
-            #             "style": "danger", # 削除操作は赤色（danger）が推奨
-            #             "value": schedule_id, 
-            #             "action_id": "open_delete_modal"
-            #         }
-            #     ]
-            # })
-            
-            # 区切り線の Divider Block
-            blocks.append({"type": "divider"})
-        
-        return blocks
-    
+        try:
+            tz = user_timezones.resolve(client, viewer)
+            if reconcile and setter is not None:
+                # 全チャンネルの一覧は、先にストアの内容を表示してから、まだ突き合わせていないチャンネルを同時に突き合わせる
+                # （chat.scheduledMessages.list のレート制限で、チャンネルが多いと時間がかかるため）
+                result = client.views_update(
+                    view_id=view_id, hash=view_hash, view=load_list_page(channel_id, setter=setter, tz=tz)
+                )
+                if not reconcile_channels(client, untracked_setter_channels(setter)):
+                    return
+                view_hash = result["view"]["hash"]
+            elif reconcile and not reminder_store.is_tracked(channel_id):
+                # 初めて一覧を開くチャンネルは、ボット以外で予約されたメッセージを取り込む
+                reconcile_channel(client, channel_id)
+            # hash を渡し、その間に別の操作で更新されていたら上書きしない
+            client.views_update(
+                view_id=view_id,
+                hash=view_hash,
+                view=load_list_page(channel_id, after=after, before=before, setter=setter, tz=tz)
+            )
+
+        except SlackApiError as e:
+            if e.response["error"] == "hash_conflict":
+                logger.info("一覧モーダルが先に更新されていたため読み込み結果を破棄しました")
+                return
+            logger.error(f"予約メッセージの取得に失敗しました: {e.response['error']}")
+            # エラー時はチャンネルにメッセージを投稿してユーザーに通知
+            client.chat_postMessage(
+                channel=channel_id,
+                text=f"リマインダー一覧の取得中にエラーが発生しました。\n詳細: `{e.response['error']}`"
+            )
+
 
     @app.command("/show-reminder-list")
     def open_reminder_list_modal(ack, body, client, logger):
         ack()
         
         channel_id = body["channel_id"]
+        # 引数が all の場合は、実行したユーザーが全チャンネルに設定した予約の一覧にする
+        setter = body["user_id"] if body.get("text", "").strip().lower() in ALL_CHANNELS_ARGS else None
         
         try:
-            result = client.chat_scheduledMessages_list(
-                channel=channel_id
-            )
-            
-            messages = result.get("scheduled_messages", [])
-            
-            # ソート
-            sorted_messages = sorted(messages, key=lambda msg: msg.get('post_at', 0))
-            # 予約メッセージのリストをBlock Kitの要素に変換
-            modal_blocks = build_list_modal_blocks(sorted_messages)
-            
-            # モーダルを開く
-            client.views_open(
+            # まず読み込み中のモーダルを開き、一覧は views_update で後から表示する
+            result = client.views_open(
                 trigger_id=body["trigger_id"],
-                view={
-                    "type": "modal",
-                    "callback_id": "reminder_list_modal", 
-                    "private_metadata": body["channel_id"],
-                    "title": {"type": "plain_text", "text": "📝 予約中のリマインダー"},
-                    "blocks": modal_blocks
-                }
+                view=build_list_loading_view(channel_id, setter)
             )
+        except SlackApiError as e:
+            logger.error(f"一覧モーダルを開けませんでした: {e.response['error']}")
+            return
+
+        view = result["view"]
+        worker_pool.submit(
+            show_list_page, client, logger, channel_id, view["id"], view["hash"], reconcile=True, setter=setter,
+            viewer=body["user_id"]
+        )
+
+
+    @app.action("reminder_list_prev")
+    @app.action("reminder_list_next")
+    def handle_list_page(ack, body, client, logger):
+        ack()
+        
+        after, before = page_cursors(body)
+        view = body["view"]
+        channel_id, setter = decode_list_target(view["private_metadata"])
+        worker_pool.submit(
+            show_list_page, client, logger, channel_id, view["id"], view["hash"],
+            after=after, before=before, setter=setter, viewer=body["user"]["id"]
+        )
+
 
+    def refresh_list(client, logger, list_target, view_id, viewer):
+        """
+        編集・削除の後に一覧モーダル（先頭ページ）を読み込み直す
+        """
+        channel_id, setter = decode_list_target(list_target)
+        try:
+            tz = user_timezones.resolve(client, viewer)
+            client.views_update(view_id=view_id, view=load_list_page(channel_id, setter=setter, tz=tz))
+        except SlackApiError as e:
+            logger.info(f"一覧モーダルを更新できませんでした: {e.response['error']}")
+
+
+    def notify(client, logger, channel_id, user_id, text):
+        """
+        操作したユーザーにだけ結果を通知する（Ephemeral Message）
+        """
+        try:
+            client.chat_postEphemeral(channel=channel_id, user=user_id, text=text)
         except SlackApiError as e:
+            logger.error(f"結果の通知に失敗しました: {e.response['error']}")
+
+
+    @app.action("open_edit_modal")
+    def handle_edit_click(ack, body, client, logger):
+        ack()
+        
+        # ユーザーがクリックしたボタンの value (schedule_id) で予約を引く（一覧の再取得は不要）
+        reminder = reminder_store.get(body["actions"][0]["value"])
+        list_target = body["view"]["private_metadata"]
+        tz = user_timezones.resolve(client, body["user"]["id"])
+        view = build_edit_modal(reminder, list_target, tz) if reminder else build_notice_view(NOT_FOUND_TEXT)
+        try:
+            # 一覧モーダルの上に編集モーダルを重ねる
+            client.views_push(trigger_id=body["trigger_id"], view=view)
+        except SlackApiError as e:
+            logger.error(f"編集モーダルを開けませんでした: {e.response['error']}")
+
+
+    @app.action("open_delete_modal")
+    def handle_delete_click(ack, body, client, logger):
+        ack()
+        
+        reminder = reminder_store.get(body["actions"][0]["value"])
+        list_target = body["view"]["private_metadata"]
+        tz = user_timezones.resolve(client, body["user"]["id"])
+        view = (
+            build_delete_confirmation_view(reminder, list_target, tz) if reminder else build_notice_view(NOT_FOUND_TEXT)
+        )
+        try:
+            client.views_push(trigger_id=body["trigger_id"], view=view)
+        except SlackApiError as e:
+            logger.error(f"削除の確認モーダルを開けませんでした: {e.response['error']}")
+
+
+    @app.view("edit_reminder_submission")
+    def handle_edit_submission(ack, body, client, logger):
+        # 編集モーダルを開いたときにキャッシュしたタイムゾーンで日時を解釈する
+        submission = parse_edit_submission(body, user_timezones.resolve(client, body["user"]["id"]))
+
+        error_message = set_reminder.validate_reminder_submission(submission)
+        if error_message:
+            ack(response_action="errors", errors=error_message)
+            return
+
+        # 編集モーダルを閉じて一覧モーダルに戻る
+        ack()
+        worker_pool.submit(edit_reminder, submission, body["view"]["root_view_id"], client, logger)
+
+
+    def edit_reminder(submission, root_view_id, client, logger):
+        """
+        予約の編集（新しい内容で予約してから古い予約を取り消す。失敗した場合は元の予約が残る）
+        """
+        channel_id = submission["channel_id"]
+        reminder = reminder_store.get(submission["scheduled_message_id"])
+        if reminder is None:
+            notify(client, logger, channel_id, submission["user_id"], NOT_FOUND_TEXT)
+            return
+
+        text, fields = build_edited_reminder(reminder, submission)
+        try:
+            reschedule_message(
+                client, channel_id, reminder["scheduled_message_id"], submission["post_at"], text, **fields
+            )
+        except SlackApiError as e:
+            logger.error(f"予約メッセージの編集に失敗: {e.response['error']}")
+            notify(client, logger, channel_id, submission["user_id"],
+                   f"❌ リマインダーの編集に失敗しました: `{e.response['error']}`")
+            return
+
+        refresh_list(client, logger, submission["list_target"], root_view_id, submission["user_id"])
+        notify(client, logger, channel_id, submission["user_id"],
+               f"✅ リマインダーを {submission['combined_dt_str']} に更新しました。")
+
+
+    @app.view("delete_reminder_confirmation")
+    def handle_delete_submission(ack, body, client, logger):
+        ack()
+        
+        channel_id, schedule_id, series_id, list_target = parse_delete_submission(body)
+        worker_pool.submit(
+            delete_reminder, channel_id, schedule_id, body["user"]["id"],
+            body["view"]["root_view_id"], client, logger, series_id, list_target
+        )
+
+
+    def delete_reminder(channel_id, schedule_id, user_id, root_view_id, client, logger, series_id="", list_target=None):
+        """
+        予約の削除（ストアの予約IDで直接取り消す）
+        series_id が指定されていれば、繰り返しを停止して以降の予約もすべて取り消す
+        """
+        try:
+            cancel_message(client, channel_id, schedule_id)
+            if series_id:
+                cancel_series(client, series_id)
+        except SlackApiError as e:
+            logger.error(f"予約メッセージの削除に失敗: {e.response['error']}")
+            notify(client, logger, channel_id, user_id, f"❌ リマインダーの削除に失敗しました: `{e.response['error']}`")
+            return
+
+        refresh_list(client, logger, list_target or channel_id, root_view_id, user_id)
+        notify(client, logger, channel_id, user_id,
+               "✅ 繰り返しのリマインダーをすべて削除しました。" if series_id else "✅ リマインダーを削除しました。")
+
+
+def register_async(app):
+    """
+    AsyncApp 向けの登録（処理内容は register と同じで、Slack API 呼び出しを await する）
+    """
+
+
+    async def show_list_page(client, logger, channel_id, view_id, view_hash, after=None, before=None,
+                             reconcile=False, setter=None, viewer=None):
+        try:
+            tz = await user_timezones.resolve_async(client, viewer)
+            if reconcile and setter is not None:
+                result = await client.views_update(
+                    view_id=view_id, hash=view_hash, view=load_list_page(channel_id, setter=setter, tz=tz)
+                )
+                if not await reconcile_channels_async(client, untracked_setter_channels(setter)):
+                    return
+                view_hash = result["view"]["hash"]
+            elif reconcile and not reminder_store.is_tracked(channel_id):
+                await reconcile_channel_async(client, channel_id)
+            await client.views_update(
+                view_id=view_id,
+                hash=view_hash,
+                view=load_list_page(channel_id, after=after, before=before, setter=setter, tz=tz)
+            )
+
+        except SlackApiError as e:
+            if e.response["error"] == "hash_conflict":
+                logger.info("一覧モーダルが先に更新されていたため読み込み結果を破棄しました")
+                return
             logger.error(f"予約メッセージの取得に失敗しました: {e.response['error']}")
-            # エラー時はチャンネルにメッセージを投稿してユーザーに通知
-            client.chat_postMessage(
+            await client.chat_postMessage(
                 channel=channel_id,
                 text=f"リマインダー一覧の取得中にエラーが発生しました。\n詳細: `{e.response['error']}`"
             )
 
 
-    # def open_confirmation_modal(client, logger, schedule_id, trigger_id, channel_id):
-    #     try:
-    #         # ※ chat.scheduledMessages.list は全件リストであり、特定IDの詳細は取得できないため、
-    #         #    リスト全体を取得して該当IDを検索する必要があります。
-    #         result = client.chat_scheduledMessages_list(channel=channel_id)
-            
-    #         # IDが一致するメッセージを検索
-    #         message_data = next((m for m in result.get("scheduled_messages", []) if m["id"] == schedule_id), None)
-            
-    #         if not message_data:
-    #             # メッセージが見つからない場合のエラー処理
-    #             client.chat_postMessage(channel=channel_id, text="⚠ 編集対象のリマインダーが見つかりませんでした。")
-    #             return
-
-    #         # リマインド内容と日時を抽出
-    #         raw_text = message_data.get("text", "（内容不明）")
-            
-    #         # プレビューテキストの取得 (以前の抽出ロジックを使用)
-    #         # 最終行の内容のみを取得（実際の構造に合わせて調整してください）
-    #         preview_text = raw_text.split('\n\n')[-1].strip()
-            
-    #         # UNIXタイムスタンプから日時を取得
-    #         schedule_time_ts = message_data.get("post_at")
-    #         schedule_time = datetime.datetime.fromtimestamp(schedule_time_ts).strftime('%Y/%m/%d %H:%M:%S')
-
-    #         # 最終確認モーダルを開く
-    #         client.views_open(
-    #             trigger_id=trigger_id,
-    #             view={
-    #                 "type": "modal",
-    #                 "callback_id": "edit_delete_confirmation",
-    #                 "private_metadata": schedule_id, # 削除・編集時に必要
-    #                 "title": {"type": "plain_text", "text": "リマインダーの確認"},
-    #                 "blocks": [
-    #                     {
-    #                         "type": "section",
-    #                         "text": {"type": "mrkdwn", "text": f"**設定日時**: {schedule_time}\n**内容**: {preview_text}"}
-    #                     },
-    #                     {"type": "divider"},
-    #                     # 編集ボタンと削除ボタンを Actions Block で配置
-    #                     {
-    #                         "type": "actions",
-    #                         "elements": [
-    #                             {
-    #                                 "type": "button",
-    #                                 "text": {"type": "plain_text", "text": "✏️ 編集する"},
-    #                                 "style": "primary",
-    #                                 "value": schedule_id,
-    #                                 "action_id": "final_edit_button" # 編集フローへ
-    #                             },
-    #                             {
-    #                                 "type": "button",
-    #                                 "text": {"type": "plain_text", "text": "🗑️ 削除する"},
-    #                                 "style": "danger",
-    #                                 "value": schedule_id,
-    #                                 "action_id": "final_delete_button" # 削除フローへ
-    #                             }
-    #                         ]
-    #                     }
-    #                 ]
-    #             }
-    #         )
-    #     except SlackApiError as e:
-    #         logger.error(f"リマインダー詳細の取得に失敗: {e.response['error']}")
-
-
-    # @app.action("open_edit_modal")
-    # def handle_edit_click(ack, body, client, logger):
-    #     ack()
+    @app.command("/show-reminder-list")
+    async def open_reminder_list_modal(ack, body, client, logger):
+        await ack()
         
-    #     # ユーザーがクリックしたボタンの value (schedule_id) を取得
-    #     schedule_id = body["actions"][0]["value"]
-    #     trigger_id = body["trigger_id"]
-    #     channel_id = body["channel"]["id"]
+        channel_id = body["channel_id"]
+        setter = body["user_id"] if body.get("text", "").strip().lower() in ALL_CHANNELS_ARGS else None
+        
+        try:
+            result = await client.views_open(
+                trigger_id=body["trigger_id"],
+                view=build_list_loading_view(channel_id, setter)
+            )
+        except SlackApiError as e:
+            logger.error(f"一覧モーダルを開けませんでした: {e.response['error']}")
+            return
+
+        view = result["view"]
+        await async_worker_pool.submit(
+            show_list_page, client, logger, channel_id, view["id"], view["hash"], reconcile=True, setter=setter,
+            viewer=body["user_id"]
+        )
+
+
+    @app.action("reminder_list_prev")
+    @app.action("reminder_list_next")
+    async def handle_list_page(ack, body, client, logger):
+        await ack()
         
-    #     # 編集用モーダルを開く関数を呼び出す
-    #     open_confirmation_modal(client, logger, schedule_id, trigger_id, channel_id)
+        after, before = page_cursors(body)
+        view = body["view"]
+        channel_id, setter = decode_list_target(view["private_metadata"])
+        await async_worker_pool.submit(
+            show_list_page, client, logger, channel_id, view["id"], view["hash"],
+            after=after, before=before, setter=setter, viewer=body["user"]["id"]
+        )
+
+
+    async def refresh_list(client, logger, list_target, view_id, viewer):
+        channel_id, setter = decode_list_target(list_target)
+        try:
+            tz = await user_timezones.resolve_async(client, viewer)
+            await client.views_update(view_id=view_id, view=load_list_page(channel_id, setter=setter, tz=tz))
+        except SlackApiError as e:
+            logger.info(f"一覧モーダルを更新できませんでした: {e.response['error']}")
 
 
-    # @app.action("open_delete_modal")
-    # def handle_delete_scheduled_reminder(ack, body, client, logger):
-    #     ack()
+    async def notify(client, logger, channel_id, user_id, text):
+        try:
+            await client.chat_postEphemeral(channel=channel_id, user=user_id, text=text)
+        except SlackApiError as e:
+            logger.error(f"結果の通知に失敗しました: {e.response['error']}")
+
+
+    @app.action("open_edit_modal")
+    async def handle_edit_click(ack, body, client, logger):
+        await ack()
         
-    #     # 削除対象IDの取得
-    #     schedule_id = str(body["actions"][0]["value"])
+        reminder = reminder_store.get(body["actions"][0]["value"])
+        list_target = body["view"]["private_metadata"]
+        tz = await user_timezones.resolve_async(client, body["user"]["id"])
+        view = build_edit_modal(reminder, list_target, tz) if reminder else build_notice_view(NOT_FOUND_TEXT)
+        try:
+            await client.views_push(trigger_id=body["trigger_id"], view=view)
+        except SlackApiError as e:
+            logger.error(f"編集モーダルを開けませんでした: {e.response['error']}")
+
+
+    @app.action("open_delete_modal")
+    async def handle_delete_click(ack, body, client, logger):
+        await ack()
         
-    #     # チャンネルIDの安全な取得 (モーダルからのアクションと仮定)
-    #     view_metadata = body.get("view", {}).get("private_metadata")
+        reminder = reminder_store.get(body["actions"][0]["value"])
+        list_target = body["view"]["private_metadata"]
+        tz = await user_timezones.resolve_async(client, body["user"]["id"])
+        view = (
+            build_delete_confirmation_view(reminder, list_target, tz) if reminder else build_notice_view(NOT_FOUND_TEXT)
+        )
+        try:
+            await client.views_push(trigger_id=body["trigger_id"], view=view)
+        except SlackApiError as e:
+            logger.error(f"削除の確認モーダルを開けませんでした: {e.response['error']}")
+
+
+    @app.view("edit_reminder_submission")
+    async def handle_edit_submission(ack, body, client, logger):
+        submission = parse_edit_submission(body, await user_timezones.resolve_async(client, body["user"]["id"]))
+
+        error_message = set_reminder.validate_reminder_submission(submission)
+        if error_message:
+            await ack(response_action="errors", errors=error_message)
+            return
+
+        await ack()
+        await async_worker_pool.submit(edit_reminder, submission, body["view"]["root_view_id"], client, logger)
+
+
+    async def edit_reminder(submission, root_view_id, client, logger):
+        channel_id = submission["channel_id"]
+        reminder = reminder_store.get(submission["scheduled_message_id"])
+        if reminder is None:
+            await notify(client, logger, channel_id, submission["user_id"], NOT_FOUND_TEXT)
+            return
+
+        text, fields = build_edited_reminder(reminder, submission)
+        try:
+            await reschedule_message_async(
+                client, channel_id, reminder["scheduled_message_id"], submission["post_at"], text, **fields
+            )
+        except SlackApiError as e:
+            logger.error(f"予約メッセージの編集に失敗: {e.response['error']}")
+            await notify(client, logger, channel_id, submission["user_id"],
+                         f"❌ リマインダーの編集に失敗しました: `{e.response['error']}`")
+            return
+
+        await refresh_list(client, logger, submission["list_target"], root_view_id, submission["user_id"])
+        await notify(client, logger, channel_id, submission["user_id"],
+                     f"✅ リマインダーを {submission['combined_dt_str']} に更新しました。")
+
+
+    @app.view("delete_reminder_confirmation")
+    async def handle_delete_submission(ack, body, client, logger):
+        await ack()
         
-    #     # private_metadata が存在しなければ、アクションペイロード内の channel ID を試す
-    #     if view_metadata:
-    #         channel_id = view_metadata
-    #     else:
-    #         # fallback: メッセージ上のボタンなど、他の形式のペイロードを想定
-    #         channel_id = body.get("channel", {}).get("id")
-            
-    #     if not channel_id:
-    #         logger.error("Channel ID not found for scheduled message deletion.")
-    #         # チャンネルIDが取得できない場合は処理を中断
-    #         return 
-
-    #     try:
-    #         # chat.deleteScheduledMessage APIを使って予約メッセージを削除
-    #         client.chat_deleteScheduledMessage(
-    #             channel=channel_id,
-    #             scheduled_message_id=schedule_id
-    #         )
-            
-    #         # 削除成功の確認メッセージを投稿 (Ephemeral Messageでユーザーに通知)
-    #         client.chat_postEphemeral(
-    #             channel=channel_id,
-    #             user=body["user"]["id"],
-    #             text=f"✅ 予約ID `{schedule_id}` のリマインダーを削除しました。",
-    #             # モーダル内のメッセージを更新したい場合は view_update を使うが、今回はシンプルにephemeralで通知
-    #         )
-
-    #     except SlackApiError as e:
-    #         logger.error(f"予約メッセージの削除に失敗: {e.response['error']}")
-    #         client.chat_postEphemeral(
-    #             channel=channel_id,
-    #             user=body["user"]["id"],
-    #             text=f"❌ リマインダーの削除に失敗しました: `{e.response['error']}`"
-    #         )
\ No newline at end of file
+        channel_id, schedule_id, series_id, list_target = parse_delete_submission(body)
+        await async_worker_pool.submit(
+            delete_reminder, channel_id, schedule_id, body["user"]["id"],
+            body["view"]["root_view_id"], client, logger, series_id, list_target
+        )
+
+
+    async def delete_reminder(channel_id, schedule_id, user_id, root_view_id, client, logger, series_id="",
+                              list_target=None):
+        try:
+            await cancel_message_async(client, channel_id, schedule_id)
+            if series_id:
+                await cancel_series_async(client, series_id)
+        except SlackApiError as e:
+            logger.error(f"予約メッセージの削除に失敗: {e.response['error']}")
+            await notify(client, logger, channel_id, user_id,
+                         f"❌ リマインダーの削除に失敗しました: `{e.response['error']}`")
+            return
+
+        await refresh_list(client, logger, list_target or channel_id, root_view_id, user_id)
+        await notify(client, logger, channel_id, user_id,
+                     "✅ 繰り返しのリマインダーをすべて削除しました。" if series_id else "✅ リマインダーを削除しました。")
@@ -0,0 +1,129 @@
+import os
+from dotenv import load_dotenv
+
+
+def _int(environ, name, default):
+    return int(environ.get(name) or default)
+
+
+def _float(environ, name, default):
+    return float(environ.get(name) or default)
+
+
+def _bool(environ, name, default):
+    return (environ.get(name) or default).lower() == "true"
+
+
+class Config:
+    """
+    .env と環境変数から読み込んだ設定
+    各モジュールはこのオブジェクトから値を取り出し、.env の読み込みは起動時に 1 回だけ行う
+    """
+
+    def __init__(self, environ):
+        # Slack アプリの認証情報・通知先
+        self.slack_bot_token = environ.get("SLACK_BOT_TOKEN")
+        self.slack_signing_secret = environ.get("SLACK_SIGNING_SECRET")
+        self.slack_app_token = environ.get("SLACK_APP_TOKEN")
+        self.developer_slack_id = environ.get("DEVELOPER_SLACK_ID")
+        # 開発者へのエラー通知をまとめる間隔（秒）と、1 回のまとめに保持するエラーの種類の上限
+        self.error_digest_interval = _float(environ, "ERROR_DIGEST_INTERVAL", "60")
+        self.error_digest_max_signatures = _int(environ, "ERROR_DIGEST_MAX_SIGNATURES", "100")
+        self.slack_api_base_url = environ.get("SLACK_API_BASE_URL") or "https://slack.com/api/"
+
+        # 複数のワークスペースへのインストール（OAuth）。client_id と client_secret を設定すると有効になる
+        self.slack_client_id = environ.get("SLACK_CLIENT_ID")
+        self.slack_client_secret = environ.get("SLACK_CLIENT_SECRET")
+        self.slack_scopes = environ.get("SLACK_SCOPES") or "commands,chat:write,chat:write.public,files:read,users:read"
+        self.installation_store = (environ.get("INSTALLATION_STORE") or "sqlite").lower()
+        self.installation_store_path = environ.get("INSTALLATION_STORE_PATH") or ""
+        self.installation_cache_ttl = _float(environ, "INSTALLATION_CACHE_TTL", "300")
+        self.installation_cache_size = _int(environ, "INSTALLATION_CACHE_SIZE", "1024")
+
+        # 起動方法（socket / http）と実行モード（sync / async）
+        self.serve_mode = (environ.get("SERVE_MODE") or "socket").lower()
+        self.runtime_mode = (environ.get("RUNTIME_MODE") or "sync").lower()
+
+        # HTTP モードのサーバー
+        self.port = _int(environ, "PORT", "3000")
+        self.web_concurrency = _int(environ, "WEB_CONCURRENCY", str(os.cpu_count() or 1))
+        self.web_threads = _int(environ, "WEB_THREADS", "8")
+        self.keepalive = _int(environ, "KEEPALIVE", "5")
+        self.graceful_timeout = _int(environ, "GRACEFUL_TIMEOUT", "30")
+        self.jobs_lock_path = environ.get("JOBS_LOCK_PATH") or ""
+        self.jobs_lock_retry = _float(environ, "JOBS_LOCK_RETRY", "30")
+        self.metrics_port = _int(environ, "METRICS_PORT", "9100")
+
+        # HTTP モードで公開する予約の iCalendar フィード（/calendar/...）。公開 URL を設定すると /reminder-feed で URL を配る
+        self.calendar_feed_base_url = (environ.get("CALENDAR_FEED_BASE_URL") or "").rstrip("/")
+        self.calendar_feed_secret = environ.get("CALENDAR_FEED_SECRET") or self.slack_signing_secret or ""
+        self.calendar_feed_cache_size = _int(environ, "CALENDAR_FEED_CACHE_SIZE", "128")
+
+        # ack 後の処理を行うワーカープール
+        self.worker_pool_size = _int(environ, "WORKER_POOL_SIZE", "8")
+        self.worker_queue_size = _int(environ, "WORKER_QUEUE_SIZE", "256")
+
+        # 一括登録・一括削除のジョブ（同時に実行する数・実行待ちにできる数）
+        self.bulk_job_concurrency = _int(environ, "BULK_JOB_CONCURRENCY", "2")
+        self.bulk_job_queue_size = _int(environ, "BULK_JOB_QUEUE_SIZE", "16")
+        # /import-schedule の一括登録（読み込む最大件数・進捗を更新する件数）
+        self.import_max_rows = _int(environ, "IMPORT_MAX_ROWS", "5000")
+        self.import_batch_size = _int(environ, "IMPORT_BATCH_SIZE", "25")
+        # /purge-reminders の一括削除（同時に削除する数・進捗を更新する件数）
+        self.purge_concurrency = _int(environ, "PURGE_CONCURRENCY", "4")
+        self.purge_batch_size = _int(environ, "PURGE_BATCH_SIZE", "50")
+
+        # ローカルストアと予約の配信
+        self.reminder_db_path = environ.get("REMINDER_DB_PATH") or "reminders.db"
+        self.reconcile_interval = _int(environ, "RECONCILE_INTERVAL", "600")
+        self.reconcile_fanout_concurrency = _int(environ, "RECONCILE_FANOUT_CONCURRENCY", "4")
+        self.reminder_backend = (environ.get("REMINDER_BACKEND") or "slack").lower()
+        self.schedule_fanout_concurrency = _int(environ, "SCHEDULE_FANOUT_CONCURRENCY", "4")
+        self.scheduler_catchup_limit = _int(environ, "SCHEDULER_CATCHUP_LIMIT", str(24 * 60 * 60))
+        self.scheduler_max_sleep = _float(environ, "SCHEDULER_MAX_SLEEP", "30")
+        self.scheduler_sync_interval = _float(environ, "SCHEDULER_SYNC_INTERVAL", "30")
+        self.recurrence_window = _int(environ, "RECURRENCE_WINDOW", "5")
+        self.recurrence_horizon = _int(environ, "RECURRENCE_HORIZON", str(30 * 24 * 60 * 60))
+        self.recurrence_topup_interval = _int(environ, "RECURRENCE_TOPUP_INTERVAL", "300")
+
+        # Slack API の呼び出し
+        self.slack_api_max_retries = _int(environ, "SLACK_API_MAX_RETRIES", "3")
+        self.slack_api_retry_base = _float(environ, "SLACK_API_RETRY_BASE", "0.5")
+        self.slack_rate_limit_scale = _float(environ, "SLACK_RATE_LIMIT_SCALE", "1")
+
+        # モーダルと一覧
+        self.view_preserialize = _bool(environ, "VIEW_PRESERIALIZE", "false")
+        self.list_page_size = _int(environ, "LIST_PAGE_SIZE", "20")
+        self.list_cache_ttl = _float(environ, "LIST_CACHE_TTL", "30")
+        self.list_cache_size = _int(environ, "LIST_CACHE_SIZE", "256")
+
+        # ユーザーごとのタイムゾーン（users.info のキャッシュの有効期間・取得できなかった場合の有効期間・最大件数・起動時の読み込み）
+        self.user_tz_cache_ttl = _float(environ, "USER_TZ_CACHE_TTL", str(6 * 60 * 60))
+        self.user_tz_negative_ttl = _float(environ, "USER_TZ_NEGATIVE_TTL", "300")
+        self.user_tz_cache_size = _int(environ, "USER_TZ_CACHE_SIZE", "10000")
+        self.user_tz_warm_up = _bool(environ, "USER_TZ_WARM_UP", "true")
+        self.user_tz_lookup_timeout = _float(environ, "USER_TZ_LOOKUP_TIMEOUT", "1.5")
+
+    @property
+    def is_socket_mode(self):
+        return self.serve_mode == "socket"
+
+    @property
+    def is_async_mode(self):
+        return self.runtime_mode == "async"
+
+    @property
+    def is_multi_workspace(self):
+        return bool(self.slack_client_id and self.slack_client_secret)
+
+    @classmethod
+    def load(cls, dotenv_path=None):
+        """
+        .env を読み込んでから環境変数の設定を返す（すでに設定されている環境変数は .env で上書きしない）
+        """
+        load_dotenv(dotenv_path)
+        return cls(os.environ)
+
+
+# 全モジュールで共有する設定
+config = Config.load()
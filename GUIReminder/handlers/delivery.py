@@ -0,0 +1,198 @@
+import time
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from handlers.config import config
+from handlers.list_cache import listing_cache
+from handlers.reminder_store import reminder_store
+from handlers.reminder_text import build_metadata
+from handlers.scheduler_engine import scheduler_engine, is_local_id
+from handlers.slack_client import workspace_of
+from handlers.worker_pool import WORKER_POOL_SIZE
+
+# 予約投稿の方法
+#   slack: chat.scheduleMessage（既定）
+#   local: プロセス内の scheduler_engine
+#   auto : chat.scheduleMessage の上限（120日）を超えるものだけ local
+REMINDER_BACKEND = config.reminder_backend
+# chat.scheduleMessage で予約できる最大の先の時間（秒）
+SLACK_SCHEDULE_HORIZON = 120 * 24 * 60 * 60
+# 1 回の登録で複数の予約を同時に送るときの、登録 1 件あたりの並列数
+SCHEDULE_FANOUT_CONCURRENCY = config.schedule_fanout_concurrency
+
+logger = logging.getLogger(__name__)
+
+# schedule_messages 用のスレッド（呼び出し元が worker_pool 上にいるため別のプールを使う）
+# worker_pool の全ワーカーが同時に SCHEDULE_FANOUT_CONCURRENCY 件ずつ送れる数を用意する
+_fanout_executor = ThreadPoolExecutor(
+    max_workers=WORKER_POOL_SIZE * SCHEDULE_FANOUT_CONCURRENCY, thread_name_prefix="schedule-fanout"
+)
+
+
+def _fan_out(fn, args_list):
+    """
+    fn(*args) を 1 回の呼び出しあたり SCHEDULE_FANOUT_CONCURRENCY 件まで同時に実行し、Future のリストを返す
+    """
+    slots = threading.BoundedSemaphore(SCHEDULE_FANOUT_CONCURRENCY)
+    futures = []
+    for args in args_list:
+        slots.acquire()
+        future = _fanout_executor.submit(fn, *args)
+        future.add_done_callback(lambda _: slots.release())
+        futures.append(future)
+    return futures
+
+
+def select_backend(post_at):
+    if REMINDER_BACKEND == "auto":
+        return "local" if post_at - time.time() >= SLACK_SCHEDULE_HORIZON else "slack"
+    return REMINDER_BACKEND
+
+
+def schedule_message(client, channel, post_at, text, **fields):
+    """
+    設定した配信方法でメッセージを予約し、ローカルストアに保存して予約IDを返す
+    fields は reminder_store.add の setter / mentions / title / body / kind
+    """
+    if select_backend(post_at) == "local":
+        scheduled_message_id = scheduler_engine.schedule(channel, post_at, text, team_id=workspace_of(client), **fields)
+    else:
+        # Slack API: chat.scheduleMessageでメッセージを予約投稿
+        # 配信されたメッセージにも予約の内容をメタデータとして付けておく
+        result = client.chat_scheduleMessage(
+            channel=channel, post_at=post_at, text=text, metadata=build_metadata(**fields)
+        )
+        scheduled_message_id = result["scheduled_message_id"]
+        reminder_store.add(scheduled_message_id, channel, post_at, text=text, team_id=workspace_of(client), **fields)
+    # ストアへの保存後に、このチャンネルの一覧のキャッシュを破棄する
+    listing_cache.invalidate(channel)
+    return scheduled_message_id
+
+
+async def schedule_message_async(client, channel, post_at, text, **fields):
+    """
+    schedule_message の AsyncWebClient 版
+    """
+    if select_backend(post_at) == "local":
+        scheduled_message_id = scheduler_engine.schedule(channel, post_at, text, team_id=workspace_of(client), **fields)
+    else:
+        result = await client.chat_scheduleMessage(
+            channel=channel, post_at=post_at, text=text, metadata=build_metadata(**fields)
+        )
+        scheduled_message_id = result["scheduled_message_id"]
+        reminder_store.add(scheduled_message_id, channel, post_at, text=text, team_id=workspace_of(client), **fields)
+    listing_cache.invalidate(channel)
+    return scheduled_message_id
+
+
+def cancel_message(client, channel, scheduled_message_id):
+    """
+    予約を取り消してローカルストアから削除する
+    """
+    if is_local_id(scheduled_message_id):
+        scheduler_engine.cancel(scheduled_message_id)
+    else:
+        client.chat_deleteScheduledMessage(channel=channel, scheduled_message_id=scheduled_message_id)
+        reminder_store.delete(scheduled_message_id)
+    listing_cache.invalidate(channel)
+
+
+async def cancel_message_async(client, channel, scheduled_message_id):
+    """
+    cancel_message の AsyncWebClient 版
+    """
+    if is_local_id(scheduled_message_id):
+        scheduler_engine.cancel(scheduled_message_id)
+    else:
+        await client.chat_deleteScheduledMessage(channel=channel, scheduled_message_id=scheduled_message_id)
+        reminder_store.delete(scheduled_message_id)
+    listing_cache.invalidate(channel)
+
+
+def reschedule_message(client, channel, scheduled_message_id, post_at, text, **fields):
+    """
+    予約を新しい内容に置き換えて新しい予約IDを返す
+    先に新しい予約を作り、古い予約の取り消しに失敗した場合は新しい予約を取り消して元に戻す
+    （予約が一時的に無くなる時間を作らない）
+    """
+    new_id = schedule_message(client, channel, post_at, text, **fields)
+    try:
+        cancel_message(client, channel, scheduled_message_id)
+    except Exception:
+        try:
+            cancel_message(client, channel, new_id)
+        except Exception as e:
+            logger.error(f"予約 {new_id} の取り消し（編集の巻き戻し）に失敗しました: {e}")
+        raise
+    return new_id
+
+
+async def reschedule_message_async(client, channel, scheduled_message_id, post_at, text, **fields):
+    """
+    reschedule_message の AsyncWebClient 版
+    """
+    new_id = await schedule_message_async(client, channel, post_at, text, **fields)
+    try:
+        await cancel_message_async(client, channel, scheduled_message_id)
+    except Exception:
+        try:
+            await cancel_message_async(client, channel, new_id)
+        except Exception as e:
+            logger.error(f"予約 {new_id} の取り消し（編集の巻き戻し）に失敗しました: {e}")
+        raise
+    return new_id
+
+
+def schedule_messages(client, channel, posts, **fields):
+    """
+    複数の (post_at, text) を同時に予約して予約IDのリストを返す
+    1 件でも失敗した場合は成功した予約を取り消してから最初の例外を送出する（全件成功か全件取り消し）
+    """
+    futures = _fan_out(
+        lambda post_at, text: schedule_message(client, channel, post_at, text, **fields), posts
+    )
+    scheduled_ids, errors = [], []
+    for future in futures:
+        try:
+            scheduled_ids.append(future.result())
+        except Exception as e:
+            errors.append(e)
+    if errors:
+        rollbacks = _fan_out(cancel_message, [(client, channel, i) for i in scheduled_ids])
+        for scheduled_message_id, future in zip(scheduled_ids, rollbacks):
+            try:
+                future.result()
+            except Exception as e:
+                logger.error(f"予約 {scheduled_message_id} の取り消し（登録の巻き戻し）に失敗しました: {e}")
+        raise errors[0]
+    return scheduled_ids
+
+
+async def schedule_messages_async(client, channel, posts, **fields):
+    """
+    schedule_messages の AsyncWebClient 版
+    """
+    semaphore = asyncio.Semaphore(SCHEDULE_FANOUT_CONCURRENCY)
+
+    async def bounded(coro_fn, *args, **kwargs):
+        async with semaphore:
+            return await coro_fn(*args, **kwargs)
+
+    results = await asyncio.gather(
+        *(bounded(schedule_message_async, client, channel, post_at, text, **fields) for post_at, text in posts),
+        return_exceptions=True,
+    )
+    scheduled_ids = [r for r in results if not isinstance(r, BaseException)]
+    errors = [r for r in results if isinstance(r, BaseException)]
+    if errors:
+        rollbacks = await asyncio.gather(
+            *(bounded(cancel_message_async, client, channel, i) for i in scheduled_ids),
+            return_exceptions=True,
+        )
+        for scheduled_message_id, result in zip(scheduled_ids, rollbacks):
+            if isinstance(result, BaseException):
+                logger.error(f"予約 {scheduled_message_id} の取り消し（登録の巻き戻し）に失敗しました: {result}")
+        raise errors[0]
+    return scheduled_ids
@@ -0,0 +1,206 @@
+import time
+import logging
+import threading
+from slack_sdk.errors import SlackApiError
+
+from handlers.config import config
+from handlers.metrics import registry
+from handlers.slack_client import RateLimitedWebClient, workspace_of, would_throttle
+
+# エラーの通知先（開発者のユーザー ID またはチャンネル ID）
+DEVELOPER_SLACK_ID = config.developer_slack_id
+# 同じ種類のエラーをまとめて通知する間隔（秒）
+ERROR_DIGEST_INTERVAL = config.error_digest_interval
+# 1 回の通知までに保持するエラーの種類の上限（超えた分は件数だけ数える）
+ERROR_DIGEST_MAX_SIGNATURES = config.error_digest_max_signatures
+# 種類ごとに通知に載せるユーザーの数
+ERROR_DIGEST_SAMPLE_USERS = 5
+# 送信に失敗したときに通知の間隔を延ばす上限（ERROR_DIGEST_INTERVAL の倍数）
+MAX_BACKOFF = 8
+
+logger = logging.getLogger(__name__)
+
+# エラーの受け付け（buffered: まとめに追加 / dropped: 上限を超えて件数だけ数えた）と、まとめの送信（sent / deferred / failed）
+ERROR_REPORTS = registry.counter("gui_reminder_error_reports_total", "Errors reported to the developer", ("result",))
+ERROR_DIGESTS = registry.counter("gui_reminder_error_digests_total", "Developer error digests", ("result",))
+
+
+def error_signature(source, error):
+    """
+    まとめる単位 (発生したモジュール, Slack API のメソッド, エラーコード)
+    Slack API のエラーはメソッドとエラーコード、それ以外は例外の型で分ける
+    """
+    if isinstance(error, SlackApiError):
+        api_url = getattr(error.response, "api_url", "") or ""
+        return source, api_url.rstrip("/").rsplit("/", 1)[-1], error.response.get("error") or "unknown"
+    return source, "", type(error).__name__
+
+
+class _Entry:
+    __slots__ = ("count", "users", "detail", "first_at", "last_at")
+
+    def __init__(self, detail, now):
+        self.count = 0
+        self.users = []
+        self.detail = detail
+        self.first_at = now
+        self.last_at = now
+
+    def add(self, user_id, count, now):
+        self.count += count
+        self.last_at = max(self.last_at, now)
+        if user_id and user_id not in self.users and len(self.users) < ERROR_DIGEST_SAMPLE_USERS:
+            self.users.append(user_id)
+
+
+def format_digest(entries, dropped, window_start, window_end):
+    """
+    1 つのワークスペースの 1 回分のまとめの本文（件数の多い順）
+    """
+    total = sum(entry.count for entry in entries.values()) + dropped
+    period = "〜".join(time.strftime("%H:%M:%S", time.localtime(at)) for at in (window_start, window_end))
+    lines = [f"【 ⚠ エラーのまとめ 】{period} に {total} 件のエラーが発生しました。"]
+    for (source, method, code), entry in sorted(entries.items(), key=lambda item: -item[1].count):
+        target = f"{method} " if method else ""
+        users = " ".join(f"<@{user_id}>" for user_id in entry.users)
+        lines.append(f"・{source}: {target}`{code}` × {entry.count}" + (f"（{users}）" if users else ""))
+        if entry.detail != code:
+            lines.append(f"　　例: `{entry.detail[:200]}`")
+    if dropped:
+        lines.append(f"ほか、種類が多すぎて分類できなかったエラー {dropped} 件")
+    return "\n".join(lines)
+
+
+class ErrorDigest:
+    """
+    開発者へのエラー通知を (モジュール, メソッド, エラーコード) ごとにまとめ、ワークスペースごとに一定間隔で 1 通だけ送る
+    report は件数を数えるだけで API を呼ばず、呼び出し元を待たせない。保持する種類は上限までで、超えた分は件数だけ数える
+    送信はまとめ用のスレッドで行い、chat.postMessage がレート制限で待たされる・失敗する場合は送らずに次の回へ持ち越し、
+    間隔を延ばす（Slack API の障害中に通知の呼び出しで負荷を増やさない）
+    """
+
+    def __init__(self, channel=DEVELOPER_SLACK_ID, interval=ERROR_DIGEST_INTERVAL,
+                 max_signatures=ERROR_DIGEST_MAX_SIGNATURES):
+        self.channel = channel
+        self.interval = interval
+        self.max_signatures = max_signatures
+        self._lock = threading.Lock()
+        # workspace -> {"client", "entries": {signature: _Entry}, "dropped", "since"}
+        self._pending = {}
+        self._signatures = 0
+        self._backoff = 1
+        self._thread = None
+        self._stopped = threading.Event()
+
+    def report(self, source, error, client, user_id=None):
+        """
+        エラーを 1 件まとめに加える（source は発生したモジュール名）
+        """
+        if not self.channel:
+            return
+        signature = error_signature(source, error)
+        detail = error.response.get("error") if isinstance(error, SlackApiError) else str(error)
+        workspace_id = workspace_of(client)
+        now = time.time()
+        with self._lock:
+            pending = self._pending.get(workspace_id)
+            if pending is None:
+                pending = self._pending[workspace_id] = {
+                    "client": self._digest_client(client), "entries": {}, "dropped": 0, "since": now
+                }
+            entry = pending["entries"].get(signature)
+            if entry is None:
+                if self._signatures >= self.max_signatures:
+                    pending["dropped"] += 1
+                    ERROR_REPORTS.inc("dropped")
+                    self._ensure_started()
+                    return
+                entry = pending["entries"][signature] = _Entry(detail, now)
+                self._signatures += 1
+            entry.add(user_id, 1, now)
+            ERROR_REPORTS.inc("buffered")
+            self._ensure_started()
+
+    @staticmethod
+    def _digest_client(client):
+        # まとめ用のスレッドから使う同期の WebClient（非同期モードの AsyncWebClient も同じトークンで替える）
+        # 送れなければ次の回に持ち越すため、429 や障害時にその場で再試行はしない
+        return RateLimitedWebClient(
+            token=client.token, base_url=client.base_url, workspace_id=workspace_of(client), max_retries=0
+        )
+
+    def _ensure_started(self):
+        # ワーカープロセスごとに、最初にエラーが報告されたときにスレッドを開始する（呼び出し元はロックを保持している）
+        if self._thread is None and not self._stopped.is_set():
+            self._thread = threading.Thread(target=self._run, name="error-digest", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval * self._backoff):
+            self.flush()
+
+    def flush(self):
+        """
+        保持しているまとめをワークスペースごとに送る。送れなかったワークスペースの分は次の回に持ち越す
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._signatures = 0
+        if not pending:
+            return
+        failed = False
+        now = time.time()
+        for workspace_id, digest in pending.items():
+            team_id = workspace_id or digest["client"].default_params.get("team_id")
+            if failed or would_throttle("chat.postMessage", self.channel, team_id):
+                # 送ると待たされる・直前に失敗した場合は送らない
+                self._requeue(workspace_id, digest)
+                ERROR_DIGESTS.inc("deferred")
+                continue
+            try:
+                digest["client"].chat_postMessage(
+                    channel=self.channel, text=format_digest(digest["entries"], digest["dropped"], digest["since"], now)
+                )
+                ERROR_DIGESTS.inc("sent")
+            except Exception as e:
+                logger.warning(f"開発者へのエラーのまとめを送れませんでした: {e}")
+                self._requeue(workspace_id, digest)
+                ERROR_DIGESTS.inc("failed")
+                failed = True
+        self._backoff = min(self._backoff * 2, MAX_BACKOFF) if failed else 1
+
+    def _requeue(self, workspace_id, digest):
+        """
+        送れなかったまとめを、その間に報告されたエラーと合わせて次の回に回す（種類の上限は report と同じ）
+        """
+        with self._lock:
+            pending = self._pending.get(workspace_id)
+            if pending is None:
+                pending = self._pending[workspace_id] = {
+                    "client": digest["client"], "entries": {}, "dropped": 0, "since": digest["since"]
+                }
+            pending["since"] = min(pending["since"], digest["since"])
+            pending["dropped"] += digest["dropped"]
+            for signature, old in digest["entries"].items():
+                entry = pending["entries"].get(signature)
+                if entry is None:
+                    if self._signatures >= self.max_signatures:
+                        pending["dropped"] += old.count
+                        continue
+                    entry = pending["entries"][signature] = _Entry(old.detail, old.first_at)
+                    self._signatures += 1
+                entry.first_at = min(entry.first_at, old.first_at)
+                for user_id in old.users:
+                    entry.add(user_id, 0, old.last_at)
+                entry.count += old.count
+
+    def stop(self):
+        """
+        スレッドを止め、残っているまとめを送る（ワーカープロセスの停止時）
+        """
+        self._stopped.set()
+        self.flush()
+
+
+# 全コマンドモジュールで共有するエラー通知
+error_digest = ErrorDigest()
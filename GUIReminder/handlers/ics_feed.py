@@ -0,0 +1,249 @@
+import re
+import hmac
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from urllib.parse import parse_qs, quote, urlencode
+
+from handlers.config import config
+from handlers.metrics import registry
+from handlers.reminder_store import reminder_store
+from handlers.reminder_text import KIND_SCHEDULE
+
+# フィードの URL の先頭（CALENDAR_FEED_BASE_URL の後ろに付く）
+FEED_PATH = "/calendar/"
+CALENDAR_FEED_BASE_URL = config.calendar_feed_base_url
+CALENDAR_FEED_SECRET = config.calendar_feed_secret
+# 生成したフィードをメモリに保持する数
+CALENDAR_FEED_CACHE_SIZE = config.calendar_feed_cache_size
+# /set-schedule の事前通知の最大（3日前）。本番の予約はこれより後には来ない
+MAX_OFFSET = 3 * 24 * 60 * 60
+# カレンダーアプリに勧める取得間隔
+REFRESH_INTERVAL = "PT15M"
+# 出力の形式を変えたときに上げる（古い ETag を使わせない）
+FEED_FORMAT_VERSION = 1
+# 本文のチャンク 1 つにまとめる予定の数
+FEED_CHUNK_EVENTS = 500
+CONTENT_TYPE = "text/calendar; charset=utf-8"
+
+_FEED_PATH_PATTERN = re.compile(rf"^{re.escape(FEED_PATH)}(channel|user)/([A-Z0-9]+)\.ics$")
+
+# フィードの取得（not_modified: 304 / cached: 保持していた本文 / rendered: 生成し直し / not_found: URL・署名が不正）
+FEED_REQUESTS = registry.counter("gui_reminder_calendar_feed_requests_total", "Calendar feed requests", ("result",))
+
+
+def feed_token(target, target_id, team_id=""):
+    """
+    フィードの URL の署名（URL を知っている人だけが購読できるようにする）
+    """
+    message = f"{team_id}/{target}/{target_id}".encode("utf-8")
+    return hmac.new(CALENDAR_FEED_SECRET.encode("utf-8"), message, hashlib.sha256).hexdigest()[:32]
+
+
+def feed_url(target, target_id, team_id=""):
+    """
+    チャンネル（target="channel"）またはユーザー（target="user"）のフィードの URL。公開 URL が未設定なら None
+    """
+    if not CALENDAR_FEED_BASE_URL:
+        return None
+    query = {"token": feed_token(target, target_id, team_id)}
+    if team_id:
+        query["team"] = team_id
+    return f"{CALENDAR_FEED_BASE_URL}{FEED_PATH}{target}/{quote(target_id)}.ics?{urlencode(query)}"
+
+
+def _escape_text(value):
+    return (
+        value.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\r\n", "\\n").replace("\n", "\\n")
+    )
+
+
+def _fold(line):
+    """
+    75 オクテットを超える行を折り返す（UTF-8 の文字の途中では切らない）
+    """
+    encoded = line.encode("utf-8")
+    if len(encoded) <= 75:
+        return line
+    parts, start, limit = [], 0, 75
+    while start < len(encoded):
+        end = min(start + limit, len(encoded))
+        # 継続バイト（10xxxxxx）の手前まで戻す
+        while end < len(encoded) and (encoded[end] & 0xC0) == 0x80:
+            end -= 1
+        parts.append(encoded[start:end].decode("utf-8"))
+        start, limit = end, 74
+    return "\r\n ".join(parts)
+
+
+def _utc(timestamp):
+    return time.strftime("%Y%m%dT%H%M%SZ", time.gmtime(timestamp))
+
+
+def group_events(rows):
+    """
+    ストアの行（post_at 順）を予定ごとにまとめて、行のリストを順に返す
+    /set-schedule の事前通知は本番と同じ本文で先に予約されるため、同じチャンネル・本文の行を 1 つの予定にまとめる
+    """
+    pending = OrderedDict()
+    for row in rows:
+        if row["kind"] == KIND_SCHEDULE:
+            pending.setdefault((row["channel"], row["text"]), []).append(row)
+        else:
+            yield [row]
+        # 最初の行から MAX_OFFSET を過ぎたまとまりには、もう行が増えない
+        while pending:
+            key, group = next(iter(pending.items()))
+            if group[0]["post_at"] + MAX_OFFSET >= row["post_at"]:
+                break
+            del pending[key]
+            yield group
+    yield from pending.values()
+
+
+def render_event(group):
+    """
+    予定 1 件を VEVENT にする（事前通知は VALARM にする）
+    """
+    main = group[-1]
+    if main["kind"] == KIND_SCHEDULE:
+        uid = hashlib.sha1(f"{main['channel']}\n{main['text']}".encode("utf-8")).hexdigest()[:24]
+        summary = main["title"] or "スケジュール"
+    else:
+        uid = main["scheduled_message_id"]
+        summary = "🔔 " + ((main["body"] or "").strip().split("\n", 1)[0][:60] or "リマインド")
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:{uid}@gui-reminder",
+        f"DTSTAMP:{_utc(max(row['created_at'] for row in group))}",
+        f"DTSTART:{_utc(main['post_at'])}",
+        f"SUMMARY:{_escape_text(summary)}",
+    ]
+    if main["body"]:
+        lines.append(f"DESCRIPTION:{_escape_text(main['body'])}")
+    for row in group[:-1]:
+        lines.extend([
+            "BEGIN:VALARM",
+            f"TRIGGER:-PT{(main['post_at'] - row['post_at']) // 60}M",
+            "ACTION:DISPLAY",
+            f"DESCRIPTION:{_escape_text(summary)}",
+            "END:VALARM",
+        ])
+    lines.append("END:VEVENT")
+    return "".join(_fold(line) + "\r\n" for line in lines).encode("utf-8")
+
+
+def render_header(target, target_id):
+    name = f"リマインダー（#{target_id}）" if target == "channel" else f"リマインダー（{target_id}）"
+    lines = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        "PRODID:-//GUIReminder//Slack reminders//JA",
+        "CALSCALE:GREGORIAN",
+        "METHOD:PUBLISH",
+        f"X-WR-CALNAME:{_escape_text(name)}",
+        f"X-PUBLISHED-TTL:{REFRESH_INTERVAL}",
+        f"REFRESH-INTERVAL;VALUE=DURATION:{REFRESH_INTERVAL}",
+    ]
+    return "".join(_fold(line) + "\r\n" for line in lines).encode("utf-8")
+
+
+FEED_FOOTER = b"END:VCALENDAR\r\n"
+
+
+class FeedCache:
+    """
+    フィードごとに、生成した本文（チャンク）と予定ごとの VEVENT を LRU で保持する
+    予約の版が同じならストアを読まずに保持していた本文を返し、変わった場合もまとまり（行の rowid の組）が同じ予定は描画し直さない
+    """
+
+    def __init__(self, max_size=CALENDAR_FEED_CACHE_SIZE):
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        # feed_key -> (版, 本文のチャンクのリスト, rowid の組 -> VEVENT)。末尾ほど最近使ったもの
+        self._entries = OrderedDict()
+
+    def get(self, feed_key):
+        with self._lock:
+            entry = self._entries.get(feed_key)
+            if entry is not None:
+                self._entries.move_to_end(feed_key)
+            return entry
+
+    def put(self, feed_key, version, chunks, events):
+        with self._lock:
+            self._entries[feed_key] = (version, chunks, events)
+            self._entries.move_to_end(feed_key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def stream(self, feed_key, version, target, target_id, team_id):
+        """
+        ストアの索引を post_at 順に読みながらフィードを生成する（読み切ったら保持する）
+        チャンクは FEED_CHUNK_EVENTS 件の予定ごとにまとめる
+        """
+        entry = self.get(feed_key)
+        previous = entry[2] if entry is not None else {}
+        events = {}
+        chunks = [render_header(target, target_id)]
+        yield chunks[0]
+        if target == "channel":
+            rows = reminder_store.iter_feed(channel=target_id)
+        else:
+            rows = reminder_store.iter_feed(setter=target_id, team_id=team_id)
+        batch = []
+        for group in group_events(rows):
+            key = tuple(row["rowid"] for row in group)
+            event = previous.get(key)
+            if event is None:
+                event = render_event(group)
+            events[key] = event
+            batch.append(event)
+            if len(batch) >= FEED_CHUNK_EVENTS:
+                chunks.append(b"".join(batch))
+                batch = []
+                yield chunks[-1]
+        chunks.append(b"".join(batch) + FEED_FOOTER)
+        yield chunks[-1]
+        self.put(feed_key, version, chunks, events)
+
+
+feed_cache = FeedCache()
+
+
+def feed_response(path, query_string, if_none_match=None):
+    """
+    フィードの HTTP レスポンスを (ステータス, ヘッダーのリスト, 本文のチャンクの iterable) で返す（WSGI・ASGI 共通）
+    If-None-Match が現在の版の ETag と一致すれば 304 を返し、本文は生成しない
+    """
+    match = _FEED_PATH_PATTERN.match(path)
+    query = parse_qs(query_string or "")
+    team_id = query.get("team", [""])[0]
+    token = query.get("token", [""])[0]
+    if match is None or not hmac.compare_digest(token, feed_token(match.group(1), match.group(2), team_id)):
+        FEED_REQUESTS.inc("not_found")
+        return 404, [("Content-Type", "text/plain; charset=utf-8")], [b"Not Found"]
+
+    target, target_id = match.groups()
+    feed_key = (target, target_id, team_id)
+    if target == "channel":
+        version = reminder_store.feed_version(channel=target_id)
+    else:
+        version = reminder_store.feed_version(setter=target_id, team_id=team_id)
+    digest = hashlib.sha1(repr((FEED_FORMAT_VERSION, feed_key, version)).encode("utf-8")).hexdigest()
+    etag = f'"{digest[:32]}"'
+    headers = [("ETag", etag), ("Cache-Control", "private, max-age=60")]
+
+    if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+        FEED_REQUESTS.inc("not_modified")
+        return 304, headers, []
+
+    headers.append(("Content-Type", CONTENT_TYPE))
+    entry = feed_cache.get(feed_key)
+    if entry is not None and entry[0] == version:
+        FEED_REQUESTS.inc("cached")
+        headers.append(("Content-Length", str(sum(len(chunk) for chunk in entry[1]))))
+        return 200, headers, entry[1]
+    FEED_REQUESTS.inc("rendered")
+    return 200, headers, feed_cache.stream(feed_key, version, target, target_id, team_id)
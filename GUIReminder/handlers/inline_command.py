@@ -0,0 +1,117 @@
+import re
+import datetime
+
+# スラッシュコマンドの引数の日時（起動時に一度だけコンパイルする）
+#   相対:   30分後 / 2時間後 / 1日後 / in 30m / in 2h / in 1d
+#   日付:   今日 / 明日 / 明後日 / today / tomorrow / 2026-04-01 / 2026/4/1 / 4/1 / 4月1日 / 月曜 / mon（省略すると直近）
+#   時刻:   9:30 / 09:30 / 9時 / 9時30分 / 9時半 / 9am / 9:30pm（数字だけは本文と区別できないため時刻にしない）
+_WEEKDAY_NAMES = {
+    **{name: i for i, name in enumerate(("mon", "tue", "wed", "thu", "fri", "sat", "sun"))},
+    **{name: i for i, name in enumerate("月火水木金土日")},
+}
+_DAY_OFFSETS = {"今日": 0, "today": 0, "明日": 1, "tomorrow": 1, "明後日": 2, "あさって": 2}
+_RELATIVE_UNITS = {"m": "minutes", "分": "minutes", "h": "hours", "時間": "hours", "d": "days", "日": "days"}
+
+_WHEN = re.compile(
+    r"""
+    \s*(?:
+        (?:in\s+(?P<in_amount>\d{1,4})\s*(?P<in_unit>m|h|d)
+          |(?P<amount>\d{1,4})\s*(?P<unit>分|時間|日)後)
+      |
+        (?:(?P<date>
+            今日|明日|明後日|あさって|today|tomorrow
+            |(?P<year>\d{4})[-/](?P<month>\d{1,2})[-/](?P<day>\d{1,2})
+            |(?P<short_month>\d{1,2})(?:/|月)(?P<short_day>\d{1,2})日?
+            |(?P<weekday>mon|tue|wed|thu|fri|sat|sun|[月火水木金土日]曜日?)
+        )(?:\s+|(?<=[^\x00-\x7f])))?
+        (?P<hour>\d{1,2})
+        (?::(?P<minute>\d{2})\s*(?P<ampm>am|pm)?
+          |時(?:(?P<jp_minute>\d{1,2})分|(?P<half>半))?
+          |\s*(?P<bare_ampm>am|pm))
+        に?
+    )
+    (?:\s+|$)
+    """,
+    re.IGNORECASE | re.VERBOSE,
+)
+# 本文の前に並べたメンション（コマンドの設定で「Escape channels, users, and links」を有効にした形 <@U123|name>）
+_MENTIONS = re.compile(r"(?:<@([UW][A-Z0-9]+)(?:\|[^>]*)?>\s*)+")
+_MENTION_ID = re.compile(r"<@([UW][A-Z0-9]+)(?:\|[^>]*)?>")
+# エスケープされていない @名前（ユーザー ID が分からないため、読み取れないものとしてモーダルに回す）
+_BARE_MENTION = re.compile(r"^@\S+")
+
+INLINE_USAGE = "`明日 9:30 @ユーザー 内容` や `4/1 15時 内容`、`30分後 内容` のように入力してください"
+
+
+def parse_when(text, tz=None, now=None):
+    """
+    先頭の日時の表現を読み取り、(日時, 残りの文字列) を返す（読み取れなければ None）
+    日時は tz（None はサーバーのローカルタイム）の時刻で、時刻だけ・曜日の場合はまだ来ていない直近の日にする
+    """
+    match = _WHEN.match(text)
+    if match is None:
+        return None
+    now = now or datetime.datetime.now(tz)
+    rest = text[match.end():]
+    if match.group("in_amount") or match.group("amount"):
+        amount = int(match.group("in_amount") or match.group("amount"))
+        unit = _RELATIVE_UNITS[(match.group("in_unit") or match.group("unit")).lower()]
+        return now.replace(second=0, microsecond=0) + datetime.timedelta(**{unit: amount}), rest
+
+    hour = int(match.group("hour"))
+    minute = int(match.group("minute") or match.group("jp_minute") or (30 if match.group("half") else 0))
+    ampm = (match.group("ampm") or match.group("bare_ampm") or "").lower()
+    if ampm:
+        if not 1 <= hour <= 12:
+            return None
+        hour = hour % 12 + (12 if ampm == "pm" else 0)
+    if hour > 23 or minute > 59:
+        return None
+    time_of_day = datetime.time(hour, minute)
+
+    today = now.date()
+    date_text = (match.group("date") or "").lower()
+    try:
+        if match.group("year"):
+            day = datetime.date(int(match.group("year")), int(match.group("month")), int(match.group("day")))
+        elif match.group("short_month"):
+            day = datetime.date(today.year, int(match.group("short_month")), int(match.group("short_day")))
+            # 過ぎた月日は来年とする
+            if datetime.datetime.combine(day, time_of_day, tz) <= now:
+                day = day.replace(year=today.year + 1)
+        elif match.group("weekday"):
+            weekday = _WEEKDAY_NAMES[date_text[:3] if date_text[0].isascii() else date_text[0]]
+            day = today + datetime.timedelta(days=(weekday - today.weekday()) % 7)
+            if datetime.datetime.combine(day, time_of_day, tz) <= now:
+                day += datetime.timedelta(days=7)
+        elif date_text:
+            day = today + datetime.timedelta(days=_DAY_OFFSETS[date_text])
+        else:
+            # 時刻だけなら、過ぎていれば明日
+            day = today
+            if datetime.datetime.combine(day, time_of_day, tz) <= now:
+                day += datetime.timedelta(days=1)
+    except ValueError:
+        return None
+    return datetime.datetime.combine(day, time_of_day, tz), rest
+
+
+def split_mentions(text):
+    """
+    先頭に並んだメンションを取り出し、(ユーザー ID のリスト, 残りの文字列) を返す
+    エスケープされていない @名前 が先頭にあれば None（ユーザーを特定できない）
+    """
+    match = _MENTIONS.match(text)
+    if match is None:
+        return ([], text) if not _BARE_MENTION.match(text) else None
+    rest = text[match.end():]
+    if _BARE_MENTION.match(rest):
+        return None
+    return _MENTION_ID.findall(match.group(0)), rest
+
+
+def format_inline_errors(errors):
+    """
+    モーダル用の入力エラー（block_id -> 文言）を、コマンドの応答に載せる 1 つの文言にする
+    """
+    return " ".join(dict.fromkeys(message for message in errors.values() if message.strip()))
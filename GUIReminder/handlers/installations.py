@@ -0,0 +1,291 @@
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict
+from slack_bolt.authorization import AuthorizeResult
+from slack_bolt.authorization.authorize import Authorize
+from slack_sdk.oauth.installation_store import InstallationStore
+from slack_sdk.oauth.installation_store.async_installation_store import AsyncInstallationStore
+
+from handlers.config import config
+from handlers.metrics import registry
+from handlers.slack_client import RateLimitedWebClient, split_workspace
+
+# OAuth アプリの認証情報と、インストール時に要求するスコープ（カンマ区切り）
+SLACK_CLIENT_ID = config.slack_client_id
+SLACK_CLIENT_SECRET = config.slack_client_secret
+SLACK_SCOPES = config.slack_scopes
+# インストール情報の保存先: sqlite（既定） / file
+INSTALLATION_STORE = config.installation_store
+INSTALLATION_STORE_PATH = config.installation_store_path or (
+    "installations.db" if INSTALLATION_STORE == "sqlite" else "installations"
+)
+# ワークスペースごとのボットのトークンをメモリに保持する期間（秒）と最大件数
+INSTALLATION_CACHE_TTL = config.installation_cache_ttl
+INSTALLATION_CACHE_SIZE = config.installation_cache_size
+# OAuth の state の有効期間（秒）
+OAUTH_STATE_EXPIRATION = 600
+
+logger = logging.getLogger(__name__)
+
+# authorize でのインストール情報の参照（hit: キャッシュ / miss: ストアから読み込み / not_found: 未インストール）
+TEAM_AUTHORIZE = registry.counter(
+    "gui_reminder_team_authorize_total", "Installation lookups per workspace", ("team", "result")
+)
+
+
+def _workspace_key(enterprise_id, team_id, is_enterprise_install):
+    # 組織全体へのインストールは team_id によらず 1 つ
+    return enterprise_id or "", "" if is_enterprise_install else (team_id or ""), bool(is_enterprise_install)
+
+
+def _workspace_label(key):
+    enterprise_id, team_id, _ = key
+    return f"{enterprise_id}:{team_id}" if enterprise_id else team_id
+
+
+class CachedInstallationStore(InstallationStore, AsyncInstallationStore):
+    """
+    find_bot の結果を TTL + LRU でメモリに保持する InstallationStore
+    authorize はリクエストごとに呼ばれるため、ファイル・SQLite を読むのはキャッシュに無いときだけにする
+    save / delete ではそのワークスペースのエントリを破棄する（他のワーカープロセスのキャッシュは TTL で切れる）
+    """
+
+    def __init__(self, store, ttl=INSTALLATION_CACHE_TTL, max_size=INSTALLATION_CACHE_SIZE):
+        self.store = store
+        self.ttl = ttl
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        # _workspace_key -> (期限, Bot)。末尾ほど最近使ったもの
+        self._entries = OrderedDict()
+        # 読み込み中に save / delete されたかを判定するための世代
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.not_found = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @property
+    def logger(self):
+        return self.store.logger
+
+    def find_bot(self, *, enterprise_id, team_id, is_enterprise_install=False):
+        key = _workspace_key(enterprise_id, team_id, is_enterprise_install)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, bot = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    TEAM_AUTHORIZE.inc(_workspace_label(key), "hit")
+                    return bot
+                del self._entries[key]
+                self.expirations += 1
+            generation = self._generation
+
+        bot = self.store.find_bot(
+            enterprise_id=enterprise_id, team_id=team_id, is_enterprise_install=is_enterprise_install
+        )
+
+        with self._lock:
+            if bot is None:
+                # 未インストールのワークスペースは保存しない（インストール直後に見つけられるように）
+                self.not_found += 1
+                TEAM_AUTHORIZE.inc(_workspace_label(key), "not_found")
+                return None
+            self.misses += 1
+            TEAM_AUTHORIZE.inc(_workspace_label(key), "miss")
+            if self._generation == generation:
+                expires_at = now + self.ttl
+                # トークンのローテーションを使う場合は、期限切れのトークンを返さないように期限で切る
+                if bot.bot_token_expires_at:
+                    expires_at = min(expires_at, now + bot.bot_token_expires_at - time.time())
+                self._entries[key] = (expires_at, bot)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return bot
+
+    def find_installation(self, *, enterprise_id, team_id, user_id=None, is_enterprise_install=False):
+        # ユーザーのトークンは使わないため、OAuth のフローからの呼び出しだけを素通しする
+        return self.store.find_installation(
+            enterprise_id=enterprise_id, team_id=team_id, user_id=user_id,
+            is_enterprise_install=is_enterprise_install,
+        )
+
+    def save(self, installation):
+        self.store.save(installation)
+        self.invalidate(installation.enterprise_id, installation.team_id, installation.is_enterprise_install)
+
+    def save_bot(self, bot):
+        self.store.save_bot(bot)
+        self.invalidate(bot.enterprise_id, bot.team_id, bot.is_enterprise_install)
+
+    def delete_bot(self, *, enterprise_id, team_id):
+        self.store.delete_bot(enterprise_id=enterprise_id, team_id=team_id)
+        self.invalidate(enterprise_id, team_id)
+
+    def delete_installation(self, *, enterprise_id, team_id, user_id=None):
+        self.store.delete_installation(enterprise_id=enterprise_id, team_id=team_id, user_id=user_id)
+        self.invalidate(enterprise_id, team_id)
+
+    def delete_all(self, *, enterprise_id, team_id):
+        self.store.delete_all(enterprise_id=enterprise_id, team_id=team_id)
+        self.invalidate(enterprise_id, team_id)
+
+    # AsyncApp 用。ファイル・SQLite のストアは同期の処理のため、そのまま呼ぶ
+    async def async_find_bot(self, *, enterprise_id, team_id, is_enterprise_install=False):
+        return self.find_bot(enterprise_id=enterprise_id, team_id=team_id, is_enterprise_install=is_enterprise_install)
+
+    async def async_find_installation(self, *, enterprise_id, team_id, user_id=None, is_enterprise_install=False):
+        return self.find_installation(
+            enterprise_id=enterprise_id, team_id=team_id, user_id=user_id,
+            is_enterprise_install=is_enterprise_install,
+        )
+
+    async def async_save(self, installation):
+        self.save(installation)
+
+    async def async_save_bot(self, bot):
+        self.save_bot(bot)
+
+    async def async_delete_bot(self, *, enterprise_id, team_id):
+        self.delete_bot(enterprise_id=enterprise_id, team_id=team_id)
+
+    async def async_delete_installation(self, *, enterprise_id, team_id, user_id=None):
+        self.delete_installation(enterprise_id=enterprise_id, team_id=team_id, user_id=user_id)
+
+    async def async_delete_all(self, *, enterprise_id, team_id):
+        self.delete_all(enterprise_id=enterprise_id, team_id=team_id)
+
+    def invalidate(self, enterprise_id, team_id, is_enterprise_install=None):
+        """
+        ワークスペースのエントリを破棄する（is_enterprise_install が不明な場合は両方）
+        """
+        flags = (False, True) if is_enterprise_install is None else (is_enterprise_install,)
+        with self._lock:
+            self._generation += 1
+            for flag in flags:
+                self._entries.pop(_workspace_key(enterprise_id, team_id, flag), None)
+            self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "not_found": self.not_found,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+
+def authorize_result(bot, user_id=None):
+    """
+    保存済みのボットのインストール情報から AuthorizeResult を作る（auth.test は呼ばない）
+    """
+    return AuthorizeResult(
+        enterprise_id=bot.enterprise_id,
+        team_id=bot.team_id,
+        team=bot.team_name,
+        bot_user_id=bot.bot_user_id,
+        bot_id=bot.bot_id,
+        bot_token=bot.bot_token,
+        bot_scopes=bot.bot_scopes,
+        user_id=user_id,
+    )
+
+
+class CachedAuthorize(Authorize):
+    """
+    CachedInstallationStore のボットのトークンでリクエストを認可する
+    Bolt の InstallationStoreAuthorize はリクエストごとに auth.test を呼ぶが、bot_id などはインストール時に保存済みのため呼ばない
+    """
+
+    def __init__(self, installation_store):
+        self.installation_store = installation_store
+
+    def __call__(self, *, context, enterprise_id, team_id, user_id, **kwargs):
+        bot = self.installation_store.find_bot(
+            enterprise_id=enterprise_id, team_id=team_id, is_enterprise_install=context.is_enterprise_install
+        )
+        if bot is None:
+            logger.info(f"インストールされていないワークスペースからのリクエストです: {enterprise_id} {team_id}")
+            return None
+        return authorize_result(bot, user_id)
+
+
+def create_installation_store():
+    """
+    設定に従ってインストール情報のストア（キャッシュ付き）と OAuth の state のストアを作る
+    キャッシュの状態は /metrics に出す
+    """
+    if INSTALLATION_STORE == "file":
+        from slack_sdk.oauth.installation_store import FileInstallationStore
+        from slack_sdk.oauth.state_store import FileOAuthStateStore
+
+        store = FileInstallationStore(base_dir=INSTALLATION_STORE_PATH, client_id=SLACK_CLIENT_ID)
+        state_store = FileOAuthStateStore(
+            expiration_seconds=OAUTH_STATE_EXPIRATION, base_dir=os.path.join(INSTALLATION_STORE_PATH, "states"),
+            client_id=SLACK_CLIENT_ID,
+        )
+    else:
+        from slack_sdk.oauth.installation_store.sqlite3 import SQLite3InstallationStore
+        from slack_sdk.oauth.state_store.sqlite3 import SQLite3OAuthStateStore
+
+        store = SQLite3InstallationStore(database=INSTALLATION_STORE_PATH, client_id=SLACK_CLIENT_ID)
+        state_store = SQLite3OAuthStateStore(database=INSTALLATION_STORE_PATH, expiration_seconds=OAUTH_STATE_EXPIRATION)
+
+    installation_store = CachedInstallationStore(store)
+    registry.gauge(
+        "gui_reminder_installation_cache", "Installation (bot token) cache statistics", ("stat",),
+        lambda: [((name,), value) for name, value in installation_store.stats().items()]
+    )
+    return installation_store, state_store
+
+
+def create_oauth_settings(installation_store, state_store):
+    """
+    /slack/install・/slack/oauth_redirect で使う OAuth の設定
+    """
+    from slack_bolt.oauth.oauth_settings import OAuthSettings
+
+    return OAuthSettings(
+        client_id=SLACK_CLIENT_ID,
+        client_secret=SLACK_CLIENT_SECRET,
+        scopes=SLACK_SCOPES.split(","),
+        installation_store=installation_store,
+        installation_store_bot_only=True,
+        state_store=state_store,
+        state_expiration_seconds=OAUTH_STATE_EXPIRATION,
+    )
+
+
+class WorkspaceClients:
+    """
+    バックグラウンドジョブ（突き合わせ・ローカル配信・繰り返しの補充）で使う、ワークスペースごとの WebClient
+    インストール情報のストアが無い（単一のワークスペース）場合は常に default_client を返す
+    ワークスペースが空（単一のワークスペースで動かしていたときの予約）の場合も default_client を返し、
+    アンインストールされたワークスペースでは None を返す
+    """
+
+    def __init__(self, default_client=None, installation_store=None, base_url=config.slack_api_base_url):
+        self.default_client = default_client
+        self.installation_store = installation_store
+        self.base_url = base_url
+
+    def get(self, workspace_id):
+        if self.installation_store is None or not workspace_id:
+            return self.default_client
+        bot = self.installation_store.find_bot(**split_workspace(workspace_id))
+        if bot is None:
+            return None
+        return RateLimitedWebClient(token=bot.bot_token, base_url=self.base_url, workspace_id=workspace_id)
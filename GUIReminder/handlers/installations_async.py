@@ -0,0 +1,45 @@
+from slack_bolt.authorization.async_authorize import AsyncAuthorize
+
+from handlers.installations import (
+    SLACK_CLIENT_ID,
+    SLACK_CLIENT_SECRET,
+    SLACK_SCOPES,
+    OAUTH_STATE_EXPIRATION,
+    authorize_result,
+    logger,
+)
+
+
+class AsyncCachedAuthorize(AsyncAuthorize):
+    """
+    CachedAuthorize の AsyncApp 用（slack_bolt の非同期のモジュールは aiohttp を読み込むため別モジュールにしている）
+    """
+
+    def __init__(self, installation_store):
+        self.installation_store = installation_store
+
+    async def __call__(self, *, context, enterprise_id, team_id, user_id, **kwargs):
+        bot = await self.installation_store.async_find_bot(
+            enterprise_id=enterprise_id, team_id=team_id, is_enterprise_install=context.is_enterprise_install
+        )
+        if bot is None:
+            logger.info(f"インストールされていないワークスペースからのリクエストです: {enterprise_id} {team_id}")
+            return None
+        return authorize_result(bot, user_id)
+
+
+def create_async_oauth_settings(installation_store, state_store):
+    """
+    create_oauth_settings の AsyncApp 用（ストアは同期・非同期の両方のメソッドを持つ）
+    """
+    from slack_bolt.oauth.async_oauth_settings import AsyncOAuthSettings
+
+    return AsyncOAuthSettings(
+        client_id=SLACK_CLIENT_ID,
+        client_secret=SLACK_CLIENT_SECRET,
+        scopes=SLACK_SCOPES.split(","),
+        installation_store=installation_store,
+        installation_store_bot_only=True,
+        state_store=state_store,
+        state_expiration_seconds=OAUTH_STATE_EXPIRATION,
+    )
@@ -0,0 +1,104 @@
+import time
+import threading
+from collections import OrderedDict
+
+from handlers.config import config
+
+# 一覧のキャッシュの有効期間（秒）と最大件数（チャンネル × ページ）
+LIST_CACHE_TTL = config.list_cache_ttl
+LIST_CACHE_SIZE = config.list_cache_size
+
+
+class ListingCache:
+    """
+    チャンネルごとの予約一覧（ページ単位）の TTL + LRU キャッシュ
+    予約の追加・削除・ローカル配信時に invalidate(channel) でそのチャンネルの全ページを破棄する
+    キャッシュはプロセスごとで、invalidate はそのプロセスの分しか消さない。gunicorn などで複数のワーカーを動かす場合、
+    他のワーカーでの取り消し・編集や、Slack 側で配信された予約は、最大 LIST_CACHE_TTL の間古い一覧が表示されうる
+    """
+
+    def __init__(self, ttl=LIST_CACHE_TTL, max_size=LIST_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        # (channel, page_key) -> (期限, 値)。末尾ほど最近使ったもの
+        self._entries = OrderedDict()
+        self._keys_by_channel = {}
+        # 読み込み中に invalidate されたかを判定するためのチャンネルごとの世代
+        self._generations = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def load(self, channel, page_key, loader):
+        """
+        キャッシュがあればそれを、なければ loader() の結果を保存して返す
+        """
+        now = time.monotonic()
+        key = (channel, page_key)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                self._remove(key)
+                self.expirations += 1
+            self.misses += 1
+            generation = self._generations.get(channel, 0)
+
+        value = loader()
+
+        with self._lock:
+            # 読み込み中に予約が変わった場合は古い結果になりうるので保存しない
+            if self._generations.get(channel, 0) == generation:
+                self._entries[key] = (now + self.ttl, value)
+                self._entries.move_to_end(key)
+                self._keys_by_channel.setdefault(channel, set()).add(key)
+                while len(self._entries) > self.max_size:
+                    oldest = next(iter(self._entries))
+                    self._remove(oldest)
+                    self.evictions += 1
+        return value
+
+    def invalidate(self, channel):
+        with self._lock:
+            self._generations[channel] = self._generations.get(channel, 0) + 1
+            for key in self._keys_by_channel.pop(channel, ()):
+                self._entries.pop(key, None)
+            self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            for channel in self._keys_by_channel:
+                self._generations[channel] = self._generations.get(channel, 0) + 1
+            self._entries.clear()
+            self._keys_by_channel.clear()
+
+    def _remove(self, key):
+        self._entries.pop(key, None)
+        keys = self._keys_by_channel.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_channel[key[0]]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "channels": len(self._keys_by_channel),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+
+# 全コマンドモジュールで共有するキャッシュ
+listing_cache = ListingCache()
@@ -0,0 +1,383 @@
+import time
+import bisect
+import logging
+import threading
+
+from handlers.config import config
+
+# Socket Mode などで /metrics を別ポートで公開する場合のポート（0 で公開しない）
+METRICS_PORT = config.metrics_port
+
+# Prometheus のテキスト形式の Content-Type
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# レイテンシのヒストグラムのバケット（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+logger = logging.getLogger(__name__)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labelnames, values, extra=()):
+    pairs = [*zip(labelnames, values), *extra]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """
+    ラベルごとに増えるだけのカウンター
+    """
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels):
+        with self._lock:
+            return self._values.get(labels, 0)
+
+    def expose(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} counter"
+        for labels, value in values:
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+
+class Histogram:
+    """
+    ラベルごとの累積バケット付きヒストグラム
+    """
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        # labels -> [バケットごとの件数（累積前）..., +Inf の件数, 合計, 件数]
+        self._values = {}
+
+    def observe(self, seconds, *labels):
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            values = self._values.get(labels)
+            if values is None:
+                values = self._values[labels] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            values[index] += 1
+            values[-2] += seconds
+            values[-1] += 1
+
+    def time(self, *labels):
+        """
+        with ブロックの経過時間を記録するコンテキストマネージャ
+        """
+        return _Timer(self, labels)
+
+    def count(self, *labels):
+        with self._lock:
+            values = self._values.get(labels)
+            return values[-1] if values else 0
+
+    def expose(self):
+        with self._lock:
+            values = sorted((labels, list(v)) for labels, v in self._values.items())
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} histogram"
+        for labels, counts in values:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), counts):
+                cumulative += count
+                label_text = _format_labels(self.labelnames, labels, (("le", _format_value(float(bound))),))
+                yield f"{self.name}_bucket{label_text} {cumulative}"
+            label_text = _format_labels(self.labelnames, labels)
+            yield f"{self.name}_sum{label_text} {_format_value(counts[-2])}"
+            yield f"{self.name}_count{label_text} {counts[-1]}"
+
+
+class _Timer:
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started_at = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.started_at, *self.labels)
+
+
+class GaugeCollector:
+    """
+    出力時に collect() を呼んで値を読むゲージ
+    collect は (ラベルの値のタプル, 値) のリストを返す関数
+    """
+
+    def __init__(self, name, documentation, labelnames, collect):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.collect = collect
+
+    def expose(self):
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} gauge"
+        for labels, value in self.collect():
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+
+class MetricsRegistry:
+    """
+    メトリクスをまとめて Prometheus のテキスト形式で出力する
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def gauge(self, name, documentation, labelnames, collect):
+        return self.register(GaugeCollector(name, documentation, labelnames, collect))
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            try:
+                lines.extend(metric.expose())
+            except Exception as e:
+                # 1 つのゲージの読み取りに失敗しても他のメトリクスは出力する
+                logger.error(f"メトリクス {metric.name} の出力に失敗しました: {e}")
+        return "\n".join(lines) + "\n"
+
+
+# 全モジュールで共有するレジストリ
+registry = MetricsRegistry()
+
+# ack までの時間（コマンド・モーダル送信・ボタン操作ごと）
+HANDLER_ACK_SECONDS = registry.histogram(
+    "gui_reminder_handler_ack_seconds", "Time from request dispatch to ack", ("type", "name")
+)
+# ハンドラーで発生した例外・モーダルの入力エラー
+HANDLER_ERRORS = registry.counter(
+    "gui_reminder_handler_errors_total", "Unhandled listener errors", ("type", "name")
+)
+HANDLER_VALIDATION_ERRORS = registry.counter(
+    "gui_reminder_handler_validation_errors_total", "Submissions rejected with response_action=errors", ("name",)
+)
+# Slack Web API の呼び出し（レート制限の待ちと再試行を含む）
+SLACK_API_SECONDS = registry.histogram(
+    "gui_reminder_slack_api_seconds", "Slack Web API call latency including rate limit waits and retries", ("method",)
+)
+SLACK_API_ERRORS = registry.counter(
+    "gui_reminder_slack_api_errors_total", "Slack Web API calls that failed", ("method", "error")
+)
+# ワークスペースごとのリクエスト数と Slack Web API の呼び出し数（SLACK_BOT_TOKEN のクライアントからの呼び出しは team=""）
+TEAM_REQUESTS = registry.counter(
+    "gui_reminder_team_requests_total", "Requests handled per workspace", ("team",)
+)
+TEAM_SLACK_API_CALLS = registry.counter(
+    "gui_reminder_team_slack_api_calls_total", "Slack Web API calls per workspace", ("team",)
+)
+
+
+def describe_request(body):
+    """
+    リクエストの種類と名前（コマンド名・callback_id・action_id）
+    """
+    if "command" in body:
+        return "command", body["command"]
+    request_type = body.get("type", "unknown")
+    if request_type in ("view_submission", "view_closed"):
+        return request_type, body.get("view", {}).get("callback_id", "")
+    if request_type == "block_actions":
+        actions = body.get("actions") or [{}]
+        return request_type, actions[0].get("action_id", "")
+    if request_type == "event_callback":
+        return "event", body.get("event", {}).get("type", "")
+    return request_type, ""
+
+
+class _InstrumentedAck:
+    """
+    ack の呼び出し時刻を記録する Ack のラッパー（response などの属性は元の Ack を参照する）
+    """
+
+    def __init__(self, ack, started_at, request_type, name):
+        self._ack = ack
+        self._started_at = started_at
+        self._labels = (request_type, name)
+
+    def _record(self, kwargs):
+        HANDLER_ACK_SECONDS.observe(time.perf_counter() - self._started_at, *self._labels)
+        if kwargs.get("response_action") == "errors":
+            HANDLER_VALIDATION_ERRORS.inc(self._labels[1])
+
+    def __call__(self, *args, **kwargs):
+        self._record(kwargs)
+        return self._ack(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._ack, name)
+
+
+class _InstrumentedAsyncAck(_InstrumentedAck):
+
+    async def __call__(self, *args, **kwargs):
+        self._record(kwargs)
+        return await self._ack(*args, **kwargs)
+
+
+def _record_error(body, logger, error):
+    request_type, name = describe_request(body)
+    HANDLER_ERRORS.inc(request_type, name)
+    logger.exception(f"{request_type} {name} の処理中にエラーが発生しました: {error}")
+
+
+def use_metrics(app):
+    """
+    ハンドラーの ack までの時間とエラーを記録するミドルウェア・エラーハンドラーを登録
+    """
+
+    @app.middleware
+    def instrument_ack(body, context, next):
+        context["ack"] = _InstrumentedAck(context.ack, time.perf_counter(), *describe_request(body))
+        TEAM_REQUESTS.inc(context.team_id or context.enterprise_id or "")
+        next()
+
+    @app.error
+    def count_errors(error, body, logger):
+        _record_error(body, logger, error)
+
+
+def use_metrics_async(app):
+    """
+    use_metrics の AsyncApp 版
+    """
+
+    @app.middleware
+    async def instrument_ack(body, context, next):
+        context["ack"] = _InstrumentedAsyncAck(context.ack, time.perf_counter(), *describe_request(body))
+        TEAM_REQUESTS.inc(context.team_id or context.enterprise_id or "")
+        await next()
+
+    @app.error
+    async def count_errors(error, body, logger):
+        _record_error(body, logger, error)
+
+
+def register_runtime_gauges():
+    """
+    ワーカープール（待ち時間・実行時間を含む）・一覧とタイムゾーンのキャッシュ・レート制限・ローカル配信エンジン・ワークスペースごとの予約数をゲージとして登録
+    """
+    from handlers.list_cache import listing_cache
+    from handlers.reminder_store import reminder_store
+    from handlers.scheduler_engine import scheduler_engine
+    from handlers.slack_client import rate_limiter
+    from handlers.user_timezones import user_timezones
+    from handlers.worker_pool import worker_pool, async_worker_pool, bulk_job_pool
+
+    pools = {"thread": worker_pool, "asyncio": async_worker_pool, "bulk": bulk_job_pool}
+
+    def pool_values(key):
+        return lambda: [((name,), pool.stats()[key]) for name, pool in pools.items()]
+
+    def timing_values(timing, field):
+        # TimingStats（wait_time: キューで待った時間 / exec_time: 実行時間）の累計。rate(_sum) / rate(_count) で平均を出す
+        return lambda: [((name,), getattr(getattr(pool, timing), field)) for name, pool in pools.items()]
+
+    registry.gauge("gui_reminder_worker_queue_depth", "Jobs waiting for a worker", ("pool",), pool_values("queue_depth"))
+    registry.gauge("gui_reminder_worker_running", "Jobs currently running", ("pool",), pool_values("running"))
+    registry.gauge("gui_reminder_worker_completed", "Jobs completed since start", ("pool",), pool_values("completed"))
+    registry.gauge("gui_reminder_worker_failed", "Jobs failed since start", ("pool",), pool_values("failed"))
+    for timing, metric, help_text in (
+        ("wait_time", "gui_reminder_worker_wait_seconds", "Time jobs waited in the queue"),
+        ("exec_time", "gui_reminder_worker_run_seconds", "Time jobs spent running"),
+    ):
+        registry.gauge(f"{metric}_sum", f"{help_text} (total seconds)", ("pool",), timing_values(timing, "total"))
+        registry.gauge(f"{metric}_count", f"{help_text} (number of jobs)", ("pool",), timing_values(timing, "count"))
+        registry.gauge(f"{metric}_max", f"{help_text} (longest, seconds)", ("pool",), timing_values(timing, "max"))
+    registry.gauge(
+        "gui_reminder_list_cache", "Reminder list cache statistics", ("stat",),
+        lambda: [((name,), value) for name, value in listing_cache.stats().items()]
+    )
+    registry.gauge(
+        "gui_reminder_user_tz_cache", "User timezone cache statistics", ("stat",),
+        lambda: [((name,), value) for name, value in user_timezones.stats().items()]
+    )
+    registry.gauge(
+        "gui_reminder_rate_limiter", "Slack API rate limiter statistics", ("stat",),
+        lambda: [((name,), value) for name, value in rate_limiter.stats().items()]
+    )
+    registry.gauge(
+        "gui_reminder_local_scheduler_pending", "Reminders waiting in the local delivery engine", (),
+        lambda: [((), scheduler_engine.pending_count())]
+    )
+    registry.gauge(
+        "gui_reminder_team_pending_reminders", "Reminders not yet delivered per workspace", ("team",),
+        lambda: [((team,), count) for team, count in sorted(reminder_store.count_by_team().items())]
+    )
+
+
+def start_metrics_server(port=METRICS_PORT, host="0.0.0.0"):
+    """
+    /metrics だけを返す HTTP サーバーを別スレッドで起動する（Socket Mode 用）
+    """
+    if not port:
+        return None
+    # HTTP モードでは使わないため、http.server はここで読み込む
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsRequestHandler(BaseHTTPRequestHandler):
+
+        def do_GET(self):
+            if self.path.split("?", 1)[0] != "/metrics":
+                self.send_error(404)
+                return
+            payload = registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            # スクレイプのたびにアクセスログを出さない
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsRequestHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    logger.info(f"メトリクスを http://{host}:{port}/metrics で公開しています")
+    return server
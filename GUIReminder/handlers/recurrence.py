@@ -0,0 +1,466 @@
+import re
+import time
+import uuid
+import logging
+import calendar
+import datetime
+import threading
+from slack_sdk.errors import SlackApiError
+
+from handlers.config import config
+from handlers.delivery import cancel_message, cancel_message_async, schedule_messages, schedule_messages_async
+from handlers.reminder_store import reminder_store
+from handlers.reminder_text import KIND_REMINDER, KIND_SCHEDULE, format_reminder_text, format_schedule_text
+from handlers.slack_client import workspace_of
+from handlers.user_timezones import zone
+
+# 繰り返しのリマインダーで、先に予約しておく回数と期間（秒）
+RECURRENCE_WINDOW = config.recurrence_window
+RECURRENCE_HORIZON = config.recurrence_horizon
+# 予約を補充するジョブの実行間隔（秒）
+RECURRENCE_TOPUP_INTERVAL = config.recurrence_topup_interval
+
+# 繰り返しの ID の接頭辞
+SERIES_ID_PREFIX = "S"
+
+WEEKDAY_CODES = ("MO", "TU", "WE", "TH", "FR", "SA", "SU")
+# BYDAY の 1 要素（例: "TU", "2TU", "-1FR"）
+_BYDAY = re.compile(r"(-1|[1-4])?(MO|TU|WE|TH|FR|SA|SU)")
+
+logger = logging.getLogger(__name__)
+
+
+class RecurrenceRule:
+    """
+    RRULE のうち次の形に対応した繰り返し規則
+      FREQ=DAILY                   毎日
+      FREQ=WEEKLY;BYDAY=MO,WE,...  毎週の指定した曜日（平日は MO,TU,WE,TH,FR）
+      FREQ=MONTHLY;BYDAY=2TU       毎月第 N 曜日（-1 は最終）
+    exdates は除外する日付の集合
+    """
+
+    def __init__(self, freq, weekdays=(), nth=None, exdates=()):
+        self.freq = freq
+        self.weekdays = tuple(sorted(weekdays))
+        self.nth = nth
+        self.exdates = frozenset(exdates)
+
+    @classmethod
+    def parse(cls, rule, exdates=""):
+        parts = dict(part.split("=", 1) for part in rule.split(";") if part)
+        freq = parts.get("FREQ")
+        weekdays, nth = [], None
+        for item in filter(None, parts.get("BYDAY", "").split(",")):
+            match = _BYDAY.fullmatch(item)
+            if not match:
+                raise ValueError(f"BYDAY が不正です: {item}")
+            if match.group(1):
+                nth = int(match.group(1))
+            weekdays.append(WEEKDAY_CODES.index(match.group(2)))
+        if freq not in ("DAILY", "WEEKLY", "MONTHLY"):
+            raise ValueError(f"FREQ が不正です: {freq}")
+        if freq == "WEEKLY" and not weekdays:
+            raise ValueError("FREQ=WEEKLY には BYDAY が必要です")
+        if freq == "MONTHLY" and (len(weekdays) != 1 or nth is None):
+            raise ValueError("FREQ=MONTHLY の BYDAY は 1 つの第 N 曜日で指定してください")
+        return cls(freq, weekdays, nth, parse_exdates(exdates))
+
+    def to_rrule(self):
+        if self.freq == "DAILY":
+            return "FREQ=DAILY"
+        if self.freq == "WEEKLY":
+            return "FREQ=WEEKLY;BYDAY=" + ",".join(WEEKDAY_CODES[w] for w in self.weekdays)
+        return f"FREQ=MONTHLY;BYDAY={self.nth}{WEEKDAY_CODES[self.weekdays[0]]}"
+
+    def _dates_from(self, first):
+        """
+        first 以降で規則に合う日付を順に返す（1 日ずつではなく曜日・月単位の計算で進める）
+        """
+        if self.freq == "DAILY":
+            day = first
+            while True:
+                yield day
+                day += datetime.timedelta(days=1)
+        elif self.freq == "WEEKLY":
+            monday = first - datetime.timedelta(days=first.weekday())
+            while True:
+                for weekday in self.weekdays:
+                    day = monday + datetime.timedelta(days=weekday)
+                    if day >= first:
+                        yield day
+                monday += datetime.timedelta(days=7)
+        else:
+            year, month = first.year, first.month
+            while True:
+                day = nth_weekday(year, month, self.nth, self.weekdays[0])
+                if day is not None and day >= first:
+                    yield day
+                year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+    def occurrences(self, start, after, count):
+        """
+        start（最初の回の日時）の時刻で、after より後の回を最大 count 回返す
+        start にタイムゾーンがあれば、夏時間の切り替えをまたいでもそのタイムゾーンの同じ時刻にする
+        """
+        if count <= 0:
+            return
+        first = max(start, after).date()
+        for day in self._dates_from(first):
+            if day in self.exdates:
+                continue
+            occurrence = datetime.datetime.combine(day, start.timetz())
+            if occurrence <= after or occurrence < start:
+                continue
+            yield occurrence
+            count -= 1
+            if count == 0:
+                return
+
+
+def nth_weekday(year, month, nth, weekday):
+    """
+    year 年 month 月の第 nth weekday 曜日（nth=-1 は最終）。無ければ None
+    """
+    first_weekday, days_in_month = calendar.monthrange(year, month)
+    if nth == -1:
+        last = datetime.date(year, month, days_in_month)
+        return last - datetime.timedelta(days=(last.weekday() - weekday) % 7)
+    day = 1 + (weekday - first_weekday) % 7 + (nth - 1) * 7
+    return datetime.date(year, month, day) if day <= days_in_month else None
+
+
+def parse_exdates(exdates):
+    """
+    "YYYY-MM-DD" をカンマ・空白区切りで並べた文字列を日付の集合にする
+    """
+    return {
+        datetime.datetime.strptime(value, "%Y-%m-%d").date()
+        for value in re.split(r"[,、\s]+", exdates or "") if value
+    }
+
+
+# /set-reminder・/set-schedule のモーダルの繰り返しの選択肢
+RECURRENCE_OPTIONS = [
+    {"text": {"type": "plain_text", "text": "繰り返さない"}, "value": "none"},
+    {"text": {"type": "plain_text", "text": "毎日"}, "value": "daily"},
+    {"text": {"type": "plain_text", "text": "平日（月〜金）"}, "value": "weekdays"},
+    {"text": {"type": "plain_text", "text": "毎週（同じ曜日）"}, "value": "weekly"},
+    {"text": {"type": "plain_text", "text": "毎月（同じ第N曜日）"}, "value": "monthly"},
+]
+RECURRENCE_LABELS = {opt["value"]: opt["text"]["text"] for opt in RECURRENCE_OPTIONS}
+
+
+def build_recurrence_blocks():
+    """
+    モーダルに追加する繰り返しの選択欄と除外日の入力欄
+    """
+    return [
+        {
+            "type": "input",
+            "block_id": "recurrence_block",
+            "label": {"type": "plain_text", "text": "繰り返し"},
+            "element": {
+                "type": "static_select",
+                "action_id": "recurrence_select",
+                "options": RECURRENCE_OPTIONS,
+                "initial_option": RECURRENCE_OPTIONS[0],
+            }
+        },
+        {
+            "type": "input",
+            "block_id": "exdates_block",
+            "optional": True,
+            "label": {"type": "plain_text", "text": "繰り返しから除外する日"},
+            "element": {
+                "type": "plain_text_input",
+                "action_id": "exdates_input",
+                "placeholder": {"type": "plain_text", "text": "例: 2025-01-01, 2025-05-05"}
+            }
+        },
+    ]
+
+
+def rule_for_choice(choice, start_dt):
+    """
+    モーダルの選択肢と最初の回の日時から RRULE を作る
+    """
+    weekday = WEEKDAY_CODES[start_dt.weekday()]
+    if choice == "daily":
+        return "FREQ=DAILY"
+    if choice == "weekdays":
+        return "FREQ=WEEKLY;BYDAY=MO,TU,WE,TH,FR"
+    if choice == "weekly":
+        return f"FREQ=WEEKLY;BYDAY={weekday}"
+    if choice == "monthly":
+        nth = (start_dt.day - 1) // 7 + 1
+        # 第5週は月によって無いため「最終」とする
+        return f"FREQ=MONTHLY;BYDAY={nth if nth <= 4 else -1}{weekday}"
+    return None
+
+
+def parse_recurrence_values(values, start_dt):
+    """
+    モーダルの入力から (選択肢, RRULE, 除外日, エラー) を取り出す
+    """
+    selected = (values.get("recurrence_block", {}).get("recurrence_select", {}).get("selected_option") or {})
+    choice = selected.get("value", "none")
+    rule = rule_for_choice(choice, start_dt)
+    if rule is None:
+        # 繰り返さない場合は除外日を使わないため、入力が残っていても確認しない
+        return choice, None, "", None
+    exdates = values.get("exdates_block", {}).get("exdates_input", {}).get("value") or ""
+    try:
+        normalized = ",".join(sorted(d.isoformat() for d in parse_exdates(exdates)))
+    except ValueError:
+        return choice, None, "", {"exdates_block": "除外する日は YYYY-MM-DD 形式で入力してください。"}
+    return choice, rule, normalized, None
+
+
+def _series_offsets(series):
+    return [int(value) for value in series["offsets"].split(",") if value]
+
+
+def _occurrence_text(series, occurrence):
+    if series["kind"] == KIND_REMINDER:
+        return format_reminder_text(series["mentions"], series["body"])
+    if series["kind"] == KIND_SCHEDULE:
+        return format_schedule_text(occurrence.strftime("%Y-%m-%d %H:%M"), series["title"], series["body"])
+    return series["body"]
+
+
+def plan_topup(series, now):
+    """
+    繰り返しの次の予約分を計算する（API は呼ばない）
+    戻り値は (新たに予約する (post_at, text) のリスト, materialized_until, next_topup_at, active)
+    """
+    rule = RecurrenceRule.parse(series["rule"], series["exdates"])
+    # 日付と時刻は登録したユーザーのタイムゾーンで数える（空ならサーバーのローカルタイム）
+    tz = zone(series.get("tz"))
+    start = datetime.datetime.fromtimestamp(series["start_at"], tz)
+    now_dt = datetime.datetime.fromtimestamp(now, tz)
+    horizon = datetime.datetime.fromtimestamp(now + RECURRENCE_HORIZON, tz)
+    until = datetime.datetime.fromtimestamp(series["materialized_until"], tz) if series["materialized_until"] else None
+
+    # 予約済みでまだ来ていない回
+    pending = []
+    if until is not None:
+        pending = [o for o in rule.occurrences(start, now_dt, RECURRENCE_WINDOW) if o <= until]
+    # 空いた分を、期間内で予約済みの最後の回の後から補充する
+    new = []
+    for occurrence in rule.occurrences(start, max(until or now_dt, now_dt), RECURRENCE_WINDOW - len(pending)):
+        if occurrence > horizon:
+            break
+        new.append(occurrence)
+
+    last = new[-1] if new else until
+    upcoming = pending + new
+    following = next(rule.occurrences(start, max(last or now_dt, now_dt), 1), None)
+    if not upcoming and following is None:
+        return [], series["materialized_until"], 0, False
+
+    # 次の補充は、直近の回が配信されて枠が空いたとき、または次の回が期間内に入ったとき
+    candidates = []
+    if upcoming:
+        candidates.append(int(upcoming[0].timestamp()) + 1)
+    if following is not None and len(upcoming) < RECURRENCE_WINDOW:
+        candidates.append(int(following.timestamp()) - RECURRENCE_HORIZON)
+    next_topup_at = max(min(candidates), now + 1)
+
+    offsets = [0, *_series_offsets(series)]
+    posts = []
+    for occurrence in new:
+        post_at = int(occurrence.timestamp())
+        text = _occurrence_text(series, occurrence)
+        posts.extend((post_at + offset, text) for offset in offsets if post_at + offset > now)
+    materialized_until = int(last.timestamp()) if last else 0
+    return posts, materialized_until, next_topup_at, True
+
+
+def _series_fields(series):
+    return {
+        "setter": series["setter"],
+        "mentions": series["mentions"],
+        "title": series["title"],
+        "body": series["body"],
+        "kind": series["kind"],
+        "series_id": series["series_id"],
+    }
+
+
+def topup_series(client, series, now=None):
+    """
+    1 つの繰り返しの予約を補充し、store に書き込む進捗 (series_id, materialized_until, next_topup_at, active) を返す
+    予約に失敗した場合（Slack API のエラー・再試行しても続く通信エラー）は進めずに、この繰り返しだけ次のジョブで再試行する
+    """
+    now = int(time.time()) if now is None else now
+    posts, materialized_until, next_topup_at, active = plan_topup(series, now)
+    if posts:
+        try:
+            schedule_messages(client, series["channel"], posts, **_series_fields(series))
+        except SlackApiError as e:
+            logger.error(f"繰り返し {series['series_id']} の予約に失敗しました: {e.response['error']}")
+            return _retry_later(series, now)
+        except Exception as e:
+            logger.error(f"繰り返し {series['series_id']} の予約に失敗しました: {e}")
+            return _retry_later(series, now)
+    return series["series_id"], materialized_until, next_topup_at, active
+
+
+async def topup_series_async(client, series, now=None):
+    """
+    topup_series の AsyncWebClient 版
+    """
+    now = int(time.time()) if now is None else now
+    posts, materialized_until, next_topup_at, active = plan_topup(series, now)
+    if posts:
+        try:
+            await schedule_messages_async(client, series["channel"], posts, **_series_fields(series))
+        except SlackApiError as e:
+            logger.error(f"繰り返し {series['series_id']} の予約に失敗しました: {e.response['error']}")
+            return _retry_later(series, now)
+        except Exception as e:
+            logger.error(f"繰り返し {series['series_id']} の予約に失敗しました: {e}")
+            return _retry_later(series, now)
+    return series["series_id"], materialized_until, next_topup_at, active
+
+
+def _retry_later(series, now):
+    # 進捗は進めずに、次の補充を RECURRENCE_TOPUP_INTERVAL 後にする
+    return series["series_id"], series["materialized_until"], now + RECURRENCE_TOPUP_INTERVAL, True
+
+
+def _new_series(channel, rule, start_at, exdates="", offsets=(), store=None, **fields):
+    store = store or reminder_store
+    series_id = f"{SERIES_ID_PREFIX}{uuid.uuid4().hex}"
+    store.add_series(
+        series_id, channel, rule, start_at, exdates=exdates, offsets=",".join(str(o) for o in offsets), **fields
+    )
+    return store.get_series(series_id)
+
+
+def create_series(client, channel, rule, start_at, exdates="", offsets=(), store=None, **fields):
+    """
+    繰り返しのリマインダーを登録し、最初の予約分を作る
+    fields は setter / mentions / title / body / kind / tz（各回の時刻を解釈するタイムゾーン名）
+    予約に失敗した場合（SlackApiError・通信エラーなど）は繰り返しを停止してから例外を送出する（バックグラウンドの補充で予約されないように）
+    """
+    store = store or reminder_store
+    series = _new_series(channel, rule, start_at, exdates, offsets, store, team_id=workspace_of(client), **fields)
+    now = int(time.time())
+    try:
+        posts, materialized_until, next_topup_at, active = plan_topup(series, now)
+        schedule_messages(client, channel, posts, **_series_fields(series))
+    except Exception:
+        store.deactivate_series(series["series_id"])
+        raise
+    store.update_series_progress([(series["series_id"], materialized_until, next_topup_at, active)])
+    return series["series_id"]
+
+
+async def create_series_async(client, channel, rule, start_at, exdates="", offsets=(), store=None, **fields):
+    """
+    create_series の AsyncWebClient 版
+    """
+    store = store or reminder_store
+    series = _new_series(channel, rule, start_at, exdates, offsets, store, team_id=workspace_of(client), **fields)
+    now = int(time.time())
+    try:
+        posts, materialized_until, next_topup_at, active = plan_topup(series, now)
+        await schedule_messages_async(client, channel, posts, **_series_fields(series))
+    except Exception:
+        store.deactivate_series(series["series_id"])
+        raise
+    store.update_series_progress([(series["series_id"], materialized_until, next_topup_at, active)])
+    return series["series_id"]
+
+
+def cancel_series(client, series_id, store=None):
+    """
+    繰り返しを停止し、まだ配信されていない予約をすべて取り消して件数を返す
+    先に停止するので、取り消しの途中でバックグラウンドの補充が走っても新しい回は予約されない
+    取り消しに失敗した予約があれば残りを取り消したあとで最初のエラーを送出する
+    """
+    store = store or reminder_store
+    store.deactivate_series(series_id)
+    errors = []
+    pending = store.list_series_pending(series_id, since=int(time.time()))
+    for reminder in pending:
+        try:
+            cancel_message(client, reminder["channel"], reminder["scheduled_message_id"])
+        except SlackApiError as e:
+            errors.append(e)
+    if errors:
+        raise errors[0]
+    return len(pending)
+
+
+async def cancel_series_async(client, series_id, store=None):
+    """
+    cancel_series の AsyncWebClient 版
+    """
+    store = store or reminder_store
+    store.deactivate_series(series_id)
+    errors = []
+    pending = store.list_series_pending(series_id, since=int(time.time()))
+    for reminder in pending:
+        try:
+            await cancel_message_async(client, reminder["channel"], reminder["scheduled_message_id"])
+        except SlackApiError as e:
+            errors.append(e)
+    if errors:
+        raise errors[0]
+    return len(pending)
+
+
+class RecurrenceJob(threading.Thread):
+    """
+    補充の時刻を過ぎた繰り返しのリマインダーに、次の回の予約をまとめて追加するバックグラウンドジョブ
+    clients はワークスペースごとの WebClient を返す WorkspaceClients
+    """
+
+    def __init__(self, clients, store=None, interval=RECURRENCE_TOPUP_INTERVAL):
+        super().__init__(name="reminder-recurrence", daemon=True)
+        self.clients = clients
+        self.store = store or reminder_store
+        self.interval = interval
+        self._stopped = threading.Event()
+
+    def run(self):
+        self._run_once_safely()
+        while not self._stopped.wait(self.interval):
+            self._run_once_safely()
+
+    def _run_once_safely(self):
+        # 1 回の失敗（DB のエラーなど）でスレッドを終わらせず、次の間隔で再試行する
+        try:
+            self.run_once()
+        except Exception:
+            logger.exception("繰り返しのリマインダーの補充に失敗しました")
+
+    def run_once(self, now=None):
+        now = int(time.time()) if now is None else now
+        # (active, next_topup_at) の索引で、補充が必要なものだけを読む
+        due = self.store.series_due(now)
+        updates = []
+        try:
+            for series in due:
+                client = self.clients.get(series["team_id"])
+                if client is None:
+                    # アンインストールされたワークスペースの繰り返しは補充しない
+                    updates.append((series["series_id"], series["materialized_until"], series["next_topup_at"], False))
+                    continue
+                try:
+                    updates.append(topup_series(client, series, now))
+                except Exception:
+                    # 予定の計算などで失敗した繰り返しだけを後回しにし、残りの補充は続ける
+                    logger.exception(f"繰り返し {series['series_id']} の補充に失敗しました")
+                    updates.append(_retry_later(series, now))
+        finally:
+            # 途中で止まっても、予約済みの分の進捗は必ず保存する（再起動後に同じ回を二重に予約しない）
+            if updates:
+                self.store.update_series_progress(updates)
+                logger.info(f"繰り返しのリマインダー {len(updates)} 件の予約を補充しました")
+        return len(updates)
+
+    def stop(self):
+        self._stopped.set()
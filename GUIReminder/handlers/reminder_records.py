@@ -0,0 +1,98 @@
+from array import array
+
+from handlers.reminder_text import parse_scheduled_text
+
+# 一覧・ページ送りで読む列（ReminderRecord の属性と同じ順）
+RECORD_COLUMNS = (
+    "scheduled_message_id", "channel", "post_at", "setter", "mentions", "title", "body", "kind", "series_id", "team_id"
+)
+
+
+class ReminderRecord:
+    """
+    一覧に表示する予約 1 件
+    行ごとに dict を作らず __slots__ の属性に持つ（reminder["post_at"] のように dict と同じ書き方でも読める）
+    """
+
+    __slots__ = RECORD_COLUMNS
+
+    def __init__(self, scheduled_message_id, channel, post_at, setter="", mentions="", title="", body="", kind="",
+                 series_id="", team_id=""):
+        self.scheduled_message_id = scheduled_message_id
+        self.channel = channel
+        self.post_at = post_at
+        self.setter = setter
+        self.mentions = mentions
+        self.title = title
+        self.body = body
+        self.kind = kind
+        self.series_id = series_id
+        self.team_id = team_id
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+
+    def to_dict(self):
+        return {column: getattr(self, column) for column in RECORD_COLUMNS}
+
+    def __eq__(self, other):
+        if not isinstance(other, ReminderRecord):
+            return NotImplemented
+        return all(getattr(self, column) == getattr(other, column) for column in RECORD_COLUMNS)
+
+    def __repr__(self):
+        return f"ReminderRecord({self.scheduled_message_id!r}, {self.channel!r}, {self.post_at!r})"
+
+
+class ScheduledMessageColumns:
+    """
+    chat.scheduledMessages.list の結果を列ごとに保持する
+    レスポンスの dict は残さず、予約IDのリスト・post_at の配列と、全件の本文を連結した 1 つの文字列（と各本文の開始位置）だけを持つ
+    本文の解析はストアに無い予約を取り込むときだけ rows() で行う
+    """
+
+    def __init__(self):
+        self.ids = []
+        self.post_at = array("q")
+        # 本文 i は _buffer[_offsets[i]:_offsets[i + 1]]
+        self._offsets = array("q", [0])
+        self._buffer = ""
+        # まだ _buffer に連結していない本文
+        self._pending = []
+
+    def extend(self, messages):
+        """
+        1 ページ分の scheduled_messages を追加する
+        """
+        offset = self._offsets[-1]
+        for msg in messages:
+            text = msg.get("text", "")
+            offset += len(text)
+            self.ids.append(msg["id"])
+            self.post_at.append(int(msg["post_at"]))
+            self._offsets.append(offset)
+            self._pending.append(text)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def text(self, index):
+        if self._pending:
+            # 取得が終わってから 1 度だけ連結する（ページごとに連結し直さない）
+            self._buffer += "".join(self._pending)
+            self._pending = []
+        return self._buffer[self._offsets[index]:self._offsets[index + 1]]
+
+    def rows(self, indexes):
+        """
+        指定した位置の予約を (予約ID, post_at, 本文, 本文の解析結果) で返す
+        """
+        for index in indexes:
+            text = self.text(index)
+            yield self.ids[index], self.post_at[index], text, parse_scheduled_text(text)
@@ -0,0 +1,646 @@
+import time
+import heapq
+import asyncio
+import logging
+import sqlite3
+import threading
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor
+from slack_sdk.errors import SlackApiError
+
+from handlers.config import config
+from handlers.list_cache import listing_cache
+from handlers.slack_client import workspace_of
+from handlers.reminder_records import RECORD_COLUMNS, ReminderRecord, ScheduledMessageColumns
+
+# リマインダーを保存する SQLite ファイル
+REMINDER_DB_PATH = config.reminder_db_path
+# Slack 側との突き合わせ（reconcile）間隔（秒）
+RECONCILE_INTERVAL = config.reconcile_interval
+# 複数のチャンネルをまとめて突き合わせるときの同時呼び出し数
+RECONCILE_FANOUT_CONCURRENCY = config.reconcile_fanout_concurrency
+
+logger = logging.getLogger(__name__)
+
+# 一覧のページで読む列
+RECORD_SELECT = ", ".join(RECORD_COLUMNS)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS reminders (
+    scheduled_message_id TEXT PRIMARY KEY,
+    channel TEXT NOT NULL,
+    post_at INTEGER NOT NULL,
+    setter TEXT NOT NULL DEFAULT '',
+    mentions TEXT NOT NULL DEFAULT '',
+    title TEXT NOT NULL DEFAULT '',
+    body TEXT NOT NULL DEFAULT '',
+    text TEXT NOT NULL DEFAULT '',
+    created_at INTEGER NOT NULL,
+    -- 配信方法: slack（chat.scheduleMessage） / local（scheduler_engine）
+    backend TEXT NOT NULL DEFAULT 'slack',
+    -- 予約の種類: reminder（/set-reminder） / schedule（/set-schedule） / 空（不明）
+    kind TEXT NOT NULL DEFAULT '',
+    -- 繰り返しの予約の場合はその series_id
+    series_id TEXT NOT NULL DEFAULT '',
+    -- 予約したワークスペース（複数のワークスペースにインストールした場合。単一の場合は空）
+    team_id TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS idx_reminders_channel_post_at ON reminders (channel, post_at);
+CREATE INDEX IF NOT EXISTS idx_reminders_setter_post_at ON reminders (setter, post_at);
+CREATE INDEX IF NOT EXISTS idx_reminders_series_post_at ON reminders (series_id, post_at);
+CREATE INDEX IF NOT EXISTS idx_reminders_team ON reminders (team_id);
+
+-- 繰り返しのリマインダー。予約は直近の分だけ作り、next_topup_at に補充する
+CREATE TABLE IF NOT EXISTS series (
+    series_id TEXT PRIMARY KEY,
+    channel TEXT NOT NULL,
+    setter TEXT NOT NULL DEFAULT '',
+    kind TEXT NOT NULL DEFAULT '',
+    mentions TEXT NOT NULL DEFAULT '',
+    title TEXT NOT NULL DEFAULT '',
+    body TEXT NOT NULL DEFAULT '',
+    -- RRULE 形式の繰り返し規則と、除外する日（YYYY-MM-DD のカンマ区切り）
+    rule TEXT NOT NULL,
+    exdates TEXT NOT NULL DEFAULT '',
+    -- 最初の回の日時と、各回に加えて送る事前通知（秒のカンマ区切り、負の値）
+    start_at INTEGER NOT NULL,
+    offsets TEXT NOT NULL DEFAULT '',
+    -- 予約済みの最後の回の日時と、次に補充する日時
+    materialized_until INTEGER NOT NULL DEFAULT 0,
+    next_topup_at INTEGER NOT NULL DEFAULT 0,
+    active INTEGER NOT NULL DEFAULT 1,
+    created_at INTEGER NOT NULL,
+    team_id TEXT NOT NULL DEFAULT '',
+    -- 各回の時刻を解釈するタイムゾーン（IANA 名。空ならサーバーのローカルタイム）
+    tz TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS idx_series_topup ON series (active, next_topup_at);
+
+-- 一度でも Slack 側と突き合わせたチャンネル
+CREATE TABLE IF NOT EXISTS channels (
+    channel TEXT PRIMARY KEY,
+    reconciled_at INTEGER NOT NULL,
+    team_id TEXT NOT NULL DEFAULT ''
+);
+"""
+
+# 既存のデータベースに足す列（テーブル, 列, 定義）
+MIGRATIONS = [
+    ("reminders", "backend", "TEXT NOT NULL DEFAULT 'slack'"),
+    ("reminders", "kind", "TEXT NOT NULL DEFAULT ''"),
+    ("reminders", "series_id", "TEXT NOT NULL DEFAULT ''"),
+    ("reminders", "team_id", "TEXT NOT NULL DEFAULT ''"),
+    ("series", "team_id", "TEXT NOT NULL DEFAULT ''"),
+    ("series", "tz", "TEXT NOT NULL DEFAULT ''"),
+    ("channels", "team_id", "TEXT NOT NULL DEFAULT ''"),
+]
+
+
+class ReminderStore:
+    """
+    予約したリマインダーをローカルに保存する SQLite ストア
+    一覧表示は chat.scheduledMessages.list を呼ばずに (channel, post_at) の範囲検索で行う
+    """
+
+    def __init__(self, path=REMINDER_DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._open_lock = threading.Lock()
+        # 起動を速くするため、接続は import 時ではなく最初に使うときに開く
+        self._connection = None
+
+    @property
+    def _conn(self):
+        if self._connection is None:
+            with self._open_lock:
+                if self._connection is None:
+                    self._connection = self._connect()
+        return self._connection
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        self._migrate(conn)
+        conn.executescript(SCHEMA)
+        return conn
+
+    def reopen(self):
+        """
+        fork したワーカープロセスで、親から引き継いだ接続を使わずに次の使用時に開き直す
+        （引き継いだ接続は閉じると親のロックに影響しうるため、そのまま手放す）
+        """
+        self._lock = threading.Lock()
+        self._open_lock = threading.Lock()
+        self._connection = None
+
+    def _migrate(self, conn):
+        """
+        既存のデータベースに後から追加した列を足す
+        """
+        for table, column, definition in MIGRATIONS:
+            columns = {row["name"] for row in conn.execute(f"PRAGMA table_info({table})")}
+            if columns and column not in columns:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+    def add(self, scheduled_message_id, channel, post_at, setter="", mentions="", title="", body="", text="",
+            backend="slack", kind="", series_id="", team_id=""):
+        """
+        予約したメッセージを 1 件保存する
+        """
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO reminders"
+                " (scheduled_message_id, channel, post_at, setter, mentions, title, body, text, created_at, backend,"
+                " kind, series_id, team_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (scheduled_message_id, channel, post_at, setter or "", mentions or "",
+                 title or "", body or "", text or "", int(time.time()), backend, kind or "", series_id or "",
+                 team_id or ""),
+            )
+
+    def delete(self, scheduled_message_id):
+        with self._lock:
+            self._conn.execute("DELETE FROM reminders WHERE scheduled_message_id = ?", (scheduled_message_id,))
+
+    def get(self, scheduled_message_id):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM reminders WHERE scheduled_message_id = ?", (scheduled_message_id,)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def list_channel(self, channel, since=None, limit=None):
+        """
+        チャンネルの予約を post_at 順に返す（since 以降のみ）
+        """
+        since = int(time.time()) if since is None else since
+        sql = "SELECT * FROM reminders WHERE channel = ? AND post_at >= ? ORDER BY post_at, scheduled_message_id"
+        params = [channel, since]
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [dict(row) for row in rows]
+
+    def page_channel(self, channel, limit, after=None, before=None, since=None, setter=None):
+        """
+        チャンネルの予約を (post_at, scheduled_message_id) のキーセットで 1 ページ分返す
+        after / before はページ端の (post_at, scheduled_message_id)。setter を指定するとそのユーザーの予約だけにする
+        戻り値は (post_at 順の ReminderRecord, 進んだ方向にまだ行があるか)
+        """
+        since = int(time.time()) if since is None else since
+        sql = f"SELECT {RECORD_SELECT} FROM reminders WHERE channel = ? AND post_at >= ?"
+        params = [channel, since]
+        if setter is not None:
+            sql += " AND setter = ?"
+            params.append(setter)
+        if before is not None:
+            # 前のページは逆順に limit 件取って並べ直す
+            sql += " AND (post_at, scheduled_message_id) < (?, ?) ORDER BY post_at DESC, scheduled_message_id DESC"
+            params.extend(before)
+        else:
+            if after is not None:
+                sql += " AND (post_at, scheduled_message_id) > (?, ?)"
+                params.extend(after)
+            sql += " ORDER BY post_at, scheduled_message_id"
+        # 1 件多く取って、続きがあるかを判定する
+        sql += " LIMIT ?"
+        params.append(limit + 1)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        has_more = len(rows) > limit
+        rows = [ReminderRecord(*row) for row in rows[:limit]]
+        if before is not None:
+            rows.reverse()
+        return rows, has_more
+
+    def list_setter(self, setter, since=None, limit=None):
+        """
+        ユーザーが設定した予約を post_at 順に返す（since 以降のみ）
+        """
+        since = int(time.time()) if since is None else since
+        sql = "SELECT * FROM reminders WHERE setter = ? AND post_at >= ? ORDER BY post_at, scheduled_message_id"
+        params = [setter, since]
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [dict(row) for row in rows]
+
+    def setter_channels(self, setter, team_id=None, since=None):
+        """
+        ユーザーが予約を設定しているチャンネルを返す（team_id を指定するとそのワークスペースのみ）
+        """
+        since = int(time.time()) if since is None else since
+        sql = "SELECT DISTINCT channel FROM reminders WHERE setter = ? AND post_at >= ?"
+        params = [setter, since]
+        if team_id is not None:
+            sql += " AND team_id = ?"
+            params.append(team_id)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [row["channel"] for row in rows]
+
+    def page_setter(self, setter, limit, after=None, before=None, since=None, team_id=None, channels=None):
+        """
+        ユーザーが全チャンネルに設定した予約を page_channel と同じキーセットで 1 ページ分返す
+        チャンネルごとのページ（それぞれ post_at 順）をヒープでマージし、先頭の limit 件だけを取り出す
+        （全件を並べ替えずに、読むのはチャンネルあたり最大 limit + 1 行）
+        """
+        since = int(time.time()) if since is None else since
+        if channels is None:
+            channels = self.setter_channels(setter, team_id, since)
+        streams, has_more = [], False
+        for channel in channels:
+            rows, more = self.page_channel(channel, limit, after=after, before=before, since=since, setter=setter)
+            has_more = has_more or more
+            # 前のページは各チャンネルの末尾から新しい順にマージする
+            streams.append(reversed(rows) if before is not None else rows)
+        merged = heapq.merge(
+            *streams, key=lambda row: (row.post_at, row.scheduled_message_id), reverse=before is not None
+        )
+        rows = list(islice(merged, limit + 1))
+        has_more = has_more or len(rows) > limit
+        rows = rows[:limit]
+        if before is not None:
+            rows.reverse()
+        return rows, has_more
+
+    def _search_filter(self, channel, setter=None, since=None, until=None, text=None):
+        since = int(time.time()) if since is None else since
+        where, params = "channel = ? AND post_at >= ?", [channel, since]
+        if until is not None:
+            where += " AND post_at < ?"
+            params.append(until)
+        if setter:
+            where += " AND setter = ?"
+            params.append(setter)
+        if text:
+            # 本文（メンション・タイトル・内容を含む）に含まれるか
+            where += " AND instr(text, ?) > 0"
+            params.append(text)
+        return where, params
+
+    def count_matching(self, channel, setter=None, since=None, until=None, text=None):
+        """
+        チャンネルの予約のうち、設定者・期間 [since, until)・本文の条件に合うものの件数
+        """
+        where, params = self._search_filter(channel, setter, since, until, text)
+        with self._lock:
+            return self._conn.execute(f"SELECT count(*) FROM reminders WHERE {where}", params).fetchone()[0]
+
+    def list_matching(self, channel, setter=None, since=None, until=None, text=None, limit=None):
+        """
+        count_matching と同じ条件の予約を post_at 順に返す
+        """
+        where, params = self._search_filter(channel, setter, since, until, text)
+        sql = f"SELECT {RECORD_SELECT} FROM reminders WHERE {where} ORDER BY post_at, scheduled_message_id"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [ReminderRecord(*row) for row in rows]
+
+    def _feed_filter(self, channel=None, setter=None, team_id=None):
+        if channel is not None:
+            return "channel = ?", [channel]
+        return "setter = ? AND team_id = ?", [setter, team_id or ""]
+
+    def feed_version(self, channel=None, setter=None, team_id=None):
+        """
+        チャンネル（または team_id のユーザー）の予約の版。予約の追加・削除・置き換えで変わる
+        INSERT OR REPLACE では rowid が新しくなるため、件数と rowid の合計・最大をインデックスだけで数える
+        """
+        where, params = self._feed_filter(channel, setter, team_id)
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT count(*), total(rowid), max(rowid) FROM reminders WHERE {where}", params
+            ).fetchone()
+        return tuple(row)
+
+    def iter_feed(self, channel=None, setter=None, team_id=None, page_size=500):
+        """
+        チャンネル（または team_id のユーザー）の予約を post_at 順に返す
+        page_size 件ずつ (post_at, scheduled_message_id) のキーセットで読み、読み込みの間だけロックを持つ
+        """
+        where, params = self._feed_filter(channel, setter, team_id)
+        sql = (
+            "SELECT rowid, scheduled_message_id, channel, post_at, created_at, mentions, title, body, text, kind"
+            f" FROM reminders WHERE {where} AND (post_at, scheduled_message_id) > (?, ?)"
+            " ORDER BY post_at, scheduled_message_id LIMIT ?"
+        )
+        last = (-1, "")
+        while True:
+            with self._lock:
+                rows = self._conn.execute(sql, [*params, *last, page_size]).fetchall()
+            yield from rows
+            if len(rows) < page_size:
+                return
+            last = (rows[-1]["post_at"], rows[-1]["scheduled_message_id"])
+
+    def list_pending(self, backend):
+        """
+        指定した配信方法の予約を (scheduled_message_id, post_at) で返す（起動時の復元用）
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT scheduled_message_id, post_at FROM reminders WHERE backend = ?", (backend,)
+            ).fetchall()
+        return [(row["scheduled_message_id"], row["post_at"]) for row in rows]
+
+    def list_series_pending(self, series_id, since=None):
+        """
+        繰り返しのリマインダーの、まだ配信されていない予約を返す
+        """
+        since = int(time.time()) if since is None else since
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM reminders WHERE series_id = ? AND post_at >= ? ORDER BY post_at, scheduled_message_id",
+                (series_id, since),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def add_series(self, series_id, channel, rule, start_at, setter="", kind="", mentions="", title="", body="",
+                   exdates="", offsets="", team_id="", tz=""):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO series (series_id, channel, setter, kind, mentions, title, body, rule, exdates,"
+                " start_at, offsets, created_at, team_id, tz) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (series_id, channel, setter or "", kind or "", mentions or "", title or "", body or "", rule,
+                 exdates or "", start_at, offsets or "", int(time.time()), team_id or "", tz or ""),
+            )
+
+    def get_series(self, series_id):
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM series WHERE series_id = ?", (series_id,)).fetchone()
+        return dict(row) if row else None
+
+    def series_due(self, now=None, limit=None):
+        """
+        補充の時刻を過ぎた繰り返しのリマインダーを返す（(active, next_topup_at) の範囲検索）
+        """
+        now = int(time.time()) if now is None else now
+        sql = "SELECT * FROM series WHERE active = 1 AND next_topup_at <= ? ORDER BY next_topup_at"
+        params = [now]
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [dict(row) for row in rows]
+
+    def update_series_progress(self, updates):
+        """
+        補充の結果をまとめて書き込む
+        updates は (series_id, materialized_until, next_topup_at, active) のリスト
+        """
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    "UPDATE series SET materialized_until = ?, next_topup_at = ?, active = ? WHERE series_id = ?",
+                    [(until, topup, int(active), series_id) for series_id, until, topup, active in updates],
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def deactivate_series(self, series_id):
+        with self._lock:
+            self._conn.execute("UPDATE series SET active = 0 WHERE series_id = ?", (series_id,))
+
+    def is_tracked(self, channel):
+        """
+        Slack 側と突き合わせ済みのチャンネルかどうか
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT 1 FROM channels WHERE channel = ?", (channel,)).fetchone()
+        return row is not None
+
+    def tracked_channels(self):
+        """
+        突き合わせの対象のチャンネルを (channel, team_id) で返す
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT channel, MAX(team_id) AS team_id FROM"
+                " (SELECT channel, team_id FROM channels UNION ALL SELECT channel, team_id FROM reminders)"
+                " GROUP BY channel"
+            ).fetchall()
+        return [(row["channel"], row["team_id"]) for row in rows]
+
+    def count_by_team(self, since=None):
+        """
+        ワークスペースごとの未配信の予約数
+        """
+        since = int(time.time()) if since is None else since
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT team_id, COUNT(*) AS count FROM reminders WHERE post_at >= ? GROUP BY team_id", (since,)
+            ).fetchall()
+        return {row["team_id"]: row["count"] for row in rows}
+
+    def replace_channel(self, channel, messages, fetched_at, team_id=""):
+        """
+        Slack 側の予約一覧（ScheduledMessageColumns）でチャンネルの内容を置き換える
+        既存の行は保存済みの情報を残し、Slack 側に無い行（配信済み・外部で削除）は消す
+        一覧の取得開始（fetched_at）以降に追加された行は取得結果に含まれないため残す
+        """
+        now = int(time.time())
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                # ローカル配信の予約は Slack 側に存在しないため突き合わせない
+                rows = self._conn.execute(
+                    "SELECT scheduled_message_id, created_at FROM reminders"
+                    " WHERE channel = ? AND backend = 'slack'", (channel,)
+                ).fetchall()
+                known = {row["scheduled_message_id"] for row in rows}
+                remote = set(messages.ids)
+                stale = {
+                    row["scheduled_message_id"] for row in rows
+                    if row["scheduled_message_id"] not in remote and row["created_at"] < fetched_at
+                }
+                self._conn.executemany(
+                    "DELETE FROM reminders WHERE scheduled_message_id = ?", [(i,) for i in stale]
+                )
+                # ボット以外（ストア導入前など）で予約されたメッセージを取り込む
+                # 本文の解析は取り込む予約だけに行う（既存の行は保存済みの項目を残す）
+                unknown = [index for index, i in enumerate(messages.ids) if i not in known]
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO reminders"
+                    " (scheduled_message_id, channel, post_at, mentions, title, body, text, created_at, kind,"
+                    " team_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [
+                        (i, channel, post_at, fields["mentions"], fields["title"], fields["body"], text, now,
+                         fields["kind"], team_id or "")
+                        for i, post_at, text, fields in messages.rows(unknown)
+                    ],
+                )
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO channels (channel, reconciled_at, team_id) VALUES (?, ?, ?)",
+                    (channel, now, team_id or "")
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return len(stale), len(unknown)
+
+    def purge_delivered(self, now=None):
+        """
+        配信時刻を過ぎた行を削除する
+        ローカル配信の予約は配信時に scheduler_engine が削除するため対象外（停止中の取りこぼしを残す）
+        """
+        now = int(time.time()) if now is None else now
+        with self._lock:
+            cur = self._conn.execute("DELETE FROM reminders WHERE post_at < ? AND backend = 'slack'", (now,))
+        return cur.rowcount
+
+
+def fetch_scheduled_messages(client, channel):
+    """
+    chat.scheduledMessages.list をカーソルで最後まで取得し、ScheduledMessageColumns で返す
+    """
+    messages = ScheduledMessageColumns()
+    cursor = None
+    while True:
+        result = client.chat_scheduledMessages_list(channel=channel, cursor=cursor, limit=100)
+        messages.extend(result.get("scheduled_messages", []))
+        cursor = (result.get("response_metadata") or {}).get("next_cursor")
+        if not cursor:
+            return messages
+
+
+async def fetch_scheduled_messages_async(client, channel):
+    """
+    fetch_scheduled_messages の AsyncWebClient 版
+    """
+    messages = ScheduledMessageColumns()
+    cursor = None
+    while True:
+        result = await client.chat_scheduledMessages_list(channel=channel, cursor=cursor, limit=100)
+        messages.extend(result.get("scheduled_messages", []))
+        cursor = (result.get("response_metadata") or {}).get("next_cursor")
+        if not cursor:
+            return messages
+
+
+def apply_scheduled_messages(channel, messages, fetched_at, store=None, team_id=""):
+    """
+    取得した Slack 側の予約一覧（ScheduledMessageColumns）をストアに反映し、(削除した件数, 取り込んだ件数) を返す
+    """
+    store = store or reminder_store
+    removed, adopted = store.replace_channel(channel, messages, fetched_at, team_id)
+    if removed or adopted:
+        listing_cache.invalidate(channel)
+        logger.info(f"{channel}: 削除 {removed} 件 / 取り込み {adopted} 件")
+    return removed, adopted
+
+
+def reconcile_channel(client, channel, store=None):
+    """
+    Slack 側の予約一覧とストアを突き合わせる
+    """
+    fetched_at = int(time.time())
+    messages = fetch_scheduled_messages(client, channel)
+    return apply_scheduled_messages(channel, messages, fetched_at, store, workspace_of(client))
+
+
+async def reconcile_channel_async(client, channel, store=None):
+    """
+    reconcile_channel の AsyncWebClient 版
+    """
+    fetched_at = int(time.time())
+    messages = await fetch_scheduled_messages_async(client, channel)
+    return apply_scheduled_messages(channel, messages, fetched_at, store, workspace_of(client))
+
+
+def reconcile_channels(client, channels, store=None, concurrency=RECONCILE_FANOUT_CONCURRENCY):
+    """
+    複数のチャンネルを同時に concurrency 件まで突き合わせ、内容が変わったチャンネルの数を返す
+    失敗したチャンネル（ボットが参加していないなど）はログに残して、保存済みの内容のまま扱う
+    """
+    def reconcile(channel):
+        try:
+            return any(reconcile_channel(client, channel, store))
+        except SlackApiError as e:
+            logger.warning(f"予約メッセージの突き合わせに失敗しました ({channel}): {e.response['error']}")
+            return False
+        except Exception as e:
+            logger.warning(f"予約メッセージの突き合わせに失敗しました ({channel}): {e}")
+            return False
+
+    if not channels:
+        return 0
+    with ThreadPoolExecutor(max_workers=min(concurrency, len(channels)), thread_name_prefix="reconcile") as executor:
+        return sum(executor.map(reconcile, channels))
+
+
+async def reconcile_channels_async(client, channels, store=None, concurrency=RECONCILE_FANOUT_CONCURRENCY):
+    """
+    reconcile_channels の AsyncWebClient 版
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def reconcile(channel):
+        async with semaphore:
+            try:
+                return any(await reconcile_channel_async(client, channel, store))
+            except SlackApiError as e:
+                logger.warning(f"予約メッセージの突き合わせに失敗しました ({channel}): {e.response['error']}")
+                return False
+            except Exception as e:
+                logger.warning(f"予約メッセージの突き合わせに失敗しました ({channel}): {e}")
+                return False
+
+    return sum(await asyncio.gather(*(reconcile(channel) for channel in channels)))
+
+
+class ReconcileJob(threading.Thread):
+    """
+    一定間隔で全チャンネルを Slack 側と突き合わせるバックグラウンドジョブ
+    clients はワークスペースごとの WebClient を返す WorkspaceClients
+    """
+
+    def __init__(self, clients, store=None, interval=RECONCILE_INTERVAL):
+        super().__init__(name="reminder-reconcile", daemon=True)
+        self.clients = clients
+        self.store = store or reminder_store
+        self.interval = interval
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            # 1 回の失敗（DB のエラーなど）でスレッドを終わらせず、次の間隔で再試行する
+            try:
+                self.run_once()
+            except Exception:
+                logger.exception("予約メッセージの突き合わせに失敗しました")
+
+    def run_once(self):
+        self.store.purge_delivered()
+        for channel, team_id in self.store.tracked_channels():
+            client = self.clients.get(team_id)
+            if client is None:
+                # アンインストールされたワークスペースのチャンネル
+                continue
+            try:
+                reconcile_channel(client, channel, self.store)
+            except SlackApiError as e:
+                logger.error(f"予約メッセージの突き合わせに失敗しました ({channel}): {e.response['error']}")
+            except Exception:
+                # 通信エラーなどはこのチャンネルだけを飛ばし、残りのチャンネルは続ける
+                logger.exception(f"予約メッセージの突き合わせに失敗しました ({channel})")
+
+    def stop(self):
+        self._stopped.set()
+
+
+# 全コマンドモジュールで共有するストア
+reminder_store = ReminderStore()
@@ -0,0 +1,71 @@
+import re
+
+
+# リマインド時のヘッダー
+REMIND_HEADER = "【 🔔 リマインド 】"
+# /set-schedule の詳細の見出し
+DETAIL_HEADER = "【詳細】"
+
+# 予約の種類（reminder_store の kind 列）
+KIND_REMINDER = "reminder"
+KIND_SCHEDULE = "schedule"
+
+# 予約メッセージに付ける Slack のメッセージメタデータの event_type
+METADATA_EVENT_TYPE = "gui_reminder"
+
+# /set-schedule の 3 行目「YYYY-MM-DD HH:MM から タイトル」
+_SCHEDULE_LINE = re.compile(r"\d{4}-\d{2}-\d{2} \d{2}:\d{2} から (.*)")
+
+
+def format_reminder_text(mentions, message):
+    """
+    /set-reminder の予約メッセージ本文
+    """
+    return f"{mentions}\n{REMIND_HEADER}\n{message}"
+
+
+def format_schedule_text(combined_dt_str, title, message):
+    """
+    /set-schedule の予約メッセージ本文
+    """
+    disp_message = f"{DETAIL_HEADER}\n{message}" if message else ""
+    return f"\n{REMIND_HEADER}\n{combined_dt_str} から {title}\n{disp_message}"
+
+
+def build_metadata(kind="", setter="", mentions="", title="", body="", series_id=""):
+    """
+    chat.scheduleMessage / chat.postMessage に付けるメッセージメタデータ
+    配信後のメッセージからも本文を解析せずに予約の内容を取り出せるようにする
+    """
+    return {
+        "event_type": METADATA_EVENT_TYPE,
+        "event_payload": {
+            "kind": kind,
+            "setter": setter,
+            "mentions": mentions,
+            "title": title,
+            "body": body,
+            "series_id": series_id,
+        },
+    }
+
+
+def parse_scheduled_text(text):
+    """
+    ストアに無い予約（ストア導入前・ボット以外で予約されたもの）の本文から、
+    各コマンドが書き込む形式に合わせて種類・メンション・タイトル・内容を取り出す
+    """
+    lines = text.split("\n")
+    if len(lines) >= 3 and lines[0] == "" and lines[1] == REMIND_HEADER:
+        match = _SCHEDULE_LINE.fullmatch(lines[2])
+        if match:
+            # /set-schedule: 空行・ヘッダー・「日時 から タイトル」・【詳細】・詳細
+            details = lines[3:]
+            if details and details[0] == DETAIL_HEADER:
+                details = details[1:]
+            return {"kind": KIND_SCHEDULE, "mentions": "", "title": match.group(1), "body": "\n".join(details)}
+    if len(lines) >= 2 and lines[1] == REMIND_HEADER:
+        # /set-reminder: メンション・ヘッダー・内容
+        return {"kind": KIND_REMINDER, "mentions": lines[0], "title": "", "body": "\n".join(lines[2:])}
+    # それ以外は本文をそのまま内容とする
+    return {"kind": "", "mentions": "", "title": "", "body": text}
@@ -0,0 +1,217 @@
+import time
+import heapq
+import uuid
+import logging
+import itertools
+import threading
+from slack_sdk.errors import SlackApiError
+
+from handlers.config import config
+from handlers.list_cache import listing_cache
+from handlers.reminder_store import reminder_store
+from handlers.reminder_text import build_metadata
+from handlers.worker_pool import worker_pool
+
+# 停止中に配信時刻を過ぎた予約を、起動後に配信する上限（秒）。これより古いものは配信せず破棄する
+SCHEDULER_CATCHUP_LIMIT = config.scheduler_catchup_limit
+# 1 回の待機の上限（秒）。システム時刻の変更に追従するため、これごとに現在時刻を取り直す
+SCHEDULER_MAX_SLEEP = config.scheduler_max_sleep
+# 他のワーカープロセスがストアに追加した予約を取り込む間隔（秒）
+SCHEDULER_SYNC_INTERVAL = config.scheduler_sync_interval
+# 配信に失敗したときの再試行回数と間隔（秒）
+SCHEDULER_MAX_RETRIES = 3
+SCHEDULER_RETRY_DELAY = 60
+
+# ローカル配信の予約IDの接頭辞（chat.scheduleMessage の ID と区別する）
+LOCAL_ID_PREFIX = "L"
+
+logger = logging.getLogger(__name__)
+
+
+def is_local_id(scheduled_message_id):
+    return scheduled_message_id.startswith(LOCAL_ID_PREFIX)
+
+
+class SchedulerEngine:
+    """
+    chat.scheduleMessage を使わずにプロセス内で予約投稿するエンジン
+
+    予約は reminder_store（backend='local'）に保存し、メモリ上では (post_at, seq, id) の
+    ヒープで管理する。追加は O(log n)、取り消しは印を付けるだけの O(1) で、
+    取り消し済みの要素が半分を超えたらヒープを作り直す。
+    """
+
+    def __init__(self, store=None):
+        self.store = store or reminder_store
+        self._heap = []
+        self._cancelled = set()
+        # ヒープから取り出して配信中の予約（sync で取り込み直さないため）
+        self._inflight = set()
+        self._attempts = {}
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._clients = None
+        self._thread = None
+        self._stopped = False
+
+    def start(self, clients):
+        """
+        保存済みの予約を復元して配信スレッドを開始する
+        clients はワークスペースごとの WebClient を返す WorkspaceClients
+        """
+        self._clients = clients
+        self.restore()
+        self._thread = threading.Thread(target=self._run, name="reminder-scheduler", daemon=True)
+        self._thread.start()
+
+    def restore(self):
+        """
+        起動時にストアから未配信の予約を読み込む（ヒープは heapify で O(n) で構築）
+        """
+        pending = self.store.list_pending("local")
+        with self._cond:
+            self._heap = [(post_at, next(self._seq), sid) for sid, post_at in pending]
+            heapq.heapify(self._heap)
+            self._cancelled.clear()
+            self._cond.notify()
+        overdue = sum(1 for _, post_at in pending if post_at <= time.time())
+        logger.info(f"ローカル予約を {len(pending)} 件復元しました（配信時刻を過ぎたもの {overdue} 件）")
+
+    def sync(self):
+        """
+        ストアにあってヒープに無い予約を取り込む
+        複数のワーカープロセスで動かす場合、配信スレッドを持たないプロセスはストアに書き込むだけなので、
+        配信するプロセスがこれで定期的に拾う
+        """
+        pending = self.store.list_pending("local")
+        with self._cond:
+            known = {entry[2] for entry in self._heap} | self._inflight
+            added = [
+                (post_at, next(self._seq), sid) for sid, post_at in pending
+                if sid not in known and sid not in self._cancelled
+            ]
+            for entry in added:
+                heapq.heappush(self._heap, entry)
+            if added:
+                self._cond.notify()
+        return len(added)
+
+    def schedule(self, channel, post_at, text, **fields):
+        """
+        予約を追加して ID を返す
+        """
+        scheduled_message_id = f"{LOCAL_ID_PREFIX}{uuid.uuid4().hex}"
+        self.store.add(scheduled_message_id, channel, post_at, text=text, backend="local", **fields)
+        # 配信スレッドが無いプロセスではストアへの保存だけを行う（配信するプロセスが sync で拾う）
+        if self._thread is not None:
+            self._push(post_at, scheduled_message_id)
+        return scheduled_message_id
+
+    def cancel(self, scheduled_message_id):
+        """
+        予約を取り消す（ヒープからは配信時または作り直し時に取り除かれる）
+        """
+        self.store.delete(scheduled_message_id)
+        with self._cond:
+            self._cancelled.add(scheduled_message_id)
+            if len(self._cancelled) > len(self._heap) // 2:
+                self._compact()
+
+    def pending_count(self):
+        with self._cond:
+            return len(self._heap) - len(self._cancelled)
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+
+    def _push(self, post_at, scheduled_message_id):
+        with self._cond:
+            heapq.heappush(self._heap, (post_at, next(self._seq), scheduled_message_id))
+            # 先頭が変わった場合に待機時間を計算し直させる
+            if self._heap[0][2] == scheduled_message_id:
+                self._cond.notify()
+
+    def _compact(self):
+        self._heap = [entry for entry in self._heap if entry[2] not in self._cancelled]
+        heapq.heapify(self._heap)
+        self._cancelled.clear()
+
+    def _run(self):
+        next_sync = time.monotonic() + SCHEDULER_SYNC_INTERVAL
+        while True:
+            if SCHEDULER_SYNC_INTERVAL > 0 and time.monotonic() >= next_sync:
+                self.sync()
+                next_sync = time.monotonic() + SCHEDULER_SYNC_INTERVAL
+            with self._cond:
+                if self._stopped:
+                    return
+                if not self._heap:
+                    self._cond.wait(SCHEDULER_MAX_SLEEP)
+                    continue
+                post_at, _, scheduled_message_id = self._heap[0]
+                # time.time() はシステム時刻の変更で前後するため、待機は SCHEDULER_MAX_SLEEP ごとに区切る
+                delay = post_at - time.time()
+                if delay > 0:
+                    self._cond.wait(min(delay, SCHEDULER_MAX_SLEEP))
+                    continue
+                heapq.heappop(self._heap)
+                if scheduled_message_id in self._cancelled:
+                    self._cancelled.discard(scheduled_message_id)
+                    continue
+                self._inflight.add(scheduled_message_id)
+            worker_pool.submit(self._deliver, scheduled_message_id, post_at)
+
+    def _deliver(self, scheduled_message_id, post_at):
+        try:
+            self._deliver_once(scheduled_message_id, post_at)
+        finally:
+            with self._cond:
+                self._inflight.discard(scheduled_message_id)
+
+    def _deliver_once(self, scheduled_message_id, post_at):
+        reminder = self.store.get(scheduled_message_id)
+        if reminder is None:
+            # 配信待ちの間に取り消された
+            return
+        lateness = time.time() - post_at
+        if lateness > SCHEDULER_CATCHUP_LIMIT:
+            logger.warning(f"配信時刻を {int(lateness)} 秒過ぎた予約 {scheduled_message_id} を破棄しました")
+            self._remove(scheduled_message_id, reminder["channel"])
+            return
+        client = self._clients.get(reminder["team_id"])
+        if client is None:
+            logger.warning(f"ワークスペース {reminder['team_id']} のトークンが無いため予約 {scheduled_message_id} を破棄しました")
+            self._remove(scheduled_message_id, reminder["channel"])
+            return
+        try:
+            client.chat_postMessage(
+                channel=reminder["channel"],
+                text=reminder["text"],
+                metadata=build_metadata(
+                    reminder["kind"], reminder["setter"], reminder["mentions"], reminder["title"], reminder["body"],
+                    reminder["series_id"],
+                ),
+            )
+        except Exception as e:
+            # 通信エラーも Slack API のエラーと同じく回数を数えて再試行し、上限に達したら破棄する
+            attempts = self._attempts.get(scheduled_message_id, 0) + 1
+            detail = e.response["error"] if isinstance(e, SlackApiError) else e
+            logger.error(f"ローカル予約 {scheduled_message_id} の配信に失敗しました ({attempts} 回目): {detail}")
+            if attempts < SCHEDULER_MAX_RETRIES:
+                self._attempts[scheduled_message_id] = attempts
+                self._push(time.time() + SCHEDULER_RETRY_DELAY, scheduled_message_id)
+                return
+            logger.error(f"ローカル予約 {scheduled_message_id} は {attempts} 回失敗したため破棄しました")
+        self._attempts.pop(scheduled_message_id, None)
+        self._remove(scheduled_message_id, reminder["channel"])
+
+    def _remove(self, scheduled_message_id, channel):
+        # 配信・破棄した予約を /show-reminder-list のキャッシュ（このプロセスの分）からも消す
+        self.store.delete(scheduled_message_id)
+        listing_cache.invalidate(channel)
+
+
+# 全コマンドモジュールで共有するエンジン（app.py の起動処理で start する）
+scheduler_engine = SchedulerEngine()
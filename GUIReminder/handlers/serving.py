@@ -0,0 +1,229 @@
+import os
+import time
+import asyncio
+import logging
+import tempfile
+import threading
+
+from handlers.config import config
+from handlers.ics_feed import FEED_PATH, feed_response
+from handlers.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, registry as metrics_registry
+from handlers.reminder_store import REMINDER_DB_PATH
+
+try:
+    import fcntl
+except ImportError:  # Windows ではファイルロックによる選出を行わない
+    fcntl = None
+
+# HTTP モードの待ち受けポート
+PORT = config.port
+# ワーカープロセス数と、同期モードの 1 プロセスあたりのスレッド数
+WEB_CONCURRENCY = config.web_concurrency
+WEB_THREADS = config.web_threads
+# Slack からの HTTP 接続を keep-alive で待つ秒数
+KEEPALIVE = config.keepalive
+# 停止時に処理中のリクエスト・ワーカーの処理の完了を待つ秒数
+GRACEFUL_TIMEOUT = config.graceful_timeout
+# バックグラウンドジョブを動かすワーカーを選ぶためのロックファイル
+JOBS_LOCK_PATH = config.jobs_lock_path or (
+    os.path.join(tempfile.gettempdir(), "gui-reminder-jobs.lock") if REMINDER_DB_PATH == ":memory:"
+    else f"{REMINDER_DB_PATH}.jobs.lock"
+)
+# ロックを取れなかったワーカーが取り直す間隔（秒）。担当のワーカーが止まったら別のワーカーが引き継ぐ
+JOBS_LOCK_RETRY = config.jobs_lock_retry
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundJobLeader:
+    """
+    複数のワーカープロセスのうち 1 つだけでバックグラウンドジョブ（突き合わせ・ローカル配信・繰り返しの補充）を動かす
+    ファイルロックを取れたプロセスが start_jobs() を呼び、ロックはプロセスの終了時に OS が解放する
+    """
+
+    def __init__(self, start_jobs, lock_path=JOBS_LOCK_PATH, retry_interval=JOBS_LOCK_RETRY):
+        self.start_jobs = start_jobs
+        self.lock_path = lock_path
+        self.retry_interval = retry_interval
+        self.jobs = []
+        self._lock_file = None
+        self._stopped = threading.Event()
+
+    def start(self):
+        if fcntl is None:
+            self.jobs = self.start_jobs()
+            return
+        threading.Thread(target=self._run, name="jobs-leader", daemon=True).start()
+
+    def _try_lock(self):
+        lock_file = open(self.lock_path, "a")
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file
+        return True
+
+    def _run(self):
+        while not self._stopped.is_set():
+            if self._try_lock():
+                logger.info(f"プロセス {os.getpid()} でバックグラウンドジョブを開始します")
+                self.jobs = self.start_jobs()
+                return
+            self._stopped.wait(self.retry_interval)
+
+    def stop(self):
+        self._stopped.set()
+        for job in self.jobs:
+            job.stop()
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+
+def run_gunicorn(wsgi_app, on_worker_start, on_worker_exit):
+    """
+    gunicorn（gthread ワーカー）で WSGI アプリを WEB_CONCURRENCY プロセス × WEB_THREADS スレッドで起動する
+    SIGTERM を受けると新しい接続の受け付けをやめ、GRACEFUL_TIMEOUT 秒まで処理中のものを待ってから終了する
+    """
+    from gunicorn.app.base import BaseApplication
+
+    options = {
+        "bind": f"0.0.0.0:{PORT}",
+        "workers": WEB_CONCURRENCY,
+        "worker_class": "gthread",
+        "threads": WEB_THREADS,
+        "keepalive": KEEPALIVE,
+        "graceful_timeout": GRACEFUL_TIMEOUT,
+        "post_fork": lambda server, worker: on_worker_start(),
+        "worker_exit": lambda server, worker: on_worker_exit(),
+    }
+
+    class Application(BaseApplication):
+
+        def load_config(self):
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return wsgi_app
+
+    Application().run()
+
+
+def run_uvicorn(app_import_string, app_dir):
+    """
+    uvicorn で ASGI アプリを WEB_CONCURRENCY プロセスで起動する
+    複数プロセスの場合 uvicorn はモジュールを import し直すため、アプリは "app:asgi_app" の形で渡す
+    """
+    import uvicorn
+
+    uvicorn.run(
+        app_import_string,
+        app_dir=app_dir,
+        host="0.0.0.0",
+        port=PORT,
+        workers=WEB_CONCURRENCY,
+        timeout_keep_alive=KEEPALIVE,
+        timeout_graceful_shutdown=GRACEFUL_TIMEOUT,
+    )
+
+
+HTTP_STATUS = {200: "200 OK", 304: "304 Not Modified", 404: "404 Not Found"}
+
+
+class ServingWsgiApp:
+    """
+    Bolt の WSGI ハンドラーに /metrics と予約の iCalendar フィード（/calendar/...）を加える
+    （Flask などのフレームワークを読み込まずに済ませる）
+    """
+
+    def __init__(self, handler, metrics_path="/metrics"):
+        self.handler = handler
+        self.metrics_path = metrics_path
+
+    def __call__(self, environ, start_response):
+        if environ.get("PATH_INFO") == self.metrics_path and environ.get("REQUEST_METHOD") == "GET":
+            payload = metrics_registry.render().encode("utf-8")
+            start_response("200 OK", [
+                ("Content-Type", METRICS_CONTENT_TYPE),
+                ("Content-Length", str(len(payload))),
+            ])
+            return [payload]
+        if environ.get("PATH_INFO", "").startswith(FEED_PATH) and environ.get("REQUEST_METHOD") == "GET":
+            status, headers, body = feed_response(
+                environ["PATH_INFO"], environ.get("QUERY_STRING"), environ.get("HTTP_IF_NONE_MATCH")
+            )
+            start_response(HTTP_STATUS[status], headers)
+            # 生成中のフィードはチャンクごとに送る（gunicorn が chunked で返す）
+            return body
+        return self.handler(environ, start_response)
+
+
+class ServingAsgiApp:
+    """
+    Bolt の ASGI ハンドラーに /metrics・予約の iCalendar フィードと lifespan（起動・停止時の処理）を加える
+    """
+
+    def __init__(self, handler, on_startup, on_shutdown, metrics_path="/metrics"):
+        self.handler = handler
+        self.on_startup = on_startup
+        self.on_shutdown = on_shutdown
+        self.metrics_path = metrics_path
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] == "http" and scope["path"] == self.metrics_path and scope["method"] == "GET":
+            payload = metrics_registry.render().encode("utf-8")
+            await send({
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [
+                    (b"content-type", METRICS_CONTENT_TYPE.encode("ascii")),
+                    (b"content-length", str(len(payload)).encode("ascii")),
+                ],
+            })
+            await send({"type": "http.response.body", "body": payload})
+            return
+        if scope["type"] == "http" and scope["path"].startswith(FEED_PATH) and scope["method"] == "GET":
+            await self._feed(scope, send)
+            return
+        await self.handler(scope, receive, send)
+
+    async def _feed(self, scope, send):
+        """
+        フィードを返す。SQLite の読み込みと生成はイベントループを止めないようにスレッドで行い、チャンクごとに送る
+        """
+        request_headers = dict(scope["headers"])
+        if_none_match = request_headers.get(b"if-none-match", b"").decode("latin-1") or None
+        status, headers, body = await asyncio.to_thread(
+            feed_response, scope["path"], scope["query_string"].decode("latin-1"), if_none_match
+        )
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers],
+        })
+        chunks = iter(body)
+        while True:
+            chunk = await asyncio.to_thread(next, chunks, None)
+            if chunk is None:
+                break
+            await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await self.on_startup()
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                started_at = time.monotonic()
+                await self.on_shutdown()
+                logger.info(f"停止処理が完了しました（{time.monotonic() - started_at:.1f} 秒）")
+                await send({"type": "lifespan.shutdown.complete"})
+                return
@@ -0,0 +1,120 @@
+# RateLimitedWebClient の非同期版。aiohttp を読み込むため、非同期モードのときだけ import する
+import asyncio
+import logging
+import weakref
+import aiohttp
+from slack_sdk.errors import SlackApiError
+from slack_sdk.web.async_client import AsyncWebClient
+
+from handlers.metrics import SLACK_API_SECONDS, TEAM_SLACK_API_CALLS
+from handlers.slack_client import (
+    NON_IDEMPOTENT_METHODS,
+    RETRYABLE_EXCEPTIONS,
+    SLACK_API_MAX_RETRIES,
+    RateLimiter,
+    _record_api_error,
+    _request_channel,
+    _retry_delay,
+    context_workspace,
+    rate_limiter
+)
+
+logger = logging.getLogger(__name__)
+
+# aiohttp の接続エラーは組み込みの ConnectionError を継承しないため加える
+ASYNC_RETRYABLE_EXCEPTIONS = (*RETRYABLE_EXCEPTIONS, aiohttp.ClientConnectorError)
+
+# イベントループごとの aiohttp のセッション（接続プール）
+_async_sessions = weakref.WeakKeyDictionary()
+
+
+def shared_async_session():
+    """
+    実行中のイベントループで共有する aiohttp.ClientSession（keep-alive の接続を使い回す）
+    """
+    loop = asyncio.get_running_loop()
+    session = _async_sessions.get(loop)
+    if session is None or session.closed:
+        session = _async_sessions[loop] = aiohttp.ClientSession()
+    return session
+
+
+async def close_async_session():
+    """
+    シャットダウン時に実行中のイベントループのセッションを閉じる
+    """
+    session = _async_sessions.pop(asyncio.get_running_loop(), None)
+    if session is not None and not session.closed:
+        await session.close()
+
+
+class RateLimitedAsyncWebClient(AsyncWebClient):
+    """
+    RateLimitedWebClient の AsyncWebClient 版
+    max_retries は再試行の回数（失敗しても再送しない呼び出しでは 0 にする）
+    """
+
+    def __init__(self, *args, workspace_id="", max_retries=SLACK_API_MAX_RETRIES, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.workspace_id = workspace_id or ""
+        self.max_retries = max_retries
+
+    @classmethod
+    def wrap(cls, client, workspace_id=""):
+        return cls(
+            token=client.token,
+            base_url=client.base_url,
+            timeout=client.timeout,
+            ssl=client.ssl,
+            proxy=client.proxy,
+            session=client.session or shared_async_session(),
+            trust_env_in_session=client.trust_env_in_session,
+            headers=client.headers,
+            team_id=client.default_params.get("team_id"),
+            logger=client.logger,
+            retry_handlers=[],
+            workspace_id=workspace_id,
+        )
+
+    async def api_call(self, api_method, **kwargs):
+        TEAM_SLACK_API_CALLS.inc(self.workspace_id)
+        with SLACK_API_SECONDS.time(api_method):
+            try:
+                return await self._api_call_with_retry(api_method, **kwargs)
+            except Exception as e:
+                _record_api_error(api_method, e)
+                raise
+
+    async def _api_call_with_retry(self, api_method, **kwargs):
+        team_id = self.workspace_id or self.default_params.get("team_id")
+        key = RateLimiter.key(team_id, api_method, _request_channel(kwargs))
+        idempotent = api_method not in NON_IDEMPOTENT_METHODS
+        attempt = 0
+        while True:
+            wait = rate_limiter.reserve(key)
+            if wait > 0:
+                await asyncio.sleep(wait)
+            try:
+                return await super().api_call(api_method, **kwargs)
+            except ASYNC_RETRYABLE_EXCEPTIONS as e:
+                delay = _retry_delay(e, attempt, self.max_retries, idempotent)
+                if delay is None:
+                    raise
+                if isinstance(e, SlackApiError) and e.response.status_code == 429:
+                    rate_limiter.penalize(key, delay)
+                else:
+                    await asyncio.sleep(delay)
+                rate_limiter.retries += 1
+                attempt += 1
+                logger.warning(f"{api_method} を再試行します（{attempt} 回目）: {e}")
+
+
+def use_rate_limited_client_async(app):
+    """
+    use_rate_limited_client の AsyncApp 版
+    """
+
+    @app.middleware
+    async def rate_limited_client(context, next):
+        context["client"] = RateLimitedAsyncWebClient.wrap(context.client, context_workspace(context))
+        await next()
@@ -0,0 +1,415 @@
+import os
+import ssl
+import time
+import random
+import socket
+import asyncio
+import logging
+import threading
+import http.client
+from urllib.error import URLError
+from urllib.parse import urlsplit
+from slack_sdk import WebClient
+from slack_sdk.errors import SlackApiError
+
+from handlers.config import config
+from handlers.metrics import SLACK_API_ERRORS, SLACK_API_SECONDS, TEAM_SLACK_API_CALLS
+
+# 429 やサーバーエラー・通信エラー時の再試行回数
+SLACK_API_MAX_RETRIES = config.slack_api_max_retries
+# 再試行の待機時間の基準（秒）。指数バックオフ + ジッターで待つ
+SLACK_API_RETRY_BASE = config.slack_api_retry_base
+# メソッドごとの上限に掛ける倍率（ベンチマークでスタブに向ける場合などに緩める。通常は 1）
+SLACK_RATE_LIMIT_SCALE = config.slack_rate_limit_scale
+
+logger = logging.getLogger(__name__)
+
+# Slack Web API のレート制限（1分あたりの呼び出し回数）
+# https://api.slack.com/apis/rate-limits
+TIER_1 = 1
+TIER_2 = 20
+TIER_3 = 50
+TIER_4 = 100
+METHOD_LIMITS = {
+    "auth.test": TIER_4,
+    "chat.deleteScheduledMessage": TIER_3,
+    "chat.postEphemeral": TIER_4,
+    # chat.postMessage はチャンネルごとに 1 秒 1 件程度
+    "chat.postMessage": 60,
+    "chat.scheduleMessage": TIER_3,
+    "chat.scheduledMessages.list": TIER_3,
+    "chat.update": TIER_3,
+    "conversations.list": TIER_2,
+    "files.info": TIER_4,
+    "users.conversations": TIER_3,
+    "users.info": TIER_4,
+    "users.list": TIER_2,
+    "views.open": TIER_4,
+    "views.push": TIER_4,
+    "views.update": TIER_4,
+}
+DEFAULT_LIMIT = TIER_3
+# チャンネル単位で制限されるメソッド
+PER_CHANNEL_METHODS = {"chat.postMessage"}
+# 再試行してよい Slack API のエラーコード
+TRANSIENT_ERRORS = {"internal_error", "fatal_error", "service_unavailable", "request_timeout"}
+# 送り直すとメッセージが重複するメソッド。Slack が受け付けた後に応答だけ失われた可能性がある失敗（タイムアウト・5xx）では
+# 再試行せず、429 と送信前の失敗（接続拒否・名前解決の失敗）だけを再試行する
+NON_IDEMPOTENT_METHODS = {"chat.postMessage", "chat.postEphemeral", "chat.scheduleMessage", "chat.update"}
+# 送信前に失敗したことが確実な（リクエストが Slack に届いていない）通信エラー
+NOT_SENT_ERRORS = (ConnectionRefusedError, socket.gaierror)
+
+
+class TokenBucket:
+    """
+    1分あたり per_minute 回のトークンバケット
+    トークンが足りない場合も前借りして「いつ送ってよいか」を返すため、待つ側は順番に送られる
+    """
+
+    def __init__(self, per_minute):
+        self.rate = per_minute / 60.0
+        # 短時間のまとまった呼び出しはおよそ 6 秒分まで許す
+        self.capacity = max(1.0, per_minute / 10.0)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        # Retry-After で指定された再開時刻
+        self.blocked_until = 0.0
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def reserve(self, now):
+        """
+        トークンを 1 つ確保し、送信まで待つべき秒数を返す
+        """
+        self._refill(now)
+        self.tokens -= 1
+        wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        return max(wait, self.blocked_until - now)
+
+    def peek(self, now):
+        """
+        トークンを確保せずに、今送ったら待つことになる秒数を返す
+        """
+        self._refill(now)
+        wait = (1 - self.tokens) / self.rate if self.tokens < 1 else 0.0
+        return max(wait, self.blocked_until - now)
+
+
+class RateLimiter:
+    """
+    (チーム, メソッド[, チャンネル]) ごとのトークンバケット。全ハンドラーで共有する
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets = {}
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self.rate_limited = 0
+        self.retries = 0
+
+    @staticmethod
+    def key(team_id, api_method, channel=None):
+        if api_method in PER_CHANNEL_METHODS and channel:
+            return (team_id, api_method, channel)
+        return (team_id, api_method)
+
+    def _bucket(self, key):
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(
+                METHOD_LIMITS.get(key[1], DEFAULT_LIMIT) * SLACK_RATE_LIMIT_SCALE
+            )
+        return bucket
+
+    def reserve(self, key):
+        with self._lock:
+            wait = self._bucket(key).reserve(time.monotonic())
+            if wait > 0:
+                self.waits += 1
+                self.wait_seconds += wait
+        return wait
+
+    def would_throttle(self, key):
+        with self._lock:
+            return self._bucket(key).peek(time.monotonic()) > 0
+
+    def penalize(self, key, retry_after):
+        """
+        429 の Retry-After の間、このバケットからの送信を止める
+        """
+        with self._lock:
+            bucket = self._bucket(key)
+            bucket.blocked_until = max(bucket.blocked_until, time.monotonic() + retry_after)
+            # 止めている間に前借りした分は使い切ったものとする
+            bucket.tokens = min(bucket.tokens, 0.0)
+            self.rate_limited += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "buckets": len(self._buckets),
+                "waits": self.waits,
+                "wait_seconds": self.wait_seconds,
+                "rate_limited": self.rate_limited,
+                "retries": self.retries,
+            }
+
+
+# 全ハンドラーで共有するレート制限
+rate_limiter = RateLimiter()
+
+
+def would_throttle(api_method, channel=None, team_id=None):
+    """
+    今呼び出すとレート制限で待たされるかどうか
+    """
+    return rate_limiter.would_throttle(RateLimiter.key(team_id, api_method, channel))
+
+
+def _request_channel(kwargs):
+    for name in ("json", "params", "data"):
+        args = kwargs.get(name)
+        if args and "channel" in args:
+            return args["channel"]
+    return None
+
+
+def _retry_after(response):
+    for name, value in (response.headers or {}).items():
+        if name.lower() == "retry-after":
+            return int(value[0] if isinstance(value, list) else value)
+    return 1
+
+
+def _request_not_sent(error):
+    """
+    リクエストを送る前の失敗かどうか（urllib の URLError・aiohttp の接続エラーは元の例外を見る）
+    """
+    cause = getattr(error, "reason", None) or getattr(error, "os_error", None) or error
+    return isinstance(cause, NOT_SENT_ERRORS)
+
+
+def _retry_delay(error, attempt, max_retries=SLACK_API_MAX_RETRIES, idempotent=True):
+    """
+    再試行する場合は待機秒数、しない場合は None を返す
+    idempotent が False（NON_IDEMPOTENT_METHODS）の場合は 429 と送信前の失敗だけを再試行する
+    """
+    if attempt >= max_retries:
+        return None
+    if isinstance(error, SlackApiError):
+        if error.response.status_code == 429:
+            # Retry-After の後、同時に再開しないようジッターを加える
+            return _retry_after(error.response) + random.uniform(0, 1)
+        if not idempotent:
+            return None
+        if error.response.status_code < 500 and error.response.get("error") not in TRANSIENT_ERRORS:
+            return None
+    elif not idempotent and not _request_not_sent(error):
+        return None
+    # サーバーエラー・通信エラーは指数バックオフ（Full Jitter）
+    return random.uniform(0, SLACK_API_RETRY_BASE * (2 ** attempt))
+
+
+RETRYABLE_EXCEPTIONS = (SlackApiError, URLError, ConnectionError, TimeoutError, asyncio.TimeoutError, socket.gaierror)
+
+
+def _record_api_error(api_method, error):
+    """
+    失敗した呼び出しをメソッドとエラーコード（通信エラーは例外名）ごとに数える
+    """
+    if isinstance(error, SlackApiError):
+        code = error.response.get("error") or str(error.response.status_code)
+    else:
+        code = type(error).__name__
+    SLACK_API_ERRORS.inc(api_method, code)
+
+
+class KeepAliveConnectionPool:
+    """
+    プロセス内で共有する Slack API への keep-alive 接続
+    http.client の接続はスレッドセーフではないため、スレッドごと・接続先ごとに 1 本持って使い回す
+    fork 後の子プロセスでは親の接続を使わずに張り直す
+    """
+
+    # 使い回した接続がサーバー側で閉じられていた場合の例外（この場合だけ新しい接続で 1 度送り直す）
+    STALE_CONNECTION_ERRORS = (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError)
+
+    def __init__(self):
+        self._pid = os.getpid()
+        self._local = threading.local()
+        self._default_ssl = None
+
+    def _connections(self):
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._local = threading.local()
+        connections = getattr(self._local, "connections", None)
+        if connections is None:
+            connections = self._local.connections = {}
+        return connections
+
+    def _ssl_context(self, context):
+        if context is not None:
+            return context
+        if self._default_ssl is None:
+            self._default_ssl = ssl.create_default_context()
+        return self._default_ssl
+
+    def request(self, url, data, headers, ssl_context=None, timeout=30):
+        """
+        POST して {"status", "headers", "body"}（slack_sdk の urllib の戻り値と同じ形）を返す
+        """
+        parts = urlsplit(url)
+        key = (parts.scheme, parts.netloc)
+        path = parts.path + (f"?{parts.query}" if parts.query else "")
+        connections = self._connections()
+        while True:
+            connection = connections.get(key)
+            reused = connection is not None
+            if connection is None:
+                if parts.scheme == "https":
+                    connection = http.client.HTTPSConnection(
+                        parts.netloc, timeout=timeout, context=self._ssl_context(ssl_context)
+                    )
+                else:
+                    connection = http.client.HTTPConnection(parts.netloc, timeout=timeout)
+                connections[key] = connection
+            elif connection.timeout != timeout:
+                # 使い回す接続にも呼び出しごとのタイムアウト（users.info の短いタイムアウトなど）を適用する
+                connection.timeout = timeout
+                if connection.sock is not None:
+                    connection.sock.settimeout(timeout)
+            try:
+                connection.request("POST", path, body=data, headers=headers)
+                response = connection.getresponse()
+                body = response.read()
+            except self.STALE_CONNECTION_ERRORS:
+                connection.close()
+                connections.pop(key, None)
+                if reused:
+                    continue
+                raise
+            except Exception:
+                connection.close()
+                connections.pop(key, None)
+                raise
+            if response.will_close:
+                connection.close()
+                connections.pop(key, None)
+            if response.headers.get_content_type() != "application/gzip":
+                body = body.decode(response.headers.get_content_charset() or "utf-8")
+            return {"status": response.status, "headers": response.headers, "body": body}
+
+
+# 全 RateLimitedWebClient で共有する接続プール（Bolt がリクエストごとに WebClient を作っても接続は使い回す）
+connection_pool = KeepAliveConnectionPool()
+
+
+def workspace_of(client):
+    """
+    クライアントのワークスペース ID（単一のワークスペースで動かしている場合は空文字）
+    """
+    return getattr(client, "workspace_id", "") or ""
+
+
+class RateLimitedWebClient(WebClient):
+    """
+    送信前にレート制限のトークンを確保し、429（Retry-After）や一時的なエラーを再試行する WebClient
+    workspace_id はこのクライアントのワークスペースで、レート制限の単位と、予約をストアに保存するときに使う
+    max_retries は再試行の回数（失敗しても再送しない呼び出しでは 0 にする）
+    HTTP の送信は slack_sdk の非公開メソッド _perform_urllib_http_request_internal を上書きして接続を使い回すため、
+    slack_sdk は requirements.txt で動作を確認したバージョンに固定している（上げる場合はこのメソッドの引数と戻り値を確認する）
+    """
+
+    def __init__(self, *args, workspace_id="", max_retries=SLACK_API_MAX_RETRIES, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.workspace_id = workspace_id or ""
+        self.max_retries = max_retries
+
+    @classmethod
+    def wrap(cls, client, workspace_id=""):
+        return cls(
+            token=client.token,
+            base_url=client.base_url,
+            timeout=client.timeout,
+            ssl=client.ssl,
+            proxy=client.proxy,
+            headers=client.headers,
+            team_id=client.default_params.get("team_id"),
+            logger=client.logger,
+            retry_handlers=[],
+            workspace_id=workspace_id,
+        )
+
+    def _perform_urllib_http_request_internal(self, url, req):
+        # プロキシを使う場合は slack_sdk の urllib の処理のまま
+        if self.proxy is not None or not url.lower().startswith("http"):
+            return super()._perform_urllib_http_request_internal(url, req)
+        return connection_pool.request(url, req.data, dict(req.header_items()), self.ssl, self.timeout)
+
+    def api_call(self, api_method, **kwargs):
+        # レート制限の待ち・再試行を含めた時間と、最終的に失敗した呼び出しを記録する
+        TEAM_SLACK_API_CALLS.inc(self.workspace_id)
+        with SLACK_API_SECONDS.time(api_method):
+            try:
+                return self._api_call_with_retry(api_method, **kwargs)
+            except Exception as e:
+                _record_api_error(api_method, e)
+                raise
+
+    def _api_call_with_retry(self, api_method, **kwargs):
+        team_id = self.workspace_id or self.default_params.get("team_id")
+        key = RateLimiter.key(team_id, api_method, _request_channel(kwargs))
+        idempotent = api_method not in NON_IDEMPOTENT_METHODS
+        attempt = 0
+        while True:
+            wait = rate_limiter.reserve(key)
+            if wait > 0:
+                time.sleep(wait)
+            try:
+                return super().api_call(api_method, **kwargs)
+            except RETRYABLE_EXCEPTIONS as e:
+                delay = _retry_delay(e, attempt, self.max_retries, idempotent)
+                if delay is None:
+                    raise
+                if isinstance(e, SlackApiError) and e.response.status_code == 429:
+                    rate_limiter.penalize(key, delay)
+                else:
+                    time.sleep(delay)
+                rate_limiter.retries += 1
+                attempt += 1
+                logger.warning(f"{api_method} を再試行します（{attempt} 回目）: {e}")
+
+
+def context_workspace(context):
+    """
+    リクエストのワークスペース ID
+    Enterprise Grid の場合は "<enterprise_id>:<team_id>"（組織全体へのインストールでは team_id を空にする）
+    """
+    enterprise_id = context.enterprise_id or ""
+    team_id = "" if context.is_enterprise_install else (context.team_id or "")
+    return f"{enterprise_id}:{team_id}" if enterprise_id else team_id
+
+
+def split_workspace(workspace_id):
+    """
+    context_workspace の値を InstallationStore.find_bot の引数（enterprise_id, team_id, is_enterprise_install）に戻す
+    """
+    if ":" not in workspace_id:
+        return {"enterprise_id": None, "team_id": workspace_id or None, "is_enterprise_install": False}
+    enterprise_id, team_id = workspace_id.split(":", 1)
+    return {"enterprise_id": enterprise_id, "team_id": team_id or None, "is_enterprise_install": not team_id}
+
+
+def use_rate_limited_client(app):
+    """
+    Bolt がリクエストごとに作る WebClient を RateLimitedWebClient に差し替えるミドルウェアを登録
+    """
+
+    @app.middleware
+    def rate_limited_client(context, next):
+        context["client"] = RateLimitedWebClient.wrap(context.client, context_workspace(context))
+        next()
@@ -0,0 +1,63 @@
+import os
+import re
+import sys
+import subprocess
+
+# python -X importtime の出力の 1 行（"import time:  self [us] | cumulative | imported package"）
+_IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def parse_importtime(output):
+    """
+    -X importtime の出力を (モジュール名, 自身の時間, 累計時間, 深さ) のリストにする（時間は秒）
+    """
+    rows = []
+    for line in output.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match is None:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        rows.append((name, int(self_us) / 1e6, int(cumulative_us) / 1e6, (len(indent) - 1) // 2))
+    return rows
+
+
+def measure_imports(module="app", cwd=None):
+    """
+    別プロセスで `python -X importtime -c "import <module>"` を実行し、parse_importtime の結果を返す
+    （実行中のプロセスではすでに import 済みのため計測できない）
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=cwd or os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"{module} の import に失敗しました:\n{result.stderr[-2000:]}")
+    return parse_importtime(result.stderr)
+
+
+def format_report(rows, module="app", top=15):
+    """
+    import 全体の時間、パッケージごとの合計（自身の時間の和）、累計時間の長いモジュールを表にする
+    """
+    total = next((cumulative for name, _, cumulative, _ in rows if name == module), 0.0)
+    packages = {}
+    for name, self_time, _, _ in rows:
+        package = name.split(".", 1)[0]
+        packages[package] = packages.get(package, 0.0) + self_time
+
+    lines = [f"import {module}: {total * 1000:.1f} ms（{len(rows)} モジュール）", "", "パッケージごとの合計:"]
+    for package, seconds in sorted(packages.items(), key=lambda item: -item[1])[:top]:
+        lines.append(f"  {seconds * 1000:8.1f} ms  {package}")
+    lines += ["", "累計時間の長いモジュール:"]
+    for name, self_time, cumulative, depth in sorted(rows, key=lambda row: -row[2])[:top]:
+        lines.append(f"  {cumulative * 1000:8.1f} ms（自身 {self_time * 1000:6.1f} ms）  {'  ' * depth}{name}")
+    return "\n".join(lines)
+
+
+def print_startup_report(module="app", top=15):
+    """
+    起動時の import の内訳を表示する（python app.py --startup-report）
+    """
+    print(format_report(measure_imports(module), module, top))
@@ -0,0 +1,232 @@
+import time
+import asyncio
+import logging
+import threading
+from functools import lru_cache
+from collections import OrderedDict
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from slack_sdk.errors import SlackApiError
+
+from handlers.config import config
+from handlers.slack_client import RateLimitedWebClient, workspace_of, would_throttle
+
+# ユーザーのタイムゾーンのキャッシュの有効期間（秒）。取得できなかったユーザーは短い期間だけ覚えておく
+USER_TZ_CACHE_TTL = config.user_tz_cache_ttl
+USER_TZ_NEGATIVE_TTL = config.user_tz_negative_ttl
+USER_TZ_CACHE_SIZE = config.user_tz_cache_size
+# 起動時に users.list でワークスペースのメンバーのタイムゾーンをまとめて読み込むかどうか
+USER_TZ_WARM_UP = config.user_tz_warm_up
+# キャッシュにないユーザーの users.info のタイムアウト（秒）。ack の前に呼ぶため再試行もしない
+USER_TZ_LOOKUP_TIMEOUT = config.user_tz_lookup_timeout
+# users.list の 1 ページの件数
+WARM_UP_PAGE_SIZE = 200
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=None)
+def zone(name):
+    """
+    IANA のタイムゾーン名の ZoneInfo（空・不明な名前は None = サーバーのローカルタイム）
+    """
+    if not name:
+        return None
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        return None
+
+
+def zone_name(tz):
+    """
+    zone の逆。ストアに保存するタイムゾーン名（None は空文字）
+    """
+    return getattr(tz, "key", "") if tz is not None else ""
+
+
+def _lookup_team(client):
+    return workspace_of(client) or client.default_params.get("team_id")
+
+
+def _lookup_client(client):
+    # コマンド・モーダル送信の ack の前に呼ぶため、レート制限の待ちや再試行をせず、短いタイムアウトで 1 回だけ問い合わせる
+    return RateLimitedWebClient(
+        token=client.token, base_url=client.base_url, ssl=client.ssl, proxy=client.proxy,
+        team_id=client.default_params.get("team_id"), workspace_id=workspace_of(client),
+        timeout=USER_TZ_LOOKUP_TIMEOUT, max_retries=0
+    )
+
+
+def _lookup_client_async(client):
+    # aiohttp を読み込むため、非同期モードで呼ばれたときだけ import する
+    # 共有のセッションを使うと slack_sdk は timeout を適用しないため、呼び出し側で asyncio.wait_for で打ち切る
+    from handlers.slack_async_client import RateLimitedAsyncWebClient, shared_async_session
+    return RateLimitedAsyncWebClient(
+        token=client.token, base_url=client.base_url, ssl=client.ssl, proxy=client.proxy,
+        team_id=client.default_params.get("team_id"), workspace_id=workspace_of(client),
+        timeout=USER_TZ_LOOKUP_TIMEOUT, max_retries=0, session=shared_async_session()
+    )
+
+
+class UserTimezoneCache:
+    """
+    ユーザーごとの Slack のタイムゾーン名の TTL + LRU キャッシュ
+    ユーザー ID はワークスペースをまたいで一意なため、複数のワークスペースでも 1 つのキャッシュを共有する
+    users.info で取得できなかったユーザーも None として USER_TZ_NEGATIVE_TTL の間だけ覚え、同じユーザーで API を繰り返し呼ばない
+    resolve は ack の前に呼ばれるため、users.info がレート制限で待たされる・失敗する・タイムアウトする場合は待たずに None にする
+    """
+
+    def __init__(self, ttl=USER_TZ_CACHE_TTL, negative_ttl=USER_TZ_NEGATIVE_TTL, max_size=USER_TZ_CACHE_SIZE):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        # user -> (期限, タイムゾーン名 または None)。末尾ほど最近使ったもの
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.negative_hits = 0
+        self.evictions = 0
+        self.warmed = 0
+
+    def lookup(self, user_id):
+        """
+        キャッシュにあれば (True, タイムゾーン名 または None)、なければ (False, None)
+        """
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None:
+                expires_at, name = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(user_id)
+                    if name is None:
+                        self.negative_hits += 1
+                    else:
+                        self.hits += 1
+                    return True, name
+                del self._entries[user_id]
+            self.misses += 1
+        return False, None
+
+    def put(self, user_id, name):
+        self.put_many([(user_id, name)])
+
+    def put_many(self, items):
+        """
+        items は (ユーザー, タイムゾーン名 または None) の iterable
+        """
+        now = time.monotonic()
+        with self._lock:
+            for user_id, name in items:
+                self._entries[user_id] = (now + (self.ttl if name else self.negative_ttl), name or None)
+                self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def resolve(self, client, user_id):
+        """
+        ユーザーのタイムゾーン（ZoneInfo。取得できなければ None）。キャッシュになければ users.info を呼ぶ
+        """
+        if not user_id:
+            return None
+        found, name = self.lookup(user_id)
+        if found:
+            return zone(name)
+        name = None
+        if would_throttle("users.info", team_id=_lookup_team(client)):
+            logger.warning(f"{user_id} のタイムゾーンを取得できませんでした: レート制限中")
+        else:
+            try:
+                response = _lookup_client(client).users_info(user=user_id)
+                name = (response.get("user") or {}).get("tz")
+            except SlackApiError as e:
+                logger.warning(f"{user_id} のタイムゾーンを取得できませんでした: {e.response['error']}")
+            except Exception as e:
+                logger.warning(f"{user_id} のタイムゾーンを取得できませんでした: {e}")
+        self.put(user_id, name)
+        return zone(name)
+
+    async def resolve_async(self, client, user_id):
+        """
+        resolve の AsyncWebClient 版
+        """
+        if not user_id:
+            return None
+        found, name = self.lookup(user_id)
+        if found:
+            return zone(name)
+        name = None
+        if would_throttle("users.info", team_id=_lookup_team(client)):
+            logger.warning(f"{user_id} のタイムゾーンを取得できませんでした: レート制限中")
+        else:
+            try:
+                response = await asyncio.wait_for(
+                    _lookup_client_async(client).users_info(user=user_id), USER_TZ_LOOKUP_TIMEOUT
+                )
+                name = (response.get("user") or {}).get("tz")
+            except SlackApiError as e:
+                logger.warning(f"{user_id} のタイムゾーンを取得できませんでした: {e.response['error']}")
+            except asyncio.TimeoutError:
+                logger.warning(f"{user_id} のタイムゾーンを取得できませんでした: タイムアウト")
+            except Exception as e:
+                logger.warning(f"{user_id} のタイムゾーンを取得できませんでした: {e}")
+        self.put(user_id, name)
+        return zone(name)
+
+    def warm_up(self, client):
+        """
+        users.list をページごとに読み、ワークスペースのメンバーのタイムゾーンをまとめてキャッシュに入れて件数を返す
+        """
+        cursor, count = None, 0
+        while True:
+            response = client.users_list(limit=WARM_UP_PAGE_SIZE, cursor=cursor)
+            members = [
+                (member["id"], member.get("tz"))
+                for member in response.get("members") or []
+                if not member.get("deleted")
+            ]
+            self.put_many(members)
+            count += len(members)
+            cursor = (response.get("response_metadata") or {}).get("next_cursor")
+            if not cursor:
+                break
+        with self._lock:
+            self.warmed += count
+        return count
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "negative_hits": self.negative_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "warmed": self.warmed,
+            }
+
+
+# 全コマンドモジュールで共有するキャッシュ
+user_timezones = UserTimezoneCache()
+
+
+def start_warm_up(client):
+    """
+    起動時の読み込みを別スレッドで開始する（終わるまでの間のリクエストは users.info で 1 件ずつ取得する）
+    """
+    if not USER_TZ_WARM_UP or client is None:
+        return None
+
+    def run():
+        try:
+            count = user_timezones.warm_up(client)
+            logger.info(f"{count} 人のタイムゾーンを読み込みました")
+        except SlackApiError as e:
+            logger.warning(f"ユーザーのタイムゾーンを読み込めませんでした: {e.response['error']}")
+        except Exception as e:
+            logger.warning(f"ユーザーのタイムゾーンを読み込めませんでした: {e}")
+
+    thread = threading.Thread(target=run, name="user-timezone-warm-up", daemon=True)
+    thread.start()
+    return thread
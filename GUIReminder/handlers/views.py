@@ -0,0 +1,148 @@
+import re
+import json
+import datetime
+
+from handlers.config import config
+
+# views.open に渡すビューを事前にシリアライズした JSON 文字列から組み立てるかどうか
+VIEW_PRESERIALIZE = config.view_preserialize
+
+# 切り上げ間隔（分）
+MINUTE_INTERVAL = 5
+
+
+def generate_minute_options():
+    """
+    MINUTE_INTERVAL 単位の時刻オプションを生成
+    """
+    options = []
+    for m in range(0, 60, MINUTE_INTERVAL):
+        minute_str = f"{m:02d}"  # 0埋め
+        options.append({
+            "text": {"type": "plain_text", "text": f"{minute_str}分"},
+            "value": minute_str
+        })
+    return options
+
+
+def generate_hour_options():
+    """
+    1時間単位の時オプションを生成 (00時～23時)
+    """
+    return [
+        {"text": {"type": "plain_text", "text": f"{h:02d}時"}, "value": f"{h:02d}"}
+        for h in range(24)
+    ]
+
+
+# オプションは起動時に一度だけ生成し、初期値は値からの辞書引きで選ぶ
+MINUTE_OPTIONS = generate_minute_options()
+HOUR_OPTIONS = generate_hour_options()
+MINUTE_OPTION_BY_VALUE = {opt["value"]: opt for opt in MINUTE_OPTIONS}
+HOUR_OPTION_BY_VALUE = {opt["value"]: opt for opt in HOUR_OPTIONS}
+
+
+def get_next_minute_interval(tz=None):
+    """
+    現在時刻を MINUTE_INTERVAL 単位に切り上げた日時を返す
+    tz はユーザーのタイムゾーン（None はサーバーのローカルタイム）
+    """
+    now = datetime.datetime.now(tz)
+    # 現在の分が MINUTE_INTERVAL 単位の区切りからどれだけ進んでいるか
+    minutes_past_interval = now.minute % MINUTE_INTERVAL
+    # 次の MINUTE_INTERVAL 単位までの残り時間
+    minutes_to_add = MINUTE_INTERVAL - minutes_past_interval
+    # 次の MINUTE_INTERVAL 単位の時刻を計算
+    next_time = now + datetime.timedelta(minutes=minutes_to_add)
+    # 結果を文字列として返す
+    initial_date = next_time.strftime("%Y-%m-%d")
+    initial_hour = next_time.strftime("%H")
+    initial_minute = next_time.strftime("%M")
+
+    return initial_date, initial_hour, initial_minute
+
+
+def _identity(value):
+    return value
+
+
+class ViewTemplate:
+    """
+    起動時に組み立てたモーダルの骨格に、リクエストごとの値だけを差し込むテンプレート
+
+    patches は {フィールド名: (パス, 変換関数)}。パスは骨格の dict / list をたどるキーの並びで、
+    render では差し込む経路上の dict / list だけをコピーし、それ以外のブロックは共有する。
+    そのため骨格と render の戻り値は書き換えないこと。
+    """
+
+    _PLACEHOLDER = re.compile(r'"@@(\w+)@@"')
+
+    def __init__(self, skeleton, patches):
+        self.skeleton = skeleton
+        self.patches = {
+            name: (path, transform or _identity) for name, (path, transform) in patches.items()
+        }
+        self._json_parts = None
+
+    def render(self, **fields):
+        """
+        差し込み済みのビュー（dict）を返す
+        """
+        return self._render(fields, apply_transform=True)
+
+    def _render(self, fields, apply_transform):
+        view = dict(self.skeleton)
+        copied = {(): view}
+        for name, value in fields.items():
+            path, transform = self.patches[name]
+            node = view
+            for depth, key in enumerate(path[:-1], start=1):
+                prefix = path[:depth]
+                child = copied.get(prefix)
+                if child is None:
+                    child = node[key]
+                    child = list(child) if isinstance(child, list) else dict(child)
+                    node[key] = child
+                    copied[prefix] = child
+                node = child
+            node[path[-1]] = transform(value) if apply_transform else value
+        return view
+
+    def render_json(self, **fields):
+        """
+        差し込み済みのビューを JSON 文字列で返す（静的な部分は初回に一度だけシリアライズする）
+        """
+        if self._json_parts is None:
+            # 差し込み位置にプレースホルダー文字列を置いてシリアライズし、そこで分割しておく
+            placeholders = self._render({name: f"@@{name}@@" for name in self.patches}, apply_transform=False)
+            self._json_parts = self._PLACEHOLDER.split(json.dumps(placeholders, ensure_ascii=False))
+        parts = self._json_parts
+        out = [parts[0]]
+        # split の結果は [静的部分, フィールド名, 静的部分, フィールド名, ...]
+        for i in range(1, len(parts), 2):
+            name = parts[i]
+            _, transform = self.patches[name]
+            out.append(json.dumps(transform(fields[name]), ensure_ascii=False))
+            out.append(parts[i + 1])
+        return "".join(out)
+
+
+def open_view(client, trigger_id, template, **fields):
+    """
+    テンプレートからモーダルを開く
+    VIEW_PRESERIALIZE が有効なら事前シリアライズした JSON 文字列をそのまま送る
+    """
+    if VIEW_PRESERIALIZE:
+        return client.api_call("views.open", data={"trigger_id": trigger_id, "view": template.render_json(**fields)})
+    return client.views_open(trigger_id=trigger_id, view=template.render(**fields))
+
+
+async def open_view_async(client, trigger_id, template, **fields):
+    """
+    open_view の AsyncWebClient 版
+    """
+    if VIEW_PRESERIALIZE:
+        return await client.api_call(
+            "views.open", data={"trigger_id": trigger_id, "view": template.render_json(**fields)}
+        )
+    return await client.views_open(trigger_id=trigger_id, view=template.render(**fields))
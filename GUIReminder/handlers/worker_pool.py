@@ -0,0 +1,201 @@
+import time
+import asyncio
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from handlers.config import config
+
+# 同時に実行するワーカー数
+WORKER_POOL_SIZE = config.worker_pool_size
+# 実行待ちにできる最大件数（これを超えると空きが出るまで submit が待つ）
+WORKER_QUEUE_SIZE = config.worker_queue_size
+
+logger = logging.getLogger(__name__)
+
+
+class TimingStats:
+    """
+    経過時間（秒）の集計。直近 window 件からパーセンタイルを計算する
+    """
+
+    def __init__(self, window=1024):
+        self._lock = threading.Lock()
+        self._recent = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        with self._lock:
+            self._recent.append(seconds)
+            self.count += 1
+            self.total += seconds
+            if seconds > self.max:
+                self.max = seconds
+
+    def percentile(self, p):
+        with self._lock:
+            recent = sorted(self._recent)
+        if not recent:
+            return 0.0
+        return recent[min(len(recent) - 1, int(round(p / 100 * (len(recent) - 1))))]
+
+    def snapshot(self):
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else 0.0,
+            "p50": self.percentile(50),
+            "p99": self.percentile(99),
+            "max": self.max,
+        }
+
+
+class WorkerPool:
+    """
+    ack 後の Slack API 呼び出しを実行する上限付きスレッドプール
+    """
+
+    def __init__(self, max_workers=WORKER_POOL_SIZE, max_queue=WORKER_QUEUE_SIZE):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="reminder-worker")
+        # 実行中 + 実行待ちの合計を max_workers + max_queue に制限する
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue)
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.wait_time = TimingStats()
+        self.exec_time = TimingStats()
+
+    def submit(self, fn, *args, **kwargs):
+        """
+        fn をワーカーで実行する。キューが一杯なら空きが出るまで待つ（バックプレッシャー）
+        """
+        self._slots.acquire()
+        with self._lock:
+            self.queued += 1
+        return self._executor.submit(self._run, time.perf_counter(), fn, args, kwargs)
+
+    def _run(self, enqueued_at, fn, args, kwargs):
+        started_at = time.perf_counter()
+        self.wait_time.observe(started_at - enqueued_at)
+        with self._lock:
+            self.queued -= 1
+            self.running += 1
+        try:
+            return fn(*args, **kwargs)
+        except Exception as e:
+            with self._lock:
+                self.failed += 1
+            logger.error(f"ワーカーでの処理に失敗しました: {e}")
+            raise
+        finally:
+            self.exec_time.observe(time.perf_counter() - started_at)
+            with self._lock:
+                self.running -= 1
+                self.completed += 1
+            self._slots.release()
+
+    def stats(self):
+        """
+        キュー長・待ち時間・実行時間の統計
+        """
+        with self._lock:
+            counts = {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "queue_depth": self.queued,
+                "running": self.running,
+                "completed": self.completed,
+                "failed": self.failed,
+            }
+        counts["wait_time"] = self.wait_time.snapshot()
+        counts["exec_time"] = self.exec_time.snapshot()
+        return counts
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+
+class AsyncWorkerPool:
+    """
+    WorkerPool の asyncio 版。コルーチンをタスクとして同時実行数を制限して実行する
+    """
+
+    def __init__(self, max_workers=WORKER_POOL_SIZE, max_queue=WORKER_QUEUE_SIZE):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        # セマフォはイベントループ上で生成する必要があるため初回 submit 時に作る
+        self._slots = None
+        self._workers = None
+        self._tasks = set()
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.wait_time = TimingStats()
+        self.exec_time = TimingStats()
+
+    async def submit(self, coro_fn, *args, **kwargs):
+        """
+        coro_fn(*args, **kwargs) をタスクとして実行する。キューが一杯なら空きが出るまで待つ
+        """
+        if self._slots is None:
+            self._slots = asyncio.BoundedSemaphore(self.max_workers + self.max_queue)
+            self._workers = asyncio.Semaphore(self.max_workers)
+        await self._slots.acquire()
+        self.queued += 1
+        task = asyncio.create_task(self._run(time.perf_counter(), coro_fn, args, kwargs))
+        # 実行中のタスクが GC されないよう参照を保持する
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def _run(self, enqueued_at, coro_fn, args, kwargs):
+        try:
+            async with self._workers:
+                started_at = time.perf_counter()
+                self.wait_time.observe(started_at - enqueued_at)
+                self.queued -= 1
+                self.running += 1
+                try:
+                    return await coro_fn(*args, **kwargs)
+                except Exception as e:
+                    self.failed += 1
+                    logger.error(f"ワーカーでの処理に失敗しました: {e}")
+                finally:
+                    self.exec_time.observe(time.perf_counter() - started_at)
+                    self.running -= 1
+                    self.completed += 1
+        finally:
+            self._slots.release()
+
+    def stats(self):
+        return {
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "queue_depth": self.queued,
+            "running": self.running,
+            "completed": self.completed,
+            "failed": self.failed,
+            "wait_time": self.wait_time.snapshot(),
+            "exec_time": self.exec_time.snapshot(),
+        }
+
+    async def drain(self):
+        """
+        実行中・実行待ちのタスクがすべて終わるまで待つ（シャットダウン時用）
+        """
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+# 全コマンドモジュールで共有するプール
+worker_pool = WorkerPool()
+async_worker_pool = AsyncWorkerPool()
+# /import-schedule・/purge-reminders の一括処理用（1 件のジョブがレート制限を待ちながら長時間動くため、通常のワーカーとは分ける）
+bulk_job_pool = WorkerPool(max_workers=config.bulk_job_concurrency, max_queue=config.bulk_job_queue_size)